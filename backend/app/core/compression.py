@@ -0,0 +1,112 @@
+"""
+gzip and brotli encoding.
+
+Dynamic responses are compressed by CompressionMiddleware at a fast level;
+static files are compressed once at build time at the highest level
+(``python manage.py precompress-static``) and served as they are (see
+app.core.static_files).
+"""
+import gzip
+import mimetypes
+import os
+import zlib
+from typing import Dict, Iterable, Optional
+
+import brotli
+
+# Supported encodings, best first, and the file suffixes of their precompressed siblings
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def choose_encoding(accept_encoding: str, offered: Optional[Iterable[str]] = None) -> Optional[str]:
+    """The best of ``offered`` (default: all supported) that an Accept-Encoding header allows."""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in offered if offered is not None else SUFFIXES:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+class StreamCompressor:
+    """Incremental encoder; each chunk is flushed so streamed responses keep streaming."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=level)
+        else:
+            # wbits 31: a gzip header and trailer around the deflate stream
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def precompress_directory(directory: str, types: Iterable[str], min_size: int = 0) -> Dict[str, int]:
+    """
+    Write ``.br`` / ``.gz`` siblings, at maximum compression, for the files
+    under ``directory`` whose guessed type is in ``types``.
+
+    Siblings that would not be smaller than the file are not written (and
+    stale ones are removed), so the server falls back to the original.
+    """
+    types = set(types)
+    levels = {"br": 11, "gzip": 9}
+    stats = {"files": 0, "written": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(tuple(SUFFIXES.values())):
+                continue
+            path = os.path.join(root, name)
+            if mimetypes.guess_type(name)[0] not in types:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            stats["files"] += 1
+            for encoding in SUFFIXES:
+                sibling = path + SUFFIXES[encoding]
+                compressed = compress(data, encoding, levels[encoding])
+                if len(compressed) >= len(data):
+                    stats["skipped"] += 1
+                    if os.path.exists(sibling):
+                        os.remove(sibling)
+                    continue
+                with open(sibling, "wb") as f:
+                    f.write(compressed)
+                # Same mtime as the original, so Last-Modified agrees across encodings
+                stat = os.stat(path)
+                os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                stats["written"] += 1
+                stats["bytes_in"] += len(data)
+                stats["bytes_out"] += len(compressed)
+    return stats
@@ -0,0 +1,35 @@
+"""
+HTTP caching helpers shared by routes that send validators.
+"""
+from typing import Optional
+
+from app.core.compression import SUFFIXES
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    The ETag of ``etag``'s representation in ``encoding``: the same tag with
+    ``-<encoding>`` inside the quotes (``"abc"`` -> ``"abc-gzip"``), so each
+    encoding's bytes get their own strong validator.
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches ``etag`` or its ``encoded_etag``
+    for an encoding CompressionMiddleware may have applied. Comparison is
+    weak, as RFC 9110 requires for If-None-Match, so a W/ prefix is ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    accepted = {etag, *(encoded_etag(etag, encoding) for encoding in SUFFIXES)}
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in accepted:
+            return True
+    return False
@@ -0,0 +1,262 @@
+"""
+Idempotency-Key support for non-idempotent endpoints such as ``POST /api/book``.
+
+The first request with a key does the work; its status code and body are kept
+for ``settings.IDEMPOTENCY_TTL_SECONDS`` and replayed to any repeat. Repeats
+that arrive while the first is still running wait for it instead of running
+the handler a second time. Client errors (4xx) are stored like successes;
+server errors are not, so the client can retry them.
+
+Two backends share the ``IdempotencyStore`` interface, picked with
+``IDEMPOTENCY_BACKEND`` like the seat hold stores:
+
+* ``InMemoryIdempotencyStore`` - per-process, so it only deduplicates repeats
+  that reach the same worker. Use it for development and single workers.
+* ``RedisIdempotencyStore`` - shared between workers through a
+  Redis-compatible server.
+"""
+import abc
+import asyncio
+import json
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from loguru import logger
+
+from app.config import settings
+from app.core.resp import RespClient
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Any
+    headers: Dict[str, str]
+
+
+class IdempotencyKeyReuseError(ValueError):
+    """Raised when a key is sent again with a different request payload."""
+
+
+class IdempotencyInProgressError(RuntimeError):
+    """Raised when a repeat gives up waiting for the original request to finish."""
+
+
+Handler = Callable[[], Awaitable[StoredResponse]]
+
+
+def _stored_error(error: BaseException) -> Optional[StoredResponse]:
+    """The response to keep for a failed handler, or None if the key should be freed."""
+    if isinstance(error, HTTPException) and error.status_code < 500:
+        return StoredResponse(error.status_code, {"detail": error.detail}, dict(error.headers or {}))
+    return None
+
+
+class IdempotencyStore(abc.ABC):
+    """Interface shared by the idempotency backends."""
+
+    @abc.abstractmethod
+    async def execute(self, key: str, fingerprint: str, handler: Handler) -> Tuple[StoredResponse, bool]:
+        """
+        Await ``handler`` once per key and return ``(response, replayed)``.
+
+        An HTTPException below 500 raised by the handler is stored as the
+        response for the key and raised again to the caller that ran it.
+        """
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires_at", "done", "response")
+
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = asyncio.Event()
+        self.response: Optional[StoredResponse] = None
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """
+    Keys and stored responses for one worker process, at most ``max_entries``
+    of them; past that the oldest finished keys are dropped early. A key whose
+    request is still running is only dropped once it expires, so the table can
+    briefly exceed the bound by the number of requests in flight.
+
+    Every call comes from the event loop and nothing awaits while the table is
+    being read or changed, so no lock is needed.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, wait_timeout: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.IDEMPOTENCY_TTL_SECONDS
+        self.wait_timeout = wait_timeout if wait_timeout is not None else settings.IDEMPOTENCY_WAIT_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.IDEMPOTENCY_MAX_ENTRIES
+        # Insertion order is expiry order because every entry gets the same TTL
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Drop every expired key in one sweep from the oldest end."""
+        return self._evict(time.monotonic() if now is None else now)
+
+    def _evict(self, now: float) -> int:
+        evicted = 0
+        while self._entries and next(iter(self._entries.values())).expires_at <= now:
+            self._entries.popitem(last=False)
+            evicted += 1
+        excess = len(self._entries) - self.max_entries + 1
+        if excess > 0:
+            # Dropping a key that is still in flight would let a repeat run the
+            # handler a second time, so only finished keys make room
+            finished = []
+            for key, entry in self._entries.items():
+                if len(finished) == excess:
+                    break
+                if entry.done.is_set():
+                    finished.append(key)
+            for key in finished:
+                del self._entries[key]
+            evicted += len(finished)
+        return evicted
+
+    def _claim(self, key: str, fingerprint: str) -> Tuple[_Entry, bool]:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            return entry, False
+        self._entries.pop(key, None)
+        # Makes room for the new key too
+        self._evict(now)
+        entry = _Entry(fingerprint, now + self.ttl)
+        self._entries[key] = entry
+        return entry, True
+
+    def _forget(self, key: str, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _settle(self, key: str, entry: _Entry, error: Optional[BaseException] = None,
+                response: Optional[StoredResponse] = None) -> None:
+        """Record how the owner's call ended and wake any waiting repeats."""
+        entry.response = response if error is None else _stored_error(error)
+        if entry.response is None:
+            self._forget(key, entry)
+        entry.done.set()
+
+    async def execute(self, key: str, fingerprint: str, handler: Handler) -> Tuple[StoredResponse, bool]:
+        while True:
+            entry, owner = self._claim(key, fingerprint)
+            if owner:
+                break
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyKeyReuseError("Idempotency-Key was already used with a different request")
+            try:
+                await asyncio.wait_for(entry.done.wait(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is still in progress")
+            if entry.response is not None:
+                return entry.response, True
+            # The original failed without a storable result; try again ourselves
+
+        try:
+            response = await handler()
+        except BaseException as e:
+            self._settle(key, entry, error=e)
+            raise
+        self._settle(key, entry, response=response)
+        return response, False
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """
+    Keys kept in a Redis-compatible server, shared by every worker.
+
+    ``{prefix}:{key}`` is claimed with SET NX, holding the fingerprint and an
+    owner token, and expires after ``lock_seconds`` so a worker that dies
+    mid-request does not block the key for the whole replay window. When the
+    handler finishes the value becomes the fingerprint and stored response,
+    kept for ``ttl``. Repeats on any worker poll the key until the response
+    appears. The server expires keys itself, so it bounds the entries.
+
+    Storing the response and releasing the claim are each one server-side
+    compare-and-set on the claim, so a worker whose claim outlived
+    ``lock_seconds`` and was taken over cannot overwrite or free the new
+    owner's key.
+    """
+
+    poll_interval = 0.05
+    # KEYS[1] is the key, ARGV[1] the claim the caller set on it
+    _release_script = (
+        "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end return false"
+    )
+    _store_script = (
+        "if redis.call('GET', KEYS[1]) == ARGV[1] then "
+        "return redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3]) end return false"
+    )
+
+    def __init__(self, client: RespClient, ttl: Optional[int] = None, wait_timeout: Optional[float] = None,
+                 lock_seconds: Optional[int] = None, prefix: str = "idempotency"):
+        self.client = client
+        self.ttl = ttl if ttl is not None else settings.IDEMPOTENCY_TTL_SECONDS
+        self.wait_timeout = wait_timeout if wait_timeout is not None else settings.IDEMPOTENCY_WAIT_SECONDS
+        self.lock_seconds = lock_seconds if lock_seconds is not None else settings.IDEMPOTENCY_LOCK_SECONDS
+        self.prefix = prefix
+
+    async def _store(self, redis_key: str, claim: str, fingerprint: str, response: StoredResponse) -> None:
+        payload = json.dumps({"fingerprint": fingerprint, "response": list(response)})
+        stored = await self.client.aexecute("EVAL", self._store_script, 1, redis_key, claim, payload, self.ttl * 1000)
+        if stored is None:
+            logger.warning("Idempotency claim on {key} expired before its response was stored", key=redis_key)
+
+    async def _release(self, redis_key: str, claim: str) -> None:
+        await self.client.aexecute("EVAL", self._release_script, 1, redis_key, claim)
+
+    async def execute(self, key: str, fingerprint: str, handler: Handler) -> Tuple[StoredResponse, bool]:
+        redis_key = f"{self.prefix}:{key}"
+        owner = secrets.token_urlsafe(16)
+        claim = json.dumps({"fingerprint": fingerprint, "owner": owner})
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if await self.client.aexecute("SET", redis_key, claim, "NX", "PX", self.lock_seconds * 1000) == "OK":
+                break
+            payload = await self.client.aexecute("GET", redis_key)
+            if payload is None:
+                continue  # released or expired between the two commands
+            entry = json.loads(payload)
+            if entry["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReuseError("Idempotency-Key was already used with a different request")
+            if "response" in entry:
+                return StoredResponse(*entry["response"]), True
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            response = await handler()
+        except BaseException as e:
+            stored = _stored_error(e)
+            if stored is None:
+                await self._release(redis_key, claim)
+            else:
+                await self._store(redis_key, claim, fingerprint, stored)
+            raise
+        await self._store(redis_key, claim, fingerprint, response)
+        return response, False
+
+
+_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Return the process-wide store configured by ``IDEMPOTENCY_BACKEND``."""
+    global _store
+    if _store is None:
+        if settings.IDEMPOTENCY_BACKEND == "redis":
+            _store = RedisIdempotencyStore(RespClient(settings.IDEMPOTENCY_REDIS_URL))
+        else:
+            _store = InMemoryIdempotencyStore()
+    return _store
@@ -1,9 +1,120 @@
-from loguru import logger
+"""
+Application logging on loguru.
+
+Records go to stdout and, when LOG_FILE is set, to a rotating file, either as
+one JSON object per line (LOG_FORMAT=json) or in loguru's text format. Every
+sink is enqueued: the calling thread formats the line and hands it to a
+background writer, which does the I/O, rotation and compression.
+
+Records logged while a request is being served carry its route template and
+request id (see app.core.middleware). Below WARNING they are sampled per
+route (LOG_SAMPLE_RATE / LOG_SAMPLE_RATES); the decision is made once per
+request, so a request's lines are kept or dropped together. Warnings and
+errors are always written.
+
+Records below LOG_LEVEL return before anything is formatted. Pass values
+that are expensive to build through ``logger.opt(lazy=True)`` so disabled
+debug lines don't compute them either.
+"""
+import json
+import random
 import sys
+import traceback
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.config import settings
+
+_WARNING_NO = logger.level("WARNING").no
+
+
+class RequestLogContext:
+    """Per-request logging state, shared through ``request_context``."""
+
+    __slots__ = ("scope", "request_id", "_sampled")
+
+    def __init__(self, scope: Dict[str, Any], request_id: str):
+        self.scope = scope
+        self.request_id = request_id
+        self._sampled: Optional[bool] = None
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the scope once it has resolved it
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "")
+
+    @property
+    def sampled(self) -> bool:
+        if self._sampled is not None:
+            return self._sampled
+        rate = settings.LOG_SAMPLE_RATES.get(self.route, settings.LOG_SAMPLE_RATE)
+        sampled = rate >= 1 or random.random() < rate
+        # Lines logged before routing don't fix the decision for the route
+        if "route" in self.scope:
+            self._sampled = sampled
+        return sampled
+
+
+request_context: ContextVar[Optional[RequestLogContext]] = ContextVar("request_log_context", default=None)
+
+
+def _add_request_context(record) -> None:
+    context = request_context.get()
+    if context is not None:
+        record["extra"].setdefault("route", context.route)
+        record["extra"].setdefault("request_id", context.request_id)
+
+
+def _sampling_filter(record) -> bool:
+    if record["level"].no >= _WARNING_NO:
+        return True
+    context = request_context.get()
+    return context is None or context.sampled
+
+
+def _json_format(record) -> str:
+    entry = {
+        "ts": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "msg": record["message"],
+    }
+    entry.update((key, value) for key, value in record["extra"].items() if key != "_json")
+    if record["exception"] is not None:
+        entry["exc"] = "".join(traceback.format_exception(*record["exception"])).rstrip()
+    # loguru format_map's the returned template, so the line itself travels in extra
+    record["extra"]["_json"] = json.dumps(entry, default=str)
+    return "{extra[_json]}\n"
+
+
+def configure_logging() -> None:
+    """(Re)build the sinks from settings."""
+    logger.remove()
+    logger.configure(patcher=_add_request_context)
+    options = {
+        "level": settings.LOG_LEVEL.upper(),
+        "filter": _sampling_filter,
+        "enqueue": True,
+        "backtrace": False,
+        "diagnose": False,
+    }
+    if settings.LOG_FORMAT == "json":
+        options["format"] = _json_format
+    logger.add(sys.stdout, **options)
+    if settings.LOG_FILE:
+        logger.add(
+            settings.LOG_FILE,
+            rotation=settings.LOG_FILE_ROTATION,
+            retention=settings.LOG_FILE_RETENTION,
+            compression="zip",
+            delay=True,
+            **options,
+        )
+
 
-# Configure Loguru
-logger.remove()
-logger.add(sys.stdout, level="INFO", enqueue=True, backtrace=False, diagnose=False)
-logger.add("app.log", rotation="5 MB", retention="7 days", compression="zip", level="INFO")
+configure_logging()
 
-__all__ = ["logger"]
+__all__ = ["logger", "configure_logging", "request_context", "RequestLogContext"]
@@ -0,0 +1,167 @@
+"""
+Memory profiling with tracemalloc.
+
+tracemalloc is off by default; it slows allocation-heavy code noticeably,
+so it is switched on through the internal endpoints only while
+investigating. While it traces:
+
+- named snapshots can be taken and diffed against each other or against
+  the live heap, grouped by line, file or traceback;
+- MemoryTrackingMiddleware records each request's peak allocation per
+  route template (``http_request_peak_alloc_bytes``).
+
+Peaks are process-wide, so a request's peak includes whatever concurrent
+requests allocated at the same time; compare routes under similar load.
+"""
+import os
+import resource
+import threading
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.metrics import Histogram, MetricFamily
+
+MAX_SNAPSHOTS = 10
+# Bytes, from 16 KiB to 256 MiB
+ALLOCATION_BUCKETS = tuple(16 * 1024 * 4 ** n for n in range(8))
+
+PEAK_ALLOCATION = MetricFamily(
+    "http_request_peak_alloc_bytes", "Peak traced allocation during a request, while tracemalloc runs.",
+    "histogram", ("route",), factory=lambda: Histogram(buckets=ALLOCATION_BUCKETS),
+)
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current, but better than nothing off Linux (KiB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _stats(statistics, limit: int) -> List[Dict[str, Any]]:
+    rows = []
+    for stat in statistics[:limit]:
+        row = {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            row["size_diff_bytes"] = stat.size_diff
+            row["count_diff"] = stat.count_diff
+        rows.append(row)
+    return rows
+
+
+class MemoryProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._taken = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.take_snapshot("start")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "rss_bytes": rss_bytes(),
+            "snapshots": list(self._snapshots),
+        }
+
+    def take_snapshot(self, label: Optional[str] = None) -> str:
+        """Keep a snapshot of the live heap under a name; the oldest ones are dropped past MAX_SNAPSHOTS."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        with self._lock:
+            self._taken += 1
+            name = label or f"snapshot-{self._taken}"
+            self._snapshots.pop(name, None)
+            self._snapshots[name] = snapshot
+            while len(self._snapshots) > MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return name
+
+    def _snapshot(self, name: Optional[str]) -> tracemalloc.Snapshot:
+        if name is None:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running")
+            return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            raise KeyError(name)
+        return snapshot
+
+    def top(self, key_type: str = "lineno", limit: int = 20, snapshot: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Largest allocation sites in a snapshot, or in the live heap."""
+        return _stats(self._snapshot(snapshot).statistics(key_type), limit)
+
+    def diff(self, since: str, until: Optional[str] = None, key_type: str = "lineno",
+             limit: int = 20) -> List[Dict[str, Any]]:
+        """Allocation sites that grew the most between two snapshots (``until`` defaults to now)."""
+        older = self._snapshot(since)
+        newer = self._snapshot(until)
+        return _stats(newer.compare_to(older, key_type), limit)
+
+
+memory_profiler = MemoryProfiler()
+
+
+def route_peaks() -> Dict[str, Dict[str, Any]]:
+    peaks = {}
+    for (route,), histogram in PEAK_ALLOCATION.children():
+        snap = histogram.snapshot()
+        peaks[route] = {
+            "requests": snap["count"],
+            "max_bytes": snap["max"],
+            "mean_bytes": snap["sum"] / snap["count"] if snap["count"] else 0,
+            "p99_bytes": snap["p99"],
+        }
+    return peaks
+
+
+def traced_request_start() -> Optional[int]:
+    """Traced bytes at the start of a request, or None when tracemalloc is off."""
+    if not tracemalloc.is_tracing():
+        return None
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    return current
+
+
+def traced_request_peak(started: int) -> Optional[int]:
+    """Peak bytes allocated on top of ``started``; None if tracemalloc was stopped meanwhile."""
+    if not tracemalloc.is_tracing():
+        return None
+    _, peak = tracemalloc.get_traced_memory()
+    return max(peak - started, 0)
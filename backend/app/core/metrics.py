@@ -0,0 +1,194 @@
+"""
+Minimal in-process metrics: counters, gauges and histograms.
+
+Each metric guards its state with its own lock, so hot paths from any thread
+(or the event loop) can update it; ``snapshot()`` returns plain values that
+are safe to serialize on the internal stats endpoints. ``MetricFamily`` splits
+a metric by label values and ``render_prometheus`` writes families in the
+Prometheus text exposition format.
+"""
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Seconds; tuned for connection checkout and query latencies
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def snapshot(self) -> int:
+        return self._value
+
+
+class Gauge:
+    """Value that goes up and down; remembers the highest value it was set to."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._max = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+            if value > self._max:
+                self._max = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+            if self._value > self._max:
+                self._max = self._value
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"value": self._value, "max": self._max}
+
+
+class Histogram:
+    """
+    Bucketed distribution of observations.
+
+    ``buckets`` are inclusive upper bounds; observations above the last bound
+    land in an implicit ``+Inf`` bucket. Bucket counts in ``snapshot()`` are
+    cumulative, as in Prometheus.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (the max if past the last bucket)."""
+        with self._lock:
+            counts, total, largest = list(self._counts), self._count, self._max
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, largest)
+        return largest
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total, summed, largest = list(self._counts), self._count, self._sum, self._max
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = total
+        return {
+            "count": total,
+            "sum": summed,
+            "max": largest,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+
+class MetricFamily:
+    """
+    One metric per combination of label values, e.g. request latency per route.
+
+    ``kind`` is the Prometheus type ("counter", "gauge" or "histogram");
+    children are built with ``factory`` the first time their labels are seen.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str] = (),
+                 factory: Optional[Callable[[], Metric]] = None) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory or {"counter": Counter, "gauge": Gauge, "histogram": Histogram}[kind]
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Metric] = {}
+
+    def labels(self, *values: str) -> Metric:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def attach(self, values: Tuple[str, ...], metric: Metric) -> None:
+        """Expose an existing metric under these label values."""
+        with self._lock:
+            self._children[values] = metric
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Metric]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    rendered = ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs)
+    return "{" + rendered + "}" if rendered else ""
+
+
+def render_prometheus(families: Iterable[MetricFamily]) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for values, metric in family.children():
+            labels = list(zip(family.labelnames, values))
+            if isinstance(metric, Histogram):
+                snap = metric.snapshot()
+                for bound, count in snap["buckets"].items():
+                    lines.append(f"{family.name}_bucket{_format_labels(labels + [('le', bound)])} {count}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {snap['sum']}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {snap['count']}")
+            else:
+                lines.append(f"{family.name}{_format_labels(labels)} {metric.value}")
+    return "\n".join(lines) + "\n"
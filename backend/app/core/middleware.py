@@ -0,0 +1,385 @@
+"""
+ASGI middleware.
+
+Written against the raw ASGI interface rather than BaseHTTPMiddleware, so
+they add no extra task or response buffering per request.
+"""
+import time
+import uuid
+
+from app.core.logging import RequestLogContext, logger, request_context
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+from app.core.compression import StreamCompressor, choose_encoding, compress, media_type
+from app.core.http_cache import encoded_etag
+from app.core.memory import PEAK_ALLOCATION, traced_request_peak, traced_request_start
+from app.core.metrics import Histogram, MetricFamily
+from app.core.profiler import ProfilerBusyError, profiler, verify_profile_header
+from app.core.tracing import current_span, start_trace
+from app.db.instrumentation import QueryStats, request_queries
+
+REQUEST_ID_HEADER = b"x-request-id"
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestLoggingMiddleware:
+    """
+    Sets the request context that log records pick up and writes one access
+    line per request. An incoming X-Request-ID is reused, otherwise one is
+    generated; either way it is echoed on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or len(request_id) > 64:
+            request_id = uuid.uuid4().hex
+        context = RequestLogContext(scope, request_id)
+        token = request_context.set(context)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            logger.log(
+                "WARNING" if status >= 500 else "INFO",
+                "{method} {route} {status} {duration_ms}ms",
+                method=scope["method"], route=context.route, status=status,
+                duration_ms=round((time.perf_counter() - started) * 1000, 2),
+            )
+            request_context.reset(token)
+
+
+HTTP_REQUEST_DURATION = MetricFamily(
+    "http_request_duration_seconds", "Time from request to the end of the response body.",
+    "histogram", ("method", "route"),
+)
+HTTP_RESPONSES = MetricFamily("http_responses_total", "Responses sent, by status code.", "counter",
+                              ("method", "route", "status"))
+HTTP_IN_FLIGHT = MetricFamily("http_requests_in_flight", "Requests being served.", "gauge")
+DB_STATEMENTS = MetricFamily(
+    "http_request_db_statements", "SQL statements executed per request.", "histogram", ("route",),
+    factory=lambda: Histogram(buckets=STATEMENT_BUCKETS),
+)
+DB_TIME = MetricFamily("http_request_db_seconds", "Time per request spent in SQL statements.", "histogram",
+                       ("route",))
+HTTP_FAMILIES = (HTTP_REQUEST_DURATION, HTTP_RESPONSES, HTTP_IN_FLIGHT, DB_STATEMENTS, DB_TIME)
+
+
+def _route_label(scope) -> str:
+    # The route template, never the raw path, so label values stay bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status, in-flight count and SQL statements and time per
+    route. Served in Prometheus format by /api/internal/metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = HTTP_IN_FLIGHT.labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        queries = QueryStats(parent=request_queries.get())
+        token = request_queries.set(queries)
+        self._in_flight.inc()
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._in_flight.dec()
+            request_queries.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            HTTP_RESPONSES.labels(method, route, str(status)).inc()
+            DB_STATEMENTS.labels(route).observe(queries.statements)
+            DB_TIME.labels(route).observe(queries.duration)
+
+
+class QueryDebugMiddleware:
+    """
+    Development aid: reports the request's SQL on the response as
+    X-DB-Statements, X-DB-Time-Ms and X-DB-Repeated (shapes run
+    REPEAT_THRESHOLD times or more, the N+1 signature), and logs the
+    repeated shapes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = QueryStats(parent=request_queries.get(), track_shapes=True)
+        token = request_queries.set(queries)
+
+        async def send_with_query_headers(message):
+            if message["type"] == "http.response.start":
+                repeated = queries.repeated()
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-db-statements", str(queries.statements).encode()),
+                    (b"x-db-time-ms", f"{queries.duration * 1000:.2f}".encode()),
+                    (b"x-db-repeated", str(len(repeated)).encode()),
+                ]
+                for shape, count in repeated.items():
+                    logger.warning("Possible N+1 on {route}: {count}x {shape}",
+                                   route=_route_label(scope), count=count, shape=shape)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_query_headers)
+        finally:
+            request_queries.reset(token)
+
+
+class TracingMiddleware:
+    """
+    Root span per sampled request, joined to an incoming traceparent. The
+    span is named after the route template once routing has resolved it,
+    and its traceparent is returned in a traceresponse header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = start_trace(scope["method"], traceparent, **{"http.method": scope["method"]})
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = current_span.set(root)
+
+        async def send_with_traceresponse(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"traceresponse", root.traceparent.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_traceresponse)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            route = _route_label(scope)
+            root.name = f"{scope['method']} {route}"
+            root.attributes["http.route"] = route
+            if root.attributes.get("http.status_code", 500) >= 500 and root.error is None:
+                root.error = "HTTP 5xx"
+            root.finish()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that carry a valid signed X-Profile header and names
+    the saved profile in the X-Profile response header ("busy" when another
+    session is running). Only installed when PROFILER_SECRET is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                mode = verify_profile_header(value.decode("latin-1"))
+                break
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            profile = profiler.start(f"{scope['method']}-{scope['path']}", mode)
+        except ProfilerBusyError:
+            profile = None
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (b"x-profile", (profile or "busy").encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if profile is not None:
+                await run_in_threadpool(profiler.stop)
+
+
+class MemoryTrackingMiddleware:
+    """
+    Records each request's peak traced allocation per route while
+    tracemalloc runs (see app.core.memory); otherwise a single is_tracing()
+    check per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        started = traced_request_start() if scope["type"] == "http" else None
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            peak = traced_request_peak(started)
+            if peak is not None:
+                PEAK_ALLOCATION.labels(_route_label(scope)).observe(peak)
+
+
+class CompressionMiddleware:
+    """
+    gzip or brotli, as the client's Accept-Encoding allows, for responses of
+    a type in COMPRESSION_TYPES. A response sent in one piece is compressed
+    only if it is at least COMPRESSION_MIN_SIZE bytes and the result is
+    smaller; a streamed one chunk by chunk. Responses that are already
+    encoded (precompressed static files) pass through untouched.
+
+    A compressed response's ETag gets the encoding appended (``"v1"`` ->
+    ``"v1-gzip"``, see ``encoded_etag``): its bytes differ from the identity
+    representation's, so it needs its own strong validator. Routes check
+    If-None-Match with ``etag_matches``, which accepts either, and a 304 for
+    the encoded tag is sent back with that tag.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = settings.COMPRESSION_BROTLI_QUALITY if encoding == "br" else settings.COMPRESSION_GZIP_LEVEL
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows the size
+                start = message
+                return
+            if compressor is not None:
+                body = compressor.compress(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body += compressor.finish()
+                await send({**message, "body": body})
+                return
+
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start["status"] == 304:
+                self._mark_not_modified(headers, encoding, Headers(scope=scope).get("if-none-match", ""))
+            if not self._compressible(start["status"], headers):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                compressed = compress(body, encoding, level) if len(body) >= settings.COMPRESSION_MIN_SIZE else body
+                if len(compressed) < len(body):
+                    self._mark_encoded(headers, encoding)
+                    headers["content-length"] = str(len(compressed))
+                    body = compressed
+                passthrough = True
+                await send(start)
+                await send({**message, "body": body})
+                return
+            compressor = StreamCompressor(encoding, level)
+            self._mark_encoded(headers, encoding)
+            del headers["content-length"]
+            await send(start)
+            await send({**message, "body": compressor.compress(body)})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compressible(status: int, headers: MutableHeaders) -> bool:
+        return (
+            status not in (204, 206, 304)
+            and "content-encoding" not in headers
+            and "no-transform" not in headers.get("cache-control", "")
+            and media_type(headers.get("content-type")) in settings.COMPRESSION_TYPES
+        )
+
+    @staticmethod
+    def _mark_encoded(headers: MutableHeaders, encoding: str) -> None:
+        headers["content-encoding"] = encoding
+        etag = headers.get("etag")
+        if etag is not None:
+            headers["etag"] = encoded_etag(etag, encoding)
+
+    @staticmethod
+    def _mark_not_modified(headers: MutableHeaders, encoding: str, if_none_match: str) -> None:
+        # A 304 carries the ETag the client validated, i.e. that of the encoded representation
+        etag = headers.get("etag")
+        if etag is not None and encoded_etag(etag, encoding) in if_none_match:
+            headers["etag"] = encoded_etag(etag, encoding)
+            headers.add_vary_header("Accept-Encoding")
@@ -0,0 +1,208 @@
+"""
+On-demand sampling profiler.
+
+While a session runs, a daemon thread snapshots the stack of every other
+thread every PROFILER_INTERVAL_MS. Those threads are the event loop, where
+routes and async DB calls run, and the threadpool, where sync services and
+their SQL run. Stacks are written in collapsed format, one
+``frame;frame;frame count`` line per distinct stack, under PROFILE_DIR.
+flamegraph.pl, speedscope and inferno all read this format.
+
+- ``wall`` mode counts samples, so waiting on the database shows up.
+- ``cpu`` mode weights each sample by the CPU microseconds the thread used
+  since the previous one, so idle and blocked threads drop out.
+
+A session starts in one of two ways:
+- per request, through an ``X-Profile`` header signed with PROFILER_SECRET
+  (see ``sign_profile_request``);
+- for a time window, through the internal endpoint.
+
+Only one session runs at a time. Other threads serving concurrent requests
+are sampled too, so per-request profiles are cleanest at low concurrency.
+With no session running nothing samples. Without PROFILER_SECRET the
+request middleware is not installed at all.
+"""
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+MODES = ("wall", "cpu")
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, "backend" + os.sep):
+        index = filename.rfind(marker)
+        if index != -1:
+            filename = filename[index + len(marker):]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class StackSampler:
+    """Samples every other thread's stack until stopped."""
+
+    def __init__(self, mode: str = "wall", interval: float = 0.005):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.mode = mode
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._cpu: Dict[int, float] = {}
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> StackCounter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                weight = 1
+                if self.mode == "cpu":
+                    now = _thread_cpu_time(ident)
+                    if now is None:
+                        continue
+                    previous = self._cpu.get(ident)
+                    self._cpu[ident] = now
+                    weight = int((now - previous) * 1_000_000) if previous is not None else 0
+                    if weight <= 0:
+                        continue
+                self.stacks[_collapse(frame)] += weight
+            self.samples += 1
+
+
+def write_collapsed(stacks: StackCounter, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """One profiling session at a time, written to PROFILE_DIR when it ends."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._active: Optional[StackSampler] = None
+        self._timer: Optional[threading.Timer] = None
+        self.current: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._active is not None
+
+    def start(self, label: str, mode: str = "wall") -> str:
+        """Start sampling; returns the name the profile will be saved under."""
+        with self._lock:
+            if self._active is not None:
+                raise ProfilerBusyError(f"profile {self.current} is already running")
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{_SAFE_NAME.sub('_', label).strip('_')}-{mode}.collapsed"
+            self._active = StackSampler(mode, settings.PROFILER_INTERVAL_MS / 1000).start()
+            self.current = name
+            return name
+
+    def start_window(self, seconds: float, mode: str = "wall") -> str:
+        name = self.start("window", mode)
+        self._timer = threading.Timer(seconds, self.stop)
+        self._timer.daemon = True
+        self._timer.start()
+        return name
+
+    def stop(self) -> Optional[str]:
+        """Stop the running session and write it out; returns its path."""
+        with self._lock:
+            sampler, name = self._active, self.current
+            self._active = self.current = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if sampler is None:
+            return None
+        stacks = sampler.stop()
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILE_DIR, name)
+        write_collapsed(stacks, path)
+        return path
+
+    @staticmethod
+    def list_profiles() -> List[Dict[str, object]]:
+        if not os.path.isdir(settings.PROFILE_DIR):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(settings.PROFILE_DIR), reverse=True):
+            if name.endswith(".collapsed"):
+                stat = os.stat(os.path.join(settings.PROFILE_DIR, name))
+                profiles.append({"name": name, "bytes": stat.st_size, "created": stat.st_mtime})
+        return profiles
+
+    @staticmethod
+    def profile_path(name: str) -> Optional[str]:
+        if _SAFE_NAME.search(name) or not name.endswith(".collapsed"):
+            return None
+        path = os.path.join(settings.PROFILE_DIR, name)
+        return path if os.path.isfile(path) else None
+
+
+profiler = Profiler()
+
+
+def _signature(expires: int, mode: str) -> str:
+    return hmac.new(settings.PROFILER_SECRET.encode(), f"{expires}:{mode}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_profile_request(mode: str = "wall", ttl: int = 300) -> str:
+    """X-Profile header value that profiles requests for the next ``ttl`` seconds."""
+    expires = int(time.time()) + ttl
+    return f"{expires}.{mode}.{_signature(expires, mode)}"
+
+
+def verify_profile_header(value: str) -> Optional[str]:
+    """The profiling mode a valid, unexpired X-Profile header asks for, else None."""
+    if not settings.PROFILER_SECRET:
+        return None
+    parts = value.split(".")
+    if len(parts) != 3 or parts[1] not in MODES or not parts[0].isdigit():
+        return None
+    expires, mode, signature = int(parts[0]), parts[1], parts[2]
+    if expires < time.time() or not hmac.compare_digest(signature, _signature(expires, mode)):
+        return None
+    return mode
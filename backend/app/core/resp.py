@@ -0,0 +1,132 @@
+"""
+A minimal client for Redis-compatible servers, shared by the Redis-backed
+stores in ``app.core``.
+
+It talks the Redis protocol (RESP2) directly so the stores have no
+client-library dependency.
+"""
+import socket
+import threading
+from typing import Callable, Optional, TypeVar
+from urllib.parse import urlparse
+
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+from starlette.concurrency import run_in_threadpool
+
+
+T = TypeVar("T")
+
+
+def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking call that isn't a database query (socket I/O, e.g. the
+    Redis hold store) from sync service code.
+
+    Under ``AsyncSession.run_sync`` that code runs on the event loop thread,
+    so the call is handed to the threadpool and awaited through SQLAlchemy's
+    greenlet bridge. On a plain Session the code is already on a threadpool
+    thread and the call runs in place.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """Minimal, thread-safe RESP2 client over a single TCP connection."""
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._file = self._sock.makefile("rb")
+        if self.password:
+            self._send([("AUTH", self.password)])
+            self._read()
+        if self.db:
+            self._send([("SELECT", self.db)])
+            self._read()
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._file = None
+
+    def _send(self, commands) -> None:
+        out = bytearray()
+        for command in commands:
+            out += b"*%d\r\n" % len(command)
+            for arg in command:
+                if not isinstance(arg, bytes):
+                    arg = str(arg).encode()
+                out += b"$%d\r\n%s\r\n" % (len(arg), arg)
+        self._sock.sendall(out)
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RespError(f"unexpected reply {line!r}")
+
+    def pipeline(self, commands) -> list:
+        """Send all commands in one round trip and return their replies in order."""
+        if not commands:
+            return []
+        # Socket I/O: kept off the event loop when called from run_sync
+        return run_blocking(self._pipeline, commands)
+
+    def _pipeline(self, commands) -> list:
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._send(commands)
+                    return [self._read() for _ in commands]
+                except (OSError, ConnectionError):
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+    def execute(self, *command):
+        reply = self.pipeline([command])[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def aexecute(self, *command):
+        """``execute`` for async code: the socket I/O runs on the threadpool."""
+        return await run_in_threadpool(self.execute, *command)
@@ -0,0 +1,44 @@
+"""
+Fast JSON path for large responses.
+
+A route that returns a dict goes through FastAPI's response_model handling:
+the dict is validated into the model, dumped back into a JSON-compatible
+dict, and then encoded by the stdlib json module. ``model_response``
+serializes the model straight to bytes with pydantic-core instead, so no
+intermediate dict is built and no Python-level encoder runs. The seat
+layout, search and booking list services build their response models
+directly (``model_construct``), so those are not validated at all; a plain
+dict is validated first.
+
+Each route opts in by calling ``model_response``. Whether it takes the fast
+path is decided by FAST_JSON, overridable per route template through
+FAST_JSON_ROUTES. When the fast path is off, the content is handed back
+untouched and FastAPI serializes it as before. The bytes are the same either
+way; the route's response_model still documents the schema.
+"""
+from typing import Any, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.config import settings
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def fast_json_enabled(route: Optional[str]) -> bool:
+    return settings.FAST_JSON_ROUTES.get(route, settings.FAST_JSON)
+
+
+def model_response(request: Request, model: Type[BaseModel], content: Any, status_code: int = 200) -> Any:
+    """
+    ``content`` as ``model`` JSON in one pass, or ``content`` itself for
+    FastAPI when switched off. An instance of ``model`` is not validated again.
+    """
+    route = request.scope.get("route")
+    if not fast_json_enabled(getattr(route, "path", None)):
+        return content
+    if not isinstance(content, model):
+        content = model.model_validate(content)
+    body = content.model_dump_json()
+    return Response(body, status_code=status_code, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,223 @@
+"""
+Stores for temporary seat holds.
+
+A hold reserves seats on one (bus, travel date) for a user between seat
+selection and payment and expires on its own after a TTL. Two backends share
+the ``SeatHoldStore`` interface:
+
+* ``InMemorySeatHoldStore`` - per-process, for development and single workers.
+* ``RedisSeatHoldStore`` - shared between workers through a Redis-compatible
+  server (see ``app.core.resp``).
+
+Pick one with ``SEAT_HOLD_BACKEND`` (``memory`` or ``redis``).
+"""
+import abc
+import heapq
+import json
+import secrets
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.core.resp import RespClient
+
+
+class SeatHold(NamedTuple):
+    token: str
+    user_id: str
+    bus_id: str
+    travel_date: str
+    seats: Tuple[str, ...]
+    expires_at: float  # unix timestamp
+
+    @classmethod
+    def new(cls, user_id: str, bus_id: str, travel_date: str, seats: Iterable[str], ttl: int) -> "SeatHold":
+        return cls(secrets.token_urlsafe(16), user_id, bus_id, travel_date, tuple(seats), time.time() + ttl)
+
+
+class SeatHoldStore(abc.ABC):
+    """Interface shared by the hold backends."""
+
+    @abc.abstractmethod
+    def acquire(self, hold: SeatHold, ttl: int) -> List[str]:
+        """Hold every seat in ``hold`` or none; return the seats held by someone else."""
+
+    @abc.abstractmethod
+    def get(self, token: str) -> Optional[SeatHold]:
+        """The live hold for ``token``, or None once it expired or was released."""
+
+    @abc.abstractmethod
+    def extend(self, token: str, ttl: int) -> Optional[SeatHold]:
+        """Push the expiry of a live hold ``ttl`` seconds into the future."""
+
+    @abc.abstractmethod
+    def release(self, token: str) -> bool:
+        """Drop the hold and free its seats; False if it was not live."""
+
+    @abc.abstractmethod
+    def holders(self, bus_id: str, travel_date: str, seat_nos: Iterable[str]) -> Dict[str, str]:
+        """Map each currently held seat among ``seat_nos`` to its hold token."""
+
+
+class InMemorySeatHoldStore(SeatHoldStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holds: Dict[str, SeatHold] = {}
+        self._seats: Dict[Tuple[str, str, str], str] = {}
+        self._expiry: List[Tuple[float, str]] = []
+
+    def _purge(self, now: float) -> None:
+        # Expiry heap may hold stale entries for extended holds; skip those.
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, token = heapq.heappop(self._expiry)
+            hold = self._holds.get(token)
+            if hold is not None and hold.expires_at <= now:
+                self._drop(hold)
+
+    def _drop(self, hold: SeatHold) -> None:
+        self._holds.pop(hold.token, None)
+        for seat_no in hold.seats:
+            key = (hold.bus_id, hold.travel_date, seat_no)
+            if self._seats.get(key) == hold.token:
+                del self._seats[key]
+
+    def acquire(self, hold: SeatHold, ttl: int) -> List[str]:
+        with self._lock:
+            self._purge(time.time())
+            conflicts = [
+                seat_no for seat_no in hold.seats
+                if (hold.bus_id, hold.travel_date, seat_no) in self._seats
+            ]
+            if conflicts:
+                return conflicts
+            for seat_no in hold.seats:
+                self._seats[(hold.bus_id, hold.travel_date, seat_no)] = hold.token
+            self._holds[hold.token] = hold
+            heapq.heappush(self._expiry, (hold.expires_at, hold.token))
+            return []
+
+    def get(self, token: str) -> Optional[SeatHold]:
+        with self._lock:
+            self._purge(time.time())
+            return self._holds.get(token)
+
+    def extend(self, token: str, ttl: int) -> Optional[SeatHold]:
+        with self._lock:
+            self._purge(time.time())
+            hold = self._holds.get(token)
+            if hold is None:
+                return None
+            hold = hold._replace(expires_at=time.time() + ttl)
+            self._holds[token] = hold
+            heapq.heappush(self._expiry, (hold.expires_at, token))
+            return hold
+
+    def release(self, token: str) -> bool:
+        with self._lock:
+            hold = self._holds.get(token)
+            if hold is None:
+                return False
+            self._drop(hold)
+            return True
+
+    def holders(self, bus_id: str, travel_date: str, seat_nos: Iterable[str]) -> Dict[str, str]:
+        with self._lock:
+            self._purge(time.time())
+            found = {}
+            for seat_no in seat_nos:
+                token = self._seats.get((bus_id, travel_date, seat_no))
+                if token is not None:
+                    found[seat_no] = token
+            return found
+
+
+class RedisSeatHoldStore(SeatHoldStore):
+    """
+    Holds kept in a Redis-compatible server.
+
+    Each held seat is a key ``seathold:{bus}:{date}:{seat}`` whose value is the
+    hold token, set with NX and a PX expiry, so the server enforces both
+    exclusivity and the TTL. The hold itself is a JSON document under
+    ``seathold:token:{token}`` with the same expiry.
+    """
+
+    def __init__(self, client: RespClient, prefix: str = "seathold"):
+        self.client = client
+        self.prefix = prefix
+
+    def _seat_key(self, bus_id: str, travel_date: str, seat_no: str) -> str:
+        return f"{self.prefix}:{bus_id}:{travel_date}:{seat_no}"
+
+    def _token_key(self, token: str) -> str:
+        return f"{self.prefix}:token:{token}"
+
+    def acquire(self, hold: SeatHold, ttl: int) -> List[str]:
+        ttl_ms = ttl * 1000
+        keys = [self._seat_key(hold.bus_id, hold.travel_date, seat_no) for seat_no in hold.seats]
+        replies = self.client.pipeline([("SET", key, hold.token, "NX", "PX", ttl_ms) for key in keys])
+        conflicts = [seat_no for seat_no, reply in zip(hold.seats, replies) if reply != "OK"]
+        if conflicts:
+            # All or nothing: give back the seats this attempt did get
+            won = [key for key, reply in zip(keys, replies) if reply == "OK"]
+            self.client.pipeline([("DEL", key) for key in won])
+            return conflicts
+        payload = json.dumps(hold._asdict())
+        self.client.execute("SET", self._token_key(hold.token), payload, "PX", ttl_ms)
+        return []
+
+    def get(self, token: str) -> Optional[SeatHold]:
+        payload = self.client.execute("GET", self._token_key(token))
+        if payload is None:
+            return None
+        data = json.loads(payload)
+        data["seats"] = tuple(data["seats"])
+        return SeatHold(**data)
+
+    def extend(self, token: str, ttl: int) -> Optional[SeatHold]:
+        hold = self.get(token)
+        if hold is None:
+            return None
+        keys = [self._seat_key(hold.bus_id, hold.travel_date, seat_no) for seat_no in hold.seats]
+        if self.client.pipeline([("GET", key) for key in keys]) != [token] * len(keys):
+            return None  # some seat expired and was taken by someone else
+        hold = hold._replace(expires_at=time.time() + ttl)
+        ttl_ms = ttl * 1000
+        self.client.pipeline(
+            [("PEXPIRE", key, ttl_ms) for key in keys]
+            + [("SET", self._token_key(token), json.dumps(hold._asdict()), "PX", ttl_ms)]
+        )
+        return hold
+
+    def release(self, token: str) -> bool:
+        hold = self.get(token)
+        if hold is None:
+            return False
+        keys = [self._seat_key(hold.bus_id, hold.travel_date, seat_no) for seat_no in hold.seats]
+        owned = [key for key, value in zip(keys, self.client.pipeline([("GET", key) for key in keys])) if value == token]
+        self.client.pipeline([("DEL", key) for key in owned] + [("DEL", self._token_key(token))])
+        return True
+
+    def holders(self, bus_id: str, travel_date: str, seat_nos: Iterable[str]) -> Dict[str, str]:
+        seat_nos = list(seat_nos)
+        if not seat_nos:
+            return {}
+        values = self.client.execute("MGET", *[self._seat_key(bus_id, travel_date, s) for s in seat_nos])
+        return {seat_no: token for seat_no, token in zip(seat_nos, values) if token is not None}
+
+
+_store: Optional[SeatHoldStore] = None
+_store_lock = threading.Lock()
+
+
+def get_seat_hold_store() -> SeatHoldStore:
+    """Return the process-wide hold store configured by ``SEAT_HOLD_BACKEND``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.SEAT_HOLD_BACKEND == "redis":
+                    _store = RedisSeatHoldStore(RespClient(settings.SEAT_HOLD_REDIS_URL))
+                else:
+                    _store = InMemorySeatHoldStore()
+    return _store
@@ -0,0 +1,63 @@
+"""
+Static file serving for the built SPA.
+
+- ``.br`` / ``.gz`` siblings written at build time (``python manage.py
+  precompress-static``) are served in place of the file when the client
+  accepts them, so no worker compresses assets per request.
+- Files in a directory mounted ``immutable=True`` are cached for a year
+  without revalidation. Vite puts a content hash in every file name under
+  ``assets/`` (``index-D8sTzP1q.js``), so a changed file gets a new URL.
+- Everything else keeps the ETag / Last-Modified revalidation StaticFiles
+  already does; index.html is marked no-cache so it is always revalidated.
+"""
+import mimetypes
+import os
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from app.core.compression import SUFFIXES, choose_encoding
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves precompressed siblings; ``immutable`` for content-hashed file names only."""
+
+    def __init__(self, *args, immutable: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable = immutable
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        full_path = str(full_path)
+        request_headers = Headers(scope=scope)
+        siblings = {
+            encoding: full_path + suffix
+            for encoding, suffix in SUFFIXES.items() if os.path.isfile(full_path + suffix)
+        }
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""), siblings) if siblings else None
+        path, stat = full_path, stat_result
+        if encoding is not None:
+            path = siblings[encoding]
+            stat = os.stat(path)
+
+        name = os.path.basename(full_path)
+        # The ETag and Content-Length come from the file actually sent, so each encoding has its own
+        response = FileResponse(
+            path, status_code=status_code, stat_result=stat,
+            media_type=mimetypes.guess_type(name)[0] or "text/plain",
+        )
+        if encoding is not None:
+            response.headers["content-encoding"] = encoding
+        if siblings:
+            response.headers.add_vary_header("Accept-Encoding")
+        if self.immutable:
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        elif name == "index.html":
+            # Always revalidated, so a deploy's new asset hashes are picked up at once
+            response.headers["cache-control"] = "no-cache"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,250 @@
+"""
+Lightweight request tracing.
+
+A trace is a tree of spans: one per request (TracingMiddleware), one per
+service call (AsyncServiceAdapter), the auth steps in get_current_user, and
+one per SQL statement and session commit (app.db.instrumentation). Traces
+join an incoming W3C ``traceparent`` and report theirs back in
+``traceresponse``; ``current_traceparent()`` gives the header for outgoing
+calls.
+
+Sampling is decided once per trace: a sampled incoming parent is followed,
+otherwise TRACE_SAMPLE_RATE applies. Unsampled requests never create a span,
+so ``span()`` is a contextvar lookup there. Finished spans go to a bounded
+queue that a background thread exports in batches, as OTLP/JSON, either
+appended to TRACE_FILE or posted to an OTLP/HTTP collector. When the queue
+is full spans are dropped and counted rather than slowing requests down.
+"""
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.core.metrics import Counter
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, kind: int = KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> "Span":
+        return Span(name, self.trace_id, self.span_id, kind, attributes)
+
+    def finish(self) -> None:
+        self.end_ns = time.time_ns()
+        _processor.submit(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": 2, "message": self.error}
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C traceparent, or None if it isn't valid."""
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes) -> Optional[Span]:
+    """The root span of a sampled request, or None when this trace isn't sampled."""
+    parent = parse_traceparent(traceparent)
+    if parent is not None and parent[2]:
+        return Span(name, parent[0], parent[1], KIND_SERVER, attributes)
+    rate = settings.TRACE_SAMPLE_RATE
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    trace_id = parent[0] if parent is not None else os.urandom(16).hex()
+    return Span(name, trace_id, parent[1] if parent is not None else None, KIND_SERVER, attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """Child span of the current one; does nothing outside a sampled trace."""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, **attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current_span.reset(token)
+        child.finish()
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header for an outgoing call made inside the current span."""
+    active = current_span.get()
+    return active.traceparent if active is not None else None
+
+
+class FileSpanExporter:
+    """Appends each batch as one OTLP/JSON ExportTraceServiceRequest line."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OTLPHttpExporter:
+    """Posts each batch to an OTLP/HTTP collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        self._client.post(self.url, json=payload).raise_for_status()
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports them from a daemon thread."""
+
+    def __init__(self, exporter=None, max_queue: int = 10000, batch_size: int = 512, interval: float = 2.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = Counter()
+        self.export_failures = Counter()
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, finished: Span) -> None:
+        if self.exporter is None:
+            return
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped.inc()
+            return
+        if self._thread is None:
+            self._start()
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        while True:
+            batch: List[Span] = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                self.exporter.export(_otlp_payload(batch))
+            except Exception:
+                self.export_failures.inc()
+
+
+def _otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app"}, "spans": [s.to_otlp() for s in spans]}],
+        }]
+    }
+
+
+def _build_exporter():
+    if settings.TRACE_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACE_FILE)
+    if settings.TRACE_EXPORTER == "otlp":
+        return OTLPHttpExporter(settings.TRACE_OTLP_ENDPOINT)
+    return None
+
+
+_processor = BatchSpanProcessor(_build_exporter())
+
+
+def get_span_processor() -> BatchSpanProcessor:
+    return _processor
+
+
+def set_span_exporter(exporter) -> None:
+    """Swap the exporter (None stops exporting); spans already queued go to the new one."""
+    _processor.exporter = exporter
+
+
+def shutdown_tracing() -> None:
+    """Export what is still queued; called on application shutdown."""
+    if _processor.exporter is not None:
+        _processor.flush()
@@ -0,0 +1,129 @@
+# app/db/async_session.py
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+from app.config import settings
+from app.db import session as sync_session
+from app.db.session import ReadOnlySession
+from app.db.pool_metrics import InstrumentedAsyncAdaptedQueuePool, instrument_engine
+
+
+# What get_session yields, depending on DB_ASYNC
+DBSession = Union[AsyncSession, Session]
+
+
+class AsyncSyncSession(Session):
+    """Sync session class behind every AsyncSession, so session events can target them."""
+
+
+def sleep(seconds: float) -> None:
+    """
+    time.sleep for sync service code; yields to the event loop under
+    ``run_sync`` (see ``app.core.resp.run_blocking`` for blocking calls).
+    """
+    if in_greenlet():
+        await_only(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+
+# Created on first use so the async driver is only imported when DB_ASYNC is on
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[async_sessionmaker] = None
+_async_replica_engine: Optional[AsyncEngine] = None
+_async_read_sessionmaker: Optional[async_sessionmaker] = None
+
+
+def _create_async_engine(url, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=settings.SQLALCHEMY_ECHO,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_logging_name=name,
+        **settings.DB_POOL_OPTIONS,
+    )
+    instrument_engine(engine.sync_engine, name)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _create_async_engine(settings.ASYNC_DATABASE_URL, "async")
+    return _async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        _async_sessionmaker = async_sessionmaker(
+            bind=get_async_engine(),
+            sync_session_class=AsyncSyncSession,
+            autoflush=False,
+            # Loaded objects (e.g. the current user) stay usable after commit
+            # without an implicit, awaitable refresh
+            expire_on_commit=False,
+        )
+    return _async_sessionmaker
+
+
+def get_async_read_sessionmaker() -> async_sessionmaker:
+    """Read-only AsyncSessions on the replica, or on the primary when none is configured."""
+    global _async_replica_engine, _async_read_sessionmaker
+    if _async_read_sessionmaker is None:
+        if settings.DB_REPLICA_URL:
+            _async_replica_engine = _create_async_engine(
+                make_url(settings.DB_REPLICA_URL).set(drivername="postgresql+asyncpg"), "async-replica"
+            )
+        _async_read_sessionmaker = async_sessionmaker(
+            bind=_async_replica_engine or get_async_engine(),
+            sync_session_class=ReadOnlySession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_read_sessionmaker
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker, _async_replica_engine, _async_read_sessionmaker
+    for engine in (_async_engine, _async_replica_engine):
+        if engine is not None:
+            await engine.dispose()
+    _async_engine = _async_sessionmaker = _async_replica_engine = _async_read_sessionmaker = None
+
+
+@asynccontextmanager
+async def open_session(read_only: bool = False) -> AsyncIterator[DBSession]:
+    """
+    An AsyncSession when DB_ASYNC is on, otherwise a regular Session that the
+    async services drive from the threadpool. ``read_only`` picks the replica.
+    """
+    if settings.DB_ASYNC:
+        factory = get_async_read_sessionmaker() if read_only else get_async_sessionmaker()
+        async with factory() as db:
+            yield db
+    else:
+        db = (sync_session.ReadSessionLocal if read_only else sync_session.SessionLocal)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+# FastAPI dependency: an AsyncSession
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+# FastAPI dependency used by the routes that write (see app.deps.get_read_session for reads)
+async def get_session():
+    async with open_session() as db:
+        yield db
@@ -16,5 +16,4 @@ from app.db.models import seat  # noqa
 from app.db.models import booking  # noqa
 from app.db.models import booking_seat  # noqa
 from app.db.models import trip  # noqa
-
-print("✅ base.py loaded, models imported:", Base.metadata.tables.keys())
+from app.db.models import user_booking_stats  # noqa
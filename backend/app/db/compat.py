@@ -0,0 +1,40 @@
+"""
+SQL that has to differ between PostgreSQL and sqlite.
+
+Production runs on PostgreSQL; the unit tests run the same services on
+in-memory sqlite. Where the two need different SQL for the same result the
+services call a helper here, so no service query checks the dialect itself.
+"""
+from sqlalchemy import Table, func, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
+
+
+def _is_postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def comma_list(db: Session, stmt: Select, order_by: ColumnElement, correlate) -> ColumnElement:
+    """
+    The single column of ``stmt`` joined with commas in ``order_by`` order,
+    as a scalar subquery evaluated per row of the outer ``correlate`` table.
+    """
+    if _is_postgresql(db):
+        agg = func.string_agg(stmt.selected_columns[0], aggregate_order_by(literal_column("','"), order_by))
+        return stmt.with_only_columns(agg).correlate(correlate).scalar_subquery()
+    # sqlite (before 3.44) has no ORDER BY inside an aggregate, so group_concat
+    # reads an ordered derived table. That table must reference the outer row
+    # itself rather than bring its own copy of ``correlate`` into its FROM, or
+    # every row gets the list for every row.
+    ordered = stmt.order_by(order_by).correlate(correlate).subquery()
+    return select(func.group_concat(ordered.c[0], ",")).scalar_subquery()
+
+
+def insert(db: Session, table: Table):
+    """
+    INSERT for ``table`` with ``on_conflict_do_update`` / ``excluded``; both
+    dialects' inserts take the same arguments, so upserts are written once.
+    """
+    return (postgresql if _is_postgresql(db) else sqlite).insert(table)
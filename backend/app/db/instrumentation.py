@@ -0,0 +1,169 @@
+# app/db/instrumentation.py
+"""
+Per-request SQL accounting.
+
+``instrument_queries()`` hooks cursor execution on every Engine, sync engines
+and the sync side of async ones alike. While a request is being served, the
+middleware puts a QueryStats in ``request_queries``; each statement then adds
+to its count and cursor time. Outside a request the hooks return straight away.
+Inside a sampled trace, each statement and each session commit is also a span.
+
+A QueryStats can also count statements per shape, the text with whitespace
+and expanded IN lists folded. The same shape run again and again in one
+request is the N+1 signature. ``query_budget`` uses this in tests.
+"""
+import re
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.tracing import KIND_CLIENT, current_span
+
+# A shape run this many times in one request counts as repeated
+REPEAT_THRESHOLD = 3
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+# "IN (?, ?, ?)" and its pyformat/numeric variants, however many values were expanded
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", " ".join(statement.split()))
+
+
+class QueryStats:
+    """
+    Statements sent and seconds spent waiting on the database for one request
+    (or one ``query_budget`` block). A nested QueryStats also adds to its parent.
+    """
+
+    __slots__ = ("statements", "duration", "shapes", "parent")
+
+    def __init__(self, parent: Optional["QueryStats"] = None, track_shapes: bool = False) -> None:
+        self.statements = 0
+        self.duration = 0.0
+        self.shapes: Optional[Dict[str, int]] = {} if track_shapes else None
+        self.parent = parent
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> Dict[str, int]:
+        """Shapes run at least ``threshold`` times, most frequent first."""
+        counts = sorted((self.shapes or {}).items(), key=lambda item: item[1], reverse=True)
+        return {shape: count for shape, count in counts if count >= threshold}
+
+
+request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_queries.get() is not None:
+        context._query_started = time.perf_counter()
+    parent = current_span.get()
+    if parent is not None:
+        context._trace_span = parent.child(
+            "db.query", KIND_CLIENT, **{"db.system": conn.dialect.name, "db.statement": statement_shape(statement)}
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    query_span = getattr(context, "_trace_span", None)
+    if query_span is not None:
+        query_span.finish()
+    stats = request_queries.get()
+    if stats is None:
+        return
+    started = getattr(context, "_query_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    shape = None
+    while stats is not None:
+        stats.statements += 1
+        stats.duration += elapsed
+        if stats.shapes is not None:
+            if shape is None:
+                shape = statement_shape(statement)
+            stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
+        stats = stats.parent
+
+
+def _on_error(context):
+    query_span = getattr(context.execution_context, "_trace_span", None)
+    if query_span is not None:
+        query_span.error = f"{type(context.original_exception).__name__}: {context.original_exception}"
+        query_span.finish()
+
+
+def _before_commit(session):
+    parent = current_span.get()
+    if parent is not None:
+        session.info["_commit_span"] = parent.child("db.commit", KIND_CLIENT)
+
+
+def _end_commit(session):
+    commit_span = session.info.pop("_commit_span", None)
+    if commit_span is not None:
+        commit_span.finish()
+
+
+def _commit_failed(session):
+    commit_span = session.info.get("_commit_span")
+    if commit_span is not None:
+        commit_span.error = "rolled back"
+    _end_commit(session)
+
+
+def instrument_queries() -> None:
+    """Install the cursor and commit hooks on all engines and sessions; safe to call more than once."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _on_error)
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _end_commit)
+        event.listen(Session, "after_rollback", _commit_failed)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """
+    Fail when the block (or decorated function) sends more than ``statements``
+    statements, or repeats any shape ``threshold`` times or more (unless
+    ``allow_repeats``)::
+
+        with query_budget(4):
+            client.get("/api/bookings", headers=auth)
+
+    ``stats`` holds the counts after the block.
+    """
+
+    def __init__(self, statements: int, allow_repeats: bool = False, threshold: int = REPEAT_THRESHOLD):
+        self.limit = statements
+        self.allow_repeats = allow_repeats
+        self.threshold = threshold
+        self.stats = QueryStats(track_shapes=True)
+        self._token = None
+
+    def __enter__(self) -> "query_budget":
+        instrument_queries()
+        self.stats = QueryStats(parent=request_queries.get(), track_shapes=True)
+        self._token = request_queries.set(self.stats)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        request_queries.reset(self._token)
+        if exc_type is not None:
+            return False
+        problems = []
+        if self.stats.statements > self.limit:
+            problems.append(f"{self.stats.statements} statements, budget {self.limit}")
+        repeated = {} if self.allow_repeats else self.stats.repeated(self.threshold)
+        problems.extend(f"repeated {count}x: {shape[:200]}" for shape, count in repeated.items())
+        if problems:
+            raise QueryBudgetExceeded("Query budget exceeded:\n" + "\n".join(problems))
+        return False
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Date, DateTime, Float, ForeignKey, func
+from sqlalchemy import Column, String, Date, DateTime, Float, ForeignKey, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
 
@@ -15,3 +15,10 @@ class Booking(Base):
     amount = Column(Float, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination of a user's booking history
+        Index("ix_bookings_user_date_id", "user_id", "date", "id"),
+        # Bookings of one trip, e.g. cancelling it
+        Index("ix_bookings_bus_date_status", "bus_id", "date", "status"),
+    )
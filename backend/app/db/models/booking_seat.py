@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, Date, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
 
@@ -9,3 +9,13 @@ class BookingSeat(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     booking_id = Column(UUID(as_uuid=True), ForeignKey("bookings.id"), nullable=False)
     seat_id = Column(UUID(as_uuid=True), ForeignKey("seats.id"), nullable=False)
+
+    # Denormalized from the booking so a seat can be sold once per bus and date
+    bus_id = Column(UUID(as_uuid=True), ForeignKey("buses.id"), nullable=False)
+    travel_date = Column(Date, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("bus_id", "travel_date", "seat_id", name="uq_booking_seats_bus_date_seat"),
+        Index("ix_booking_seats_booking_id", "booking_id"),
+        Index("ix_booking_seats_seat_id", "seat_id"),
+    )
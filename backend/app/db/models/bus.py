@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Time, Float, ForeignKey
+from sqlalchemy import Column, String, Time, Float, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
 
@@ -17,3 +17,8 @@ class Bus(Base):
     duration = Column(String(20), nullable=True)         # e.g. "9h"
     fare = Column(Float, nullable=False)
     rating = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # Route search
+        Index("ix_buses_from_to_city", "from_city_id", "to_city_id"),
+    )
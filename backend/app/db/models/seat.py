@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Float, Boolean, ForeignKey
+from sqlalchemy import Column, String, Float, Boolean, Integer, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
 
@@ -13,3 +13,11 @@ class Seat(Base):
     seat_type = Column(String(50), nullable=False)  # Sleeper / Seater
     price = Column(Float, nullable=False)
     is_available = Column(Boolean, default=True)
+    seat_index = Column(Integer, nullable=False)  # position in the bus's seat order, bit index in Trip.seat_bitmap
+
+    __table_args__ = (
+        UniqueConstraint("bus_id", "seat_index", name="uq_seats_bus_seat_index"),
+        # Index-only scans for the seat layout and search availability queries
+        Index("ix_seats_bus_layout", "bus_id", "seat_index",
+              postgresql_include=["id", "seat_no", "seat_type", "price"]),
+    )
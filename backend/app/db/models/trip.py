@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Date, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Date, String, LargeBinary, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
 
@@ -12,7 +12,10 @@ class Trip(Base):
     departure_time = Column(String(10), nullable=True)  # Override bus default if needed
     arrival_time = Column(String(10), nullable=True)    # Override bus default if needed
     status = Column(String(20), nullable=False, default="ACTIVE")
+    seat_bitmap = Column(LargeBinary, nullable=False, default=b"")  # see app/services/seat_bitmap.py
 
     __table_args__ = (
         UniqueConstraint("bus_id", "service_date", name="uq_trips_bus_date"),
+        # Search by date when the route index is not serving
+        Index("ix_trips_service_date", "service_date"),
     )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base import Base
+
+class UserBookingStats(Base):
+    """Per-user booking aggregates, kept in step with bookings by BookingService."""
+    __tablename__ = "user_booking_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    total_bookings = Column(Integer, nullable=False, default=0)  # every booking ever made, cancelled included
+    confirmed_spend = Column(Float, nullable=False, default=0.0)  # amount of bookings still CONFIRMED
+    cancellations = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,140 @@
+# app/db/pool_metrics.py
+"""
+Connection pool instrumentation.
+
+Engines are built with one of the ``Instrumented*QueuePool`` classes and a
+``pool_logging_name``; ``instrument_engine`` registers a PoolMetrics under
+that name and hooks the pool and error events. ``pool_stats()`` is what the
+internal stats endpoint serves; ``pool_families()`` feeds /api/internal/metrics.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import Counter, Gauge, Histogram, MetricFamily
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self.checkout_wait = Histogram()  # seconds from asking the pool to holding a usable connection
+        self.checkouts = Counter()
+        self.checkout_timeouts = Counter()  # gave up after DB_POOL_TIMEOUT
+        self.overflow_checkouts = Counter()  # checkouts served while the pool was past pool_size
+        self.pre_ping_failures = Counter()
+        self.invalidations = Counter()
+        self.checked_out = Gauge()
+        self.overflow = Gauge()
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool if self.engine is not None else None
+        return {
+            "pool_size": pool.size() if isinstance(pool, QueuePool) else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "timeout": pool.timeout() if isinstance(pool, QueuePool) else None,
+            "checked_out": self.checked_out.snapshot(),
+            "overflow": self.overflow.snapshot(),
+            "checkouts": self.checkouts.snapshot(),
+            "checkout_timeouts": self.checkout_timeouts.snapshot(),
+            "overflow_checkouts": self.overflow_checkouts.snapshot(),
+            "pre_ping_failures": self.pre_ping_failures.snapshot(),
+            "invalidations": self.invalidations.snapshot(),
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+        }
+
+
+_pools: Dict[str, PoolMetrics] = {}
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    metrics = _pools.get(name)
+    if metrics is None:
+        metrics = _pools.setdefault(name, PoolMetrics(name))
+    return metrics
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: metrics.snapshot() for name, metrics in _pools.items()}
+
+
+# (metric name, PoolMetrics attribute, type, help)
+_EXPORTED = (
+    ("db_pool_checked_out", "checked_out", "gauge", "Connections checked out of the pool."),
+    ("db_pool_overflow", "overflow", "gauge", "Connections open past pool_size."),
+    ("db_pool_checkouts_total", "checkouts", "counter", "Connections handed out by the pool."),
+    ("db_pool_checkout_timeouts_total", "checkout_timeouts", "counter", "Checkouts that gave up after DB_POOL_TIMEOUT."),
+    ("db_pool_overflow_checkouts_total", "overflow_checkouts", "counter", "Checkouts served past pool_size."),
+    ("db_pool_pre_ping_failures_total", "pre_ping_failures", "counter", "Pooled connections that failed pre-ping."),
+    ("db_pool_invalidations_total", "invalidations", "counter", "Connections invalidated."),
+    ("db_pool_checkout_wait_seconds", "checkout_wait", "histogram", "Time waiting for a usable connection."),
+)
+
+
+def pool_families() -> List[MetricFamily]:
+    families = []
+    for name, attribute, kind, documentation in _EXPORTED:
+        family = MetricFamily(name, documentation, kind, ("pool",))
+        for pool_name, metrics in _pools.items():
+            family.attach((pool_name,), getattr(metrics, attribute))
+        families.append(family)
+    return families
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout, including queueing, overflow connects and pre-ping."""
+
+    def connect(self):
+        metrics = get_pool_metrics(self.logging_name or "default")
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            metrics.checkout_timeouts.inc()
+            raise
+        metrics.checkout_wait.observe(time.perf_counter() - started)
+        metrics.checkouts.inc()
+        overflow = max(self.overflow(), 0)
+        metrics.overflow.set(overflow)
+        if overflow:
+            metrics.overflow_checkouts.inc()
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    """Attach pool metrics to a sync engine (pass ``async_engine.sync_engine`` for async ones)."""
+    metrics = get_pool_metrics(name)
+    metrics.engine = engine
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checked_out.dec()
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            metrics.overflow.set(max(pool.overflow(), 0))
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations.inc()
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        if context.is_pre_ping:
+            metrics.pre_ping_failures.inc()
+
+    return metrics
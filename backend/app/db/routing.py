@@ -0,0 +1,61 @@
+# app/db/routing.py
+"""
+Read-your-writes tracking for replica routing.
+
+Read-only routes are served from the replica (``get_read_session``), which
+may lag the primary. After a user writes, ``read_your_writes.record_write``
+pins that user's reads to the primary for
+``settings.DB_READ_YOUR_WRITES_SECONDS`` so they see their own booking,
+cancellation or profile change straight away. The window is tracked per
+process, so it should be at least the replica's usual lag.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
+
+
+class ReadYourWrites:
+    def __init__(self, window: Optional[float] = None):
+        self.window = window if window is not None else settings.DB_READ_YOUR_WRITES_SECONDS
+        self._lock = threading.Lock()
+        # Insertion order is expiry order because every write gets the same window
+        self._sticky: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sticky)
+
+    def record_write(self, user_id) -> None:
+        if self.window <= 0:
+            return
+        now = time.monotonic()
+        key = str(user_id)
+        with self._lock:
+            self._evict(now)
+            self._sticky.pop(key, None)
+            self._sticky[key] = now + self.window
+
+    def is_sticky(self, user_id) -> bool:
+        """True while ``user_id``'s reads must go to the primary."""
+        if not self._sticky:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            return str(user_id) in self._sticky
+
+    def active(self) -> bool:
+        """Cheap check that lets anonymous reads skip identifying the caller."""
+        return bool(self._sticky)
+
+    def _evict(self, now: float) -> None:
+        while self._sticky:
+            key, expires_at = next(iter(self._sticky.items()))
+            if expires_at > now:
+                break
+            del self._sticky[key]
+
+
+read_your_writes = ReadYourWrites()
@@ -0,0 +1,32 @@
+# app/db/schema.py
+"""
+Startup schema check for production.
+
+Instead of ``create_all`` (which inspects every table on each worker boot),
+production startup reads ``alembic_version`` once and compares it with the
+revision this build was written against. Keeping the expected head here
+avoids importing Alembic and parsing every migration at boot; a unit test
+keeps it in step with ``migrations/versions``.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# Head of migrations/versions; bump with every new migration
+SCHEMA_REVISION = "a6d2f9c4e317"
+
+
+class SchemaRevisionError(RuntimeError):
+    """Raised when the database is not migrated to SCHEMA_REVISION."""
+
+
+def check_schema_revision(engine: Engine) -> str:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("alembic_version"):
+            raise SchemaRevisionError("Database has no alembic_version table; run `alembic upgrade head`")
+        revisions = conn.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+    if revisions != [SCHEMA_REVISION]:
+        raise SchemaRevisionError(
+            f"Database is at revision {', '.join(revisions) or 'none'} but this build expects "
+            f"{SCHEMA_REVISION}; run `alembic upgrade head`"
+        )
+    return SCHEMA_REVISION
@@ -112,7 +112,7 @@ def seed_database():
         total_seats = 0
         for bus in buses:
             layout = seat_layouts[0]  # Use same layout for all buses for simplicity
-            for seat_no, seat_type in layout:
+            for seat_index, (seat_no, seat_type) in enumerate(layout):
                 # Vary prices based on seat type
                 base_price = bus.fare
                 if seat_type == "Lower":
@@ -125,7 +125,8 @@ def seed_database():
                     bus_id=bus.id,
                     seat_no=seat_no,
                     seat_type=seat_type,
-                    price=round(price, 2)
+                    price=round(price, 2),
+                    seat_index=seat_index
                 )
                 db.add(seat)
                 total_seats += 1
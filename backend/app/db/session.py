@@ -1,16 +1,20 @@
 # app/db/session.py
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool, instrument_engine
 
 # Engine
 engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.SQLALCHEMY_ECHO,
-    pool_pre_ping=True,  # validates connections before using
+    poolclass=InstrumentedQueuePool,
+    pool_logging_name="primary",
     future=True,
+    **settings.DB_POOL_OPTIONS,  # pre-ping validates connections before using
 )
+instrument_engine(engine, "primary")
 
 # Session factory
 SessionLocal = sessionmaker(
@@ -20,6 +24,36 @@ SessionLocal = sessionmaker(
     future=True,
 )
 
+class ReadOnlySession(Session):
+    """Session for read-only routes; flushing ORM changes through it is a routing bug."""
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _reject_flush(session, flush_context, instances):
+    raise RuntimeError("Read-only session cannot write; use the primary session for this route")
+
+
+# Read-only routes use the replica when one is configured, else the primary
+replica_engine = None
+if settings.DB_REPLICA_URL:
+    replica_engine = create_engine(
+        settings.DB_REPLICA_URL,
+        echo=settings.SQLALCHEMY_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name="replica",
+        future=True,
+        **settings.DB_POOL_OPTIONS,
+    )
+    instrument_engine(replica_engine, "replica")
+
+ReadSessionLocal = sessionmaker(
+    bind=replica_engine if replica_engine is not None else engine,
+    class_=ReadOnlySession,
+    autocommit=False,
+    autoflush=False,
+    future=True,
+)
+
 # FastAPI dependency
 def get_db():
     db = SessionLocal()
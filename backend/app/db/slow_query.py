@@ -0,0 +1,242 @@
+# app/db/slow_query.py
+"""
+Slow-query log.
+
+``instrument_slow_queries()`` times every statement on every Engine. Each
+one slower than SLOW_QUERY_MS is logged as a warning with its normalized
+text, the shape of its bind parameters and the route that issued it, and
+aggregated per fingerprint (a hash of the normalized text); ``top()`` serves
+the aggregate on the internal stats endpoint.
+
+SELECTs also get a plan: ``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL,
+``EXPLAIN QUERY PLAN`` on sqlite. A background thread captures it on a
+separate connection, inside a transaction that is rolled back. At most
+SLOW_QUERY_EXPLAINS_PER_MINUTE plans are captured, and at most one per
+fingerprint per SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS; the rest are skipped.
+"""
+import hashlib
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.core.logging import logger, request_context
+from app.db.instrumentation import statement_shape
+
+# Literals left in the SQL text: quoted strings and bare numbers
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_MAX_FINGERPRINTS = 1000
+_MAX_ROUTES = 10
+_SYNC_DRIVERS = {"postgresql": "postgresql+psycopg2", "sqlite": "sqlite"}
+_NUMERIC_PLACEHOLDER = re.compile(r"\$(\d+)")
+
+
+def normalize_statement(statement: str) -> str:
+    return _LITERALS.sub("?", statement_shape(statement))
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Types of the bind parameters, never their values."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class _Fingerprint:
+    __slots__ = ("fingerprint", "statement", "parameters", "count", "total", "max", "routes", "plan", "last_seen")
+
+    def __init__(self, key: str, statement: str, parameters: Any):
+        self.fingerprint = key
+        self.statement = statement
+        self.parameters = parameters
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.routes: Dict[str, int] = {}
+        self.plan: Optional[str] = None
+        self.last_seen = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "parameters": self.parameters,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+            "routes": dict(self.routes),
+            "plan": self.plan,
+            "last_seen": self.last_seen,
+        }
+
+
+class SlowQueryLog:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Fingerprint] = {}
+        self._explain_queue: "queue.Queue" = queue.Queue(maxsize=100)
+        self._explain_thread: Optional[threading.Thread] = None
+        self._explained_at: Dict[str, float] = {}
+        self._explain_times: List[float] = []
+        self._sync_engines: Dict[str, Engine] = {}
+
+    @property
+    def threshold(self) -> float:
+        """Seconds; 0 or less disables the log."""
+        return settings.SLOW_QUERY_MS / 1000
+
+    def record(self, engine: Engine, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+        normalized = normalize_statement(statement)
+        key = fingerprint(normalized)
+        context = request_context.get()
+        route = context.route if context is not None else "-"
+        shape = parameter_shape(parameters, executemany)
+        logger.warning(
+            "Slow query {duration_ms}ms on {route} fingerprint={fingerprint}: {statement}",
+            duration_ms=round(elapsed * 1000, 2), route=route, fingerprint=key,
+            statement=normalized, parameters=shape,
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= _MAX_FINGERPRINTS:
+                    del self._entries[min(self._entries.values(), key=lambda e: e.total).fingerprint]
+                entry = self._entries[key] = _Fingerprint(key, normalized, shape)
+            entry.count += 1
+            entry.total += elapsed
+            entry.max = max(entry.max, elapsed)
+            entry.last_seen = time.time()
+            if route in entry.routes or len(entry.routes) < _MAX_ROUTES:
+                entry.routes[route] = entry.routes.get(route, 0) + 1
+            wants_plan = (settings.SLOW_QUERY_EXPLAIN and not executemany
+                          and normalized.upper().startswith(("SELECT", "WITH")) and self._take_explain_slot(key))
+        if wants_plan:
+            self._queue_explain(engine, key, statement, parameters)
+
+    def _take_explain_slot(self, key: str) -> bool:
+        # Called under the lock
+        now = time.monotonic()
+        if now - self._explained_at.get(key, float("-inf")) < settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        self._explain_times = [t for t in self._explain_times if now - t < 60]
+        if len(self._explain_times) >= settings.SLOW_QUERY_EXPLAINS_PER_MINUTE:
+            return False
+        self._explain_times.append(now)
+        self._explained_at[key] = now
+        return True
+
+    def _queue_explain(self, engine: Engine, key: str, statement: str, parameters: Any) -> None:
+        try:
+            self._explain_queue.put_nowait((engine, key, statement, parameters))
+        except queue.Full:
+            return
+        if self._explain_thread is None:
+            with self._lock:
+                if self._explain_thread is None:
+                    self._explain_thread = threading.Thread(target=self._run_explains, name="slow-query-explain",
+                                                            daemon=True)
+                    self._explain_thread.start()
+
+    def _run_explains(self) -> None:
+        while True:
+            self.explain_next(block=True)
+
+    def explain_next(self, block: bool = False) -> bool:
+        """Capture one queued plan; False when nothing was queued."""
+        try:
+            engine, key, statement, parameters = self._explain_queue.get(block=block)
+        except queue.Empty:
+            return False
+        try:
+            plan = self._explain(engine, statement, parameters)
+        except Exception as e:
+            logger.warning("EXPLAIN failed for slow query {fingerprint}: {error}", fingerprint=key, error=str(e))
+            return True
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.plan = plan
+        logger.info("Plan for slow query {fingerprint}:\n{plan}", fingerprint=key, plan=plan)
+        return True
+
+    def _explain(self, engine: Engine, statement: str, parameters: Any) -> str:
+        if engine.dialect.is_async and engine.dialect.name == "postgresql":
+            # asyncpg's $n placeholders, rewritten for psycopg2
+            order = [int(n) - 1 for n in _NUMERIC_PLACEHOLDER.findall(statement)]
+            statement = _NUMERIC_PLACEHOLDER.sub("%s", statement.replace("%", "%%"))
+            parameters = tuple(parameters[i] for i in order)
+        engine = self._sync_engine(engine)
+        if engine.dialect.name == "postgresql":
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+        else:
+            prefix = "EXPLAIN QUERY PLAN "
+        with engine.connect().execution_options(slow_query_log=False) as conn:
+            # EXPLAIN ANALYZE runs the statement; nothing it does is kept
+            with conn.begin() as transaction:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+                transaction.rollback()
+        return "\n".join(str(row[-1]) for row in rows)
+
+    def _sync_engine(self, engine: Engine) -> Engine:
+        # The sync side of an async engine needs a greenlet, not a thread: plan
+        # through a pool-less sync engine on the same database instead
+        if not engine.dialect.is_async:
+            return engine
+        url = engine.url
+        with self._lock:
+            sync = self._sync_engines.get(str(url))
+            if sync is None:
+                sync = create_engine(url.set(drivername=_SYNC_DRIVERS[engine.dialect.name]), poolclass=NullPool)
+                self._sync_engines[str(url)] = sync
+        return sync
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Fingerprints with the most total time spent, slowest first."""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e.total, reverse=True)[:limit]
+            return [entry.as_dict() for entry in entries]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._explained_at.clear()
+            self._explain_times.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    threshold = slow_query_log.threshold
+    started = getattr(context, "_slow_query_started", None)
+    if threshold > 0 and started is not None and context.execution_options.get("slow_query_log", True):
+        elapsed = time.perf_counter() - started
+        if elapsed >= threshold:
+            slow_query_log.record(conn.engine, statement, parameters, executemany, elapsed)
+
+
+def instrument_slow_queries() -> None:
+    """Time statements on all engines; safe to call more than once."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
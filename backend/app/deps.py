@@ -1,15 +1,19 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from app.core.security import verify_token
-from app.services.user_service import UserService
-from app.db.session import get_db
+from app.core.tracing import span
+from app.services.user_service import AsyncUserService
+from app.db.async_session import DBSession, get_session, open_session
+from app.db.routing import read_your_writes
+from app.config import settings
+import hmac
 import uuid
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login/verify-otp")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = verify_token(token)
+async def _authenticate(token: str, db: DBSession):
+    with span("auth.verify_token"):
+        payload = verify_token(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -24,12 +28,55 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    service = UserService(db)
-    user = service.get_user_by_id(uuid.UUID(user_id))
+    service = AsyncUserService(db)
+    user = await service.get_user_by_id(uuid.UUID(user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Detach so commits and rollbacks later in the request never expire it:
+    # an expired instance would have to lazy-load, which AsyncSession forbids
+    db.expunge(user)
     return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_session)):
+    """The caller, loaded through the route's primary session (``get_session``)."""
+    return await _authenticate(token, db)
+
+async def get_read_session(request: Request):
+    """
+    Session for read-only routes: the replica, unless the caller wrote within
+    the read-your-writes window, in which case the primary.
+    """
+    read_only = True
+    authorization = request.headers.get("Authorization")
+    # Identifying the caller costs a token decode, so only do it while someone is pinned
+    if authorization and read_your_writes.active():
+        scheme, _, token = authorization.partition(" ")
+        payload = verify_token(token) if scheme.lower() == "bearer" else None
+        if payload and payload.get("sub") and read_your_writes.is_sticky(payload["sub"]):
+            read_only = False
+    async with open_session(read_only=read_only) as db:
+        yield db
+
+async def get_current_reader(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_read_session)):
+    """
+    ``get_current_user`` for read-only routes: the caller is loaded through
+    the route's ``get_read_session`` session, so the request opens one session
+    instead of a primary session for auth next to the replica one.
+    """
+    return await _authenticate(token, db)
+
+def require_operator(x_operator_key: str = Header(None)):
+    if not settings.OPERATOR_API_KEY:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operator API is disabled")
+    if not x_operator_key or not hmac.compare_digest(x_operator_key, settings.OPERATOR_API_KEY):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid operator key")
+
+def require_internal_token(x_internal_token: str = Header(None)):
+    if not settings.INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Internal API is disabled")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid internal token")
@@ -1,26 +1,114 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from app.routes import user_routes, auth_routes, city_routes, bus_routes, booking_routes
-from app.db.session import init_db
+from app.routes import user_routes, auth_routes, city_routes, bus_routes, booking_routes, hold_routes, operator_routes, internal_routes
+from app.db.session import init_db, engine, SessionLocal
+from app.db.async_session import AsyncSyncSession, dispose_async_engine, open_session
+from app.db.schema import check_schema_revision
+from app.services.city_catalog import city_catalog
+from app.services.route_index import route_index
+from app.services.warmup import AsyncStatementWarmup
+from app.config import settings
 from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 from app.core.logging import logger
+from app.core.middleware import (
+    CompressionMiddleware, MemoryTrackingMiddleware, MetricsMiddleware, ProfilingMiddleware, QueryDebugMiddleware, RequestLoggingMiddleware, TracingMiddleware,
+)
+from app.core.tracing import shutdown_tracing
+from app.core.profiler import profiler
+from app.core.static_files import PrecompressedStaticFiles
+from app.db.instrumentation import instrument_queries
+from app.db.slow_query import instrument_slow_queries
+import asyncio
 import os
 from pathlib import Path
 
+def build_route_index():
+    with SessionLocal() as db:
+        route_index.rebuild(db)
+    route_index.attach(SessionLocal)
+    route_index.attach(AsyncSyncSession)
+
+def check_route_index():
+    """Self-check the route index and rebuild it if it drifted from the database."""
+    with SessionLocal() as db:
+        report = route_index.verify(db)
+        if not report["consistent"]:
+            logger.warning(
+                "Route index drift detected missing={missing} unexpected={unexpected} stale={stale} "
+                "missing_trips={missing_trips} unexpected_trips={unexpected_trips}",
+                missing=len(report["missing_buses"]), unexpected=len(report["unexpected_buses"]),
+                stale=len(report["stale_buses"]), missing_trips=len(report["missing_trips"]),
+                unexpected_trips=len(report["unexpected_trips"]),
+            )
+            route_index.rebuild(db)
+
+async def refresh_route_index(interval: int):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(check_route_index)
+        except Exception as e:
+            logger.exception("Route index self-check failed: {error}", error=e)
+
+async def run_route_index(interval: int):
+    """Build the route index off the event loop, then keep self-checking it."""
+    try:
+        await run_in_threadpool(build_route_index)
+    except Exception as e:
+        logger.exception("Route index build failed, searches will use the database: {error}", error=e)
+        return
+    if interval > 0:
+        await refresh_route_index(interval)
+
+async def warm_statement_caches():
+    # The replica has its own engine, and so its own compiled statement cache
+    for read_only in ((False, True) if settings.DB_REPLICA_URL else (False,)):
+        async with open_session(read_only=read_only) as db:
+            await AsyncStatementWarmup(db).warm()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # on startup
-    try:
-        init_db()
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.exception("Database initialization failed: {error}", error=e)
-        logger.warning("Server will continue with mock data")
+    production = settings.ENVIRONMENT == "production"
+    if production:
+        # Migrations are Alembic's job; refuse to serve an unmigrated schema
+        revision = check_schema_revision(engine)
+        logger.info("Database schema at revision {revision}", revision=revision)
+        try:
+            await warm_statement_caches()
+        except Exception as e:
+            logger.exception("Statement cache warm-up failed: {error}", error=e)
+    else:
+        try:
+            init_db()
+            logger.info("Database initialized successfully")
+        except Exception as e:
+            logger.exception("Database initialization failed: {error}", error=e)
+            logger.warning("Server will continue with mock data")
+
+    refresh_task = None
+    if settings.ROUTE_INDEX_ENABLED and production:
+        # Searches use the database until the index is ready, so readiness doesn't wait for it
+        refresh_task = asyncio.create_task(run_route_index(settings.ROUTE_INDEX_REFRESH_SECONDS))
+    elif settings.ROUTE_INDEX_ENABLED:
+        try:
+            build_route_index()
+            if settings.ROUTE_INDEX_REFRESH_SECONDS > 0:
+                refresh_task = asyncio.create_task(refresh_route_index(settings.ROUTE_INDEX_REFRESH_SECONDS))
+        except Exception as e:
+            logger.exception("Route index build failed, searches will use the database: {error}", error=e)
     yield
     # on shutdown
+    if refresh_task is not None:
+        refresh_task.cancel()
+    await dispose_async_engine()
+    await run_in_threadpool(shutdown_tracing)
+    # Save a profiling window that is still running
+    await run_in_threadpool(profiler.stop)
     logger.info("Shutting down application")
+    # Let the queued sinks drain before the process exits
+    await logger.complete()
 
 app = FastAPI(title="Bus Booking API", lifespan=lifespan)
 
@@ -32,6 +120,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+# Added last so they wrap everything, CORS preflights included
+instrument_queries()
+instrument_slow_queries()
+# Each worker's city catalog follows its own writes; CITY_CACHE_TTL_SECONDS covers the rest
+city_catalog.attach(SessionLocal)
+city_catalog.attach(AsyncSyncSession)
+if settings.ENVIRONMENT == "development":
+    app.add_middleware(QueryDebugMiddleware)
+if settings.PROFILER_SECRET:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MemoryTrackingMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLoggingMiddleware)
 
 # Register API routes under /api prefix
 logger.info("Registering routers")
@@ -40,6 +144,9 @@ app.include_router(user_routes.router)
 app.include_router(city_routes.router)
 app.include_router(bus_routes.router)
 app.include_router(booking_routes.router)
+app.include_router(hold_routes.router)
+app.include_router(operator_routes.router)
+app.include_router(internal_routes.router)
 logger.info("Routers registered")
 
 # Static files configuration
@@ -49,11 +156,12 @@ INDEX_FILE = STATIC_DIR / "index.html"
 # Create static directory if it doesn't exist
 STATIC_DIR.mkdir(exist_ok=True)
 
-# Mount static files for assets (CSS, JS, images, etc.)
+# Mount static files for assets (CSS, JS, images, etc.); Vite hashes every file name under assets/
+static_files = PrecompressedStaticFiles(directory=str(STATIC_DIR))
 if STATIC_DIR.exists() and (STATIC_DIR / "assets").exists():
-    app.mount("/assets", StaticFiles(directory=str(STATIC_DIR / "assets")), name="assets")
+    app.mount("/assets", PrecompressedStaticFiles(directory=str(STATIC_DIR / "assets"), immutable=True), name="assets")
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.mount("/static", static_files, name="static")
     logger.info(f"Static files mounted from {STATIC_DIR}")
 
 # Catch-all route for SPA (Single Page Application)
@@ -69,7 +177,7 @@ async def serve_spa(request: Request, full_path: str):
     
     # Serve index.html for all other routes (SPA routing)
     if INDEX_FILE.exists():
-        return FileResponse(str(INDEX_FILE))
+        return static_files.file_response(INDEX_FILE, INDEX_FILE.stat(), request.scope)
     else:
         return {"message": "Frontend not built yet. Please build the React app first."}
 
@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.async_session import DBSession, get_session
 from app.schemas.auth import OTPRequest, OTPVerify, Token
-from app.services.auth_service import AuthService
+from app.services.auth_service import AsyncAuthService
+from app.db.routing import read_your_writes
 from app.core.logging import logger
 
 router = APIRouter(prefix="/api/login", tags=["auth"])
 
 @router.post("/request-otp")
-def request_otp(otp_in: OTPRequest, db: Session = Depends(get_db)):
+async def request_otp(otp_in: OTPRequest, db: DBSession = Depends(get_session)):
     try:
-        service = AuthService(db)
-        result = service.request_otp(otp_in)
+        service = AsyncAuthService(db)
+        result = await service.request_otp(otp_in)
         logger.info("OTP requested for phone={phone}", phone=f"{otp_in.country_code}{otp_in.phone}")
         return {"success": True, "message": f"OTP sent to {otp_in.country_code}{otp_in.phone}", "otp_id": result["otp_id"]}
     except Exception as e:
@@ -19,9 +19,9 @@ def request_otp(otp_in: OTPRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to request OTP")
 
 @router.post("/verify-otp", response_model=Token)
-def verify_otp(otp_in: OTPVerify, db: Session = Depends(get_db)):
-    service = AuthService(db)
-    result = service.verify_otp(otp_id=otp_in.otp_id, otp_code=otp_in.otp)
+async def verify_otp(otp_in: OTPVerify, db: DBSession = Depends(get_session)):
+    service = AsyncAuthService(db)
+    result = await service.verify_otp(otp_id=otp_in.otp_id, otp_code=otp_in.otp)
     if not result:
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
     
@@ -31,5 +31,7 @@ def verify_otp(otp_in: OTPVerify, db: Session = Depends(get_db)):
         "phone": result["user"].phone,
         "email": result["user"].email,
     }
+    # Login may have just created the user; keep their next reads on the primary
+    read_your_writes.record_write(result["user"].id)
     logger.info("OTP verified for user_id={user_id}", user_id=user_dict["id"])
     return {"token": result["token"], "user": user_dict}
\ No newline at end of file
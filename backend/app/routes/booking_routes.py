@@ -1,29 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse
+from typing import Literal, Optional
+from app.db.async_session import DBSession, get_session
 from app.schemas.booking import BookingCreate, BookingResponse, BookingListResponse, CancelBookingResponse
-from app.services.booking_service import BookingService
+from app.services.booking_service import AsyncBookingService, SeatConflictError, BookingContentionError
 from app.db.models.user import User
-from app.deps import get_current_user
+from app.deps import get_current_user, get_current_reader, get_read_session
+from app.db.routing import read_your_writes
 from app.core.logging import logger
+from app.core.responses import model_response
+from app.core.idempotency import (
+    get_idempotency_store, StoredResponse, IdempotencyKeyReuseError, IdempotencyInProgressError,
+)
+import hashlib
 
 router = APIRouter(prefix="/api", tags=["bookings"])
 
 @router.post("/book", response_model=BookingResponse, status_code=201)
-def book_ticket(
+async def book_ticket(
     booking_data: BookingCreate, 
-    db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    db: DBSession = Depends(get_session), 
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Book a ticket - requires authentication
+
+    With an Idempotency-Key header, repeats of the same request by the same
+    user get the stored result of the first one (marked with an
+    Idempotent-Replayed header) instead of creating another booking.
     """
+    if idempotency_key is None:
+        return await _create_booking(booking_data, db, current_user)
+    if not 0 < len(idempotency_key) <= 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 characters")
+
+    fingerprint = hashlib.sha256(booking_data.model_dump_json().encode()).hexdigest()
+    try:
+        stored, replayed = await get_idempotency_store().execute(
+            f"{current_user.id}:{idempotency_key}",
+            fingerprint,
+            lambda: _create_booking_stored(booking_data, db, current_user),
+        )
+    except IdempotencyKeyReuseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+
+    if replayed:
+        logger.info("Replaying booking response for user={user_id} key={key}", user_id=current_user.id, key=idempotency_key)
+        return JSONResponse(stored.body, status_code=stored.status_code,
+                            headers={**stored.headers, "Idempotent-Replayed": "true"})
+    return stored.body
+
+async def _create_booking_stored(booking_data: BookingCreate, db: DBSession, current_user: User) -> StoredResponse:
+    booking = await _create_booking(booking_data, db, current_user)
+    return StoredResponse(201, BookingResponse.model_validate(booking).model_dump(mode="json"), {})
+
+async def _create_booking(booking_data: BookingCreate, db: DBSession, current_user: User):
     try:
         logger.info("Booking request received for user={user_id}", user_id=current_user.id)
-        service = BookingService(db)
-        booking = service.create_booking(booking_data, current_user)
+        service = AsyncBookingService(db)
+        booking = await service.create_booking(booking_data, current_user)
+        read_your_writes.record_write(current_user.id)
         logger.info("Booking created successfully booking_id={booking_id}", booking_id=booking["booking_id"])
         return booking
+    except SeatConflictError as e:
+        logger.warning("Booking conflict for user={user_id} seats={seats}", user_id=current_user.id, seats=e.seats)
+        raise HTTPException(status_code=409, detail={"message": str(e), "seats": e.seats})
+    except BookingContentionError as e:
+        logger.warning("Booking contention for user={user_id}: {error}", user_id=current_user.id, error=str(e))
+        raise HTTPException(status_code=503, detail="Seats are in high demand, please retry", headers={"Retry-After": "1"})
     except HTTPException:
         raise
     except Exception as e:
@@ -31,7 +78,7 @@ def book_ticket(
         raise HTTPException(status_code=500, detail=f"Booking failed: {str(e)}")
 
 @router.get("/debug", response_model=dict)
-def debug_auth(current_user: User = Depends(get_current_user)):
+async def debug_auth(current_user: User = Depends(get_current_reader)):
     """
     Simple debug endpoint to test authentication
     """
@@ -43,19 +90,25 @@ def debug_auth(current_user: User = Depends(get_current_user)):
     }
 
 @router.get("/bookings", response_model=BookingListResponse)
-def get_my_bookings(
-    db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+async def get_my_bookings(
+    request: Request,
+    booking_filter: Optional[Literal["upcoming", "past", "cancelled"]] = Query(None, alias="filter"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_read_session), 
+    current_user: User = Depends(get_current_reader)
 ):
     """
-    Get all bookings for the authenticated user
+    Get the authenticated user's bookings, one page at a time
     """
     try:
         logger.info("Fetching bookings for user={user_id}", user_id=current_user.id)
-        service = BookingService(db)
-        bookings = service.get_user_bookings(current_user)
-        logger.info("Found {count} bookings for user={user_id}", count=len(bookings), user_id=current_user.id)
-        return {"bookings": bookings}
+        service = AsyncBookingService(db)
+        page = await service.get_user_bookings(current_user, booking_filter, cursor, limit)
+        logger.info("Found {count} bookings for user={user_id}", count=len(page.bookings), user_id=current_user.id)
+        return model_response(request, BookingListResponse, page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -63,9 +116,9 @@ def get_my_bookings(
         raise HTTPException(status_code=500, detail="Failed to fetch bookings")
 
 @router.delete("/bookings/{booking_id}", response_model=CancelBookingResponse)
-def cancel_booking(
+async def cancel_booking(
     booking_id: str,
-    db: Session = Depends(get_db), 
+    db: DBSession = Depends(get_session), 
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -74,8 +127,9 @@ def cancel_booking(
     try:
         logger.info("Cancel booking request received for user={user_id} booking_id={booking_id}", 
                    user_id=current_user.id, booking_id=booking_id)
-        service = BookingService(db)
-        result = service.cancel_booking(booking_id, current_user)
+        service = AsyncBookingService(db)
+        result = await service.cancel_booking(booking_id, current_user)
+        read_your_writes.record_write(current_user.id)
         logger.info("Booking cancelled successfully booking_id={booking_id}", booking_id=booking_id)
         return result
     except ValueError as e:
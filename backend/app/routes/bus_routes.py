@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.schemas.bus import BusSearchRequest, BusSearchResponse, SeatLayoutResponse
-from app.services.bus_service import BusService
+from app.services.bus_service import AsyncBusService
+from app.db.async_session import DBSession
+from app.deps import get_read_session
 from datetime import date
 from typing import Optional
 from app.core.logging import logger
+from app.core.responses import model_response
 
 router = APIRouter(prefix="/api", tags=["buses"])
 
@@ -39,16 +42,17 @@ def debug_seats(bus_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to fetch seats for debug")
 
 @router.post("/search-buses", response_model=BusSearchResponse)
-def search_buses(search_request: BusSearchRequest, db: Session = Depends(get_db)):
+async def search_buses(request: Request, search_request: BusSearchRequest, db: DBSession = Depends(get_read_session)):
     """
     Search for buses based on route and date
     """
     try:
-        service = BusService(db)
-        buses = service.search_buses(search_request)
+        service = AsyncBusService(db)
+        buses = await service.search_buses(search_request)
         if not buses:
             return {"buses": [], "message": "No buses found for the selected route and date"}
-        return {"buses": buses, "message": f"Found {len(buses)} buses for your journey"}
+        response = BusSearchResponse.model_construct(buses=buses, message=f"Found {len(buses)} buses for your journey")
+        return model_response(request, BusSearchResponse, response)
     except HTTPException:
         raise
     except Exception as e:
@@ -56,20 +60,22 @@ def search_buses(search_request: BusSearchRequest, db: Session = Depends(get_db)
         raise HTTPException(status_code=500, detail="Failed to search buses")
 
 @router.get("/bus/{bus_id}/seats", response_model=SeatLayoutResponse)
-def get_seat_layout(
+async def get_seat_layout(
+    request: Request,
     bus_id: str, 
     travel_date: Optional[date] = Query(None, description="Travel date to check seat availability"),
-    db: Session = Depends(get_db)
+    hold_token: Optional[str] = Query(None, description="Caller's seat hold; its seats are shown as available"),
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Get seat layout for a specific bus with real-time availability
     """
     try:
-        service = BusService(db)
-        seat_layout = service.get_seat_layout(bus_id, travel_date)
+        service = AsyncBusService(db)
+        seat_layout = await service.get_seat_layout(bus_id, travel_date, hold_token)
         if not seat_layout:
             raise HTTPException(status_code=404, detail="Invalid bus ID")
-        return seat_layout
+        return model_response(request, SeatLayoutResponse, seat_layout)
     except HTTPException:
         raise
     except Exception as e:
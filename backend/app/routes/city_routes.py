@@ -1,21 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.db.async_session import DBSession, get_session
 from app.schemas.city import CityListResponse
-from app.services.city_service import CityService
+from app.services.city_service import AsyncCityService
+from app.config import settings
+from app.core.http_cache import etag_matches
 from app.core.logging import logger
 
 router = APIRouter(prefix="/api", tags=["cities"])
 
+def _cache_control() -> str:
+    return f"public, max-age={settings.CITY_CACHE_MAX_AGE_SECONDS}"
+
+# The catalog is loaded from the primary rather than through get_read_session:
+# it is invalidated by commits on the primary, and a snapshot read from a
+# lagging replica right after one would be cached for CITY_CACHE_TTL_SECONDS.
+# Loads are rare, one per worker per TTL, so they cost the primary little.
+
 @router.get("/cities", response_model=CityListResponse)
-def get_cities(db: Session = Depends(get_db)):
+async def get_cities(request: Request, response: Response, db: DBSession = Depends(get_session)):
     """
-    Get all available cities
+    Get all available cities, with a strong ETag; answers 304 to a matching If-None-Match
     """
     try:
-        service = CityService(db)
-        cities = service.get_all_cities()
-        return {"cities": cities}
+        catalog = await AsyncCityService(db).get_catalog()
     except Exception as e:
         logger.exception("Failed to fetch cities: {error}", error=e)
         raise HTTPException(status_code=500, detail="Failed to fetch cities")
+    if catalog is None:
+        # Database unavailable: an empty list, which must not be cached
+        response.headers["Cache-Control"] = "no-store"
+        return {"cities": []}
+    headers = {"ETag": catalog.etag, "Cache-Control": _cache_control()}
+    if etag_matches(request.headers.get("If-None-Match"), catalog.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {"cities": catalog.cities}
+
+@router.get("/cities/search", response_model=CityListResponse)
+async def search_cities(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Start of a word in the city name"),
+    limit: int = Query(10, ge=1, le=50),
+    db: DBSession = Depends(get_session),
+):
+    """
+    City autocomplete: cities with a word starting with q, in name order
+    """
+    try:
+        catalog = await AsyncCityService(db).get_catalog()
+    except Exception as e:
+        logger.exception("Failed to search cities: {error}", error=e)
+        raise HTTPException(status_code=500, detail="Failed to search cities")
+    if catalog is None:
+        response.headers["Cache-Control"] = "no-store"
+        return {"cities": []}
+    response.headers["Cache-Control"] = _cache_control()
+    return {"cities": catalog.search(q, limit)}
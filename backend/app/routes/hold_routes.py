@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.db.async_session import DBSession, get_session
+from app.schemas.hold import SeatHoldCreate, SeatHoldResponse, ReleaseHoldResponse
+from app.services.seat_hold_service import AsyncSeatHoldService, SeatHoldNotFoundError
+from app.services.booking_service import SeatConflictError
+from app.db.models.user import User
+from app.deps import get_current_user
+from app.core.logging import logger
+
+router = APIRouter(prefix="/api", tags=["holds"])
+
+@router.post("/holds", response_model=SeatHoldResponse, status_code=201)
+async def hold_seats(
+    hold_data: SeatHoldCreate,
+    db: DBSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Hold seats during checkout - requires authentication
+    """
+    try:
+        service = AsyncSeatHoldService(db)
+        return await service.hold_seats(hold_data, current_user)
+    except SeatConflictError as e:
+        logger.warning("Hold conflict for user={user_id} seats={seats}", user_id=current_user.id, seats=e.seats)
+        raise HTTPException(status_code=409, detail={"message": str(e), "seats": e.seats})
+    except ValueError as e:
+        logger.warning("Invalid hold request: {error}", error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to hold seats: {error}", error=e)
+        raise HTTPException(status_code=500, detail="Failed to hold seats")
+
+@router.put("/holds/{hold_token}", response_model=SeatHoldResponse)
+async def extend_hold(
+    hold_token: str,
+    db: DBSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Extend a seat hold by another TTL - requires authentication and ownership
+    """
+    try:
+        service = AsyncSeatHoldService(db)
+        return await service.extend_hold(hold_token, current_user)
+    except SeatHoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to extend seat hold: {error}", error=e)
+        raise HTTPException(status_code=500, detail="Failed to extend seat hold")
+
+@router.delete("/holds/{hold_token}", response_model=ReleaseHoldResponse)
+async def release_hold(
+    hold_token: str,
+    db: DBSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Release a seat hold - requires authentication and ownership
+    """
+    try:
+        service = AsyncSeatHoldService(db)
+        return await service.release_hold(hold_token, current_user)
+    except SeatHoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to release seat hold: {error}", error=e)
+        raise HTTPException(status_code=500, detail="Failed to release seat hold")
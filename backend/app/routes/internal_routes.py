@@ -0,0 +1,149 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Literal, Optional
+import os
+from app.core.metrics import render_prometheus
+from app.core.memory import PEAK_ALLOCATION, memory_profiler, route_peaks
+from app.core.middleware import HTTP_FAMILIES
+from app.core.profiler import ProfilerBusyError, profiler
+from app.db.pool_metrics import pool_families, pool_stats
+from app.db.slow_query import slow_query_log
+from app.config import settings
+from app.deps import require_internal_token
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(prefix="/api/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+@router.get("/stats/db-pool")
+def db_pool_stats():
+    """
+    Connection pool gauges, counters and checkout wait histogram per engine - requires the internal token
+    """
+    return {"pools": pool_stats()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Request, SQL and connection pool metrics in Prometheus text format - requires the internal token
+    (set it as an X-Internal-Token scrape header)
+    """
+    return PlainTextResponse(render_prometheus([*HTTP_FAMILIES, PEAK_ALLOCATION, *pool_families()]),
+                             media_type=PROMETHEUS_CONTENT_TYPE)
+
+@router.get("/stats/slow-queries")
+def slow_queries(limit: int = Query(20, ge=1, le=200)):
+    """
+    Statements over SLOW_QUERY_MS, aggregated by fingerprint, most total time first - requires the internal token
+    """
+    return {"threshold_ms": settings.SLOW_QUERY_MS, "statements": slow_query_log.top(limit)}
+
+@router.post("/profile", status_code=201)
+def start_profile(
+    seconds: float = Query(30.0, gt=0),
+    mode: Literal["wall", "cpu"] = Query("wall"),
+):
+    """
+    Profile all traffic for a time window - requires the internal token
+    """
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}")
+    try:
+        name = profiler.start_window(seconds, mode)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"profile": name, "mode": mode, "seconds": seconds}
+
+@router.delete("/profile")
+def stop_profile():
+    """
+    End the running profile early and save it - requires the internal token
+    """
+    path = profiler.stop()
+    if path is None:
+        raise HTTPException(status_code=404, detail="No profile is running")
+    return {"profile": os.path.basename(path)}
+
+@router.get("/profiles")
+def list_profiles():
+    """
+    Saved profiles, newest first - requires the internal token
+    """
+    return {"running": profiler.current, "profiles": profiler.list_profiles()}
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """
+    A saved profile in collapsed-stack format - requires the internal token
+    """
+    path = profiler.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+MemoryKey = Literal["lineno", "filename", "traceback"]
+
+@router.post("/memory/start")
+def start_memory_tracing(frames: int = Query(10, ge=1, le=100)):
+    """
+    Start tracemalloc (and take a "start" snapshot) - requires the internal token
+    """
+    return memory_profiler.start(frames)
+
+@router.post("/memory/stop")
+def stop_memory_tracing():
+    """
+    Stop tracemalloc and drop its snapshots - requires the internal token
+    """
+    return memory_profiler.stop()
+
+@router.get("/memory")
+def memory_status():
+    """
+    Traced and resident memory, snapshots held and per-route peak allocation - requires the internal token
+    """
+    return {**memory_profiler.status(), "routes": route_peaks()}
+
+@router.post("/memory/snapshots", status_code=201)
+def take_memory_snapshot(name: Optional[str] = Query(None, max_length=64)):
+    """
+    Keep a snapshot of the live heap for later diffs - requires the internal token
+    """
+    try:
+        return {"snapshot": memory_profiler.take_snapshot(name)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/memory/top")
+def memory_top(
+    key: MemoryKey = Query("lineno"),
+    limit: int = Query(20, ge=1, le=200),
+    snapshot: Optional[str] = Query(None, description="a kept snapshot; the live heap when omitted"),
+):
+    """
+    Largest allocation sites - requires the internal token
+    """
+    try:
+        return {"key": key, "stats": memory_profiler.top(key, limit, snapshot)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No snapshot named {snapshot}")
+
+@router.get("/memory/diff")
+def memory_diff(
+    since: str = Query("start"),
+    until: Optional[str] = Query(None, description="a kept snapshot; the live heap when omitted"),
+    key: MemoryKey = Query("lineno"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    Allocation sites that grew the most between two snapshots - requires the internal token
+    """
+    try:
+        return {"since": since, "until": until or "now", "key": key,
+                "stats": memory_profiler.diff(since, until, key, limit)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"No snapshot named {e.args[0]}")
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.db.async_session import DBSession, get_session
+from app.schemas.booking import TripCancellationResponse
+from app.services.booking_service import AsyncBookingService
+from app.deps import require_operator
+from app.core.logging import logger
+from datetime import date
+
+router = APIRouter(prefix="/api/operator", tags=["operator"], dependencies=[Depends(require_operator)])
+
+@router.post("/trips/{bus_id}/{travel_date}/cancel", response_model=TripCancellationResponse)
+async def cancel_trip(bus_id: str, travel_date: date, db: DBSession = Depends(get_session)):
+    """
+    Cancel a trip and every booking on it - requires the operator key
+    """
+    try:
+        logger.info("Trip cancel request received bus_id={bus_id} travel_date={travel_date}",
+                    bus_id=bus_id, travel_date=travel_date)
+        service = AsyncBookingService(db)
+        return await service.cancel_trip(bus_id, travel_date)
+    except ValueError as e:
+        logger.warning("Invalid trip cancel request: {error}", error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to cancel trip: {error}", error=e)
+        raise HTTPException(status_code=500, detail=f"Failed to cancel trip: {str(e)}")
@@ -1,20 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.async_session import DBSession, get_session
 from app.schemas.user import UserUpdate, UserResponse, UserProfileResponse
-from app.services.user_service import UserService
+from app.services.user_service import AsyncUserService
 from app.db.models.user import User
-from app.deps import get_current_user
+from app.deps import get_current_user, get_current_reader, get_read_session
+from app.db.routing import read_your_writes
 from app.core.logging import logger
 
 router = APIRouter(prefix="/api/me", tags=["users"])
 
 @router.get("/", response_model=UserResponse)
-def get_my_profile(current_user: User = Depends(get_current_user)):
+async def get_my_profile(current_user: User = Depends(get_current_reader)):
     return current_user
 
 @router.get("/debug", response_model=dict)
-def debug_auth(current_user: User = Depends(get_current_user)):
+async def debug_auth(current_user: User = Depends(get_current_reader)):
     """
     Simple debug endpoint to test authentication
     """
@@ -26,23 +26,24 @@ def debug_auth(current_user: User = Depends(get_current_user)):
     }
 
 @router.get("/profile", response_model=UserProfileResponse)
-def get_my_enhanced_profile(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_my_enhanced_profile(db: DBSession = Depends(get_read_session), current_user: User = Depends(get_current_reader)):
     """
     Get enhanced profile with wallet, total spent, and personal details status
     """
     try:
-        service = UserService(db)
-        profile = service.get_user_profile(user_id=current_user.id)
+        service = AsyncUserService(db)
+        profile = await service.get_user_profile(user_id=current_user.id)
         return profile
     except Exception as e:
         logger.exception("Failed to load enhanced profile: {error}", error=e)
         raise HTTPException(status_code=500, detail="Failed to load profile")
 
 @router.put("/", response_model=UserResponse)
-def update_my_profile(user_in: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_my_profile(user_in: UserUpdate, db: DBSession = Depends(get_session), current_user: User = Depends(get_current_user)):
     try:
-        service = UserService(db)
-        user = service.update_user(user_id=current_user.id, user_in=user_in)
+        service = AsyncUserService(db)
+        user = await service.update_user(user_id=current_user.id, user_in=user_in)
+        read_your_writes.record_write(current_user.id)
         return user
     except Exception as e:
         logger.exception("Failed to update profile: {error}", error=e)
@@ -18,6 +18,7 @@ class BookingCreate(BaseModel):
     passenger_details: Optional[List[PassengerDetail]] = Field(default=[], json_schema_extra={"example": []})
     contact: Optional[ContactInfo] = Field(default=None, json_schema_extra={"example": {"phone": "", "email": ""}})
     payment_mode: Optional[str] = Field(None, json_schema_extra={"example": "CARD"})
+    hold_token: Optional[str] = Field(None, json_schema_extra={"example": "kq1X4lH8n6Yc0u6pR3dG7w"})
 
 class BookingResponse(BaseModel):
     booking_id: str = Field(..., json_schema_extra={"example": "BKG003"})
@@ -27,23 +28,29 @@ class BookingResponse(BaseModel):
     bus_id: str = Field(..., json_schema_extra={"example": "BUS101"})
     travel_date: str = Field(..., json_schema_extra={"example": "2025-09-01"})
 
+class BookingListItem(BaseModel):
+    booking_id: str = Field(..., json_schema_extra={"example": "BKG001"})
+    bus_name: str = Field(..., json_schema_extra={"example": "VRL Travels"})
+    from_city: str = Field(..., json_schema_extra={"example": "Bangalore"})
+    to_city: str = Field(..., json_schema_extra={"example": "Hyderabad"})
+    date: str = Field(..., json_schema_extra={"example": "2025-09-01"})
+    seats: List[str] = Field(..., json_schema_extra={"example": ["A1", "A2"]})
+    status: str = Field(..., json_schema_extra={"example": "CONFIRMED"})
+    amount: float = Field(..., json_schema_extra={"example": 1800})
+
 class BookingListResponse(BaseModel):
-    bookings: List[dict] = Field(..., json_schema_extra={
-        "example": [
-            {
-                "booking_id": "BKG001",
-                "bus_name": "VRL Travels",
-                "from_city": "Bangalore",
-                "to_city": "Hyderabad",
-                "travel_date": "2025-09-01",
-                "seats": ["A1", "A2"],
-                "status": "CONFIRMED",
-                "amount": 1800
-            }
-        ]
-    })
+    bookings: List[BookingListItem] = Field(..., json_schema_extra={"example": []})
+    next_cursor: Optional[str] = Field(None, json_schema_extra={"example": "MjAyNS0wOS0wMXwuLi4="})
 
 class CancelBookingResponse(BaseModel):
     message: str = Field(..., json_schema_extra={"example": "Booking cancelled successfully"})
     booking_id: str = Field(..., json_schema_extra={"example": "BKG001"})
     status: str = Field(..., json_schema_extra={"example": "CANCELLED"})
+
+class TripCancellationResponse(BaseModel):
+    bus_id: str = Field(..., json_schema_extra={"example": "2c347a5d-b0ac-4b88-8fe8-5bc79765193d"})
+    travel_date: str = Field(..., json_schema_extra={"example": "2025-09-01"})
+    status: str = Field(..., json_schema_extra={"example": "CANCELLED"})
+    cancelled_booking_ids: List[str] = Field(..., json_schema_extra={"example": ["BKG001", "BKG002"]})
+    seats_released: int = Field(..., json_schema_extra={"example": 3})
+    refund_amount: float = Field(..., json_schema_extra={"example": 2700})
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date as date_type
 import uuid
 
@@ -8,6 +8,7 @@ class BusSearchRequest(BaseModel):
     to_city_id: uuid.UUID = Field(..., json_schema_extra={"example": "7a8ee8c1-689a-42f3-901c-167723fee657"})
     date: Optional[date_type] = Field(None, json_schema_extra={"example": "2025-09-01"})
     travel_date: Optional[date_type] = Field(None, json_schema_extra={"example": "2025-09-01"})
+    hide_sold_out: bool = Field(False, json_schema_extra={"example": False})
     
     @property
     def actual_date(self) -> date_type:
@@ -22,6 +23,8 @@ class BusResponse(BaseModel):
     duration: str = Field(..., json_schema_extra={"example": "9h"})
     fare: float = Field(..., json_schema_extra={"example": 900})
     rating: float = Field(..., json_schema_extra={"example": 4.3})
+    seats_available: Optional[int] = Field(None, json_schema_extra={"example": 28})
+    lowest_price_by_seat_type: Dict[str, float] = Field(default_factory=dict, json_schema_extra={"example": {"Lower": 810.0, "Upper": 900.0}})
 
 class BusSearchResponse(BaseModel):
     buses: List[BusResponse] = Field(..., json_schema_extra={"example": []})
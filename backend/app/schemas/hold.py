@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import date, datetime
+
+class SeatHoldCreate(BaseModel):
+    bus_id: str = Field(..., json_schema_extra={"example": "2c347a5d-b0ac-4b88-8fe8-5bc79765193d"})
+    travel_date: date = Field(..., json_schema_extra={"example": "2025-09-01"})
+    seats: List[str] = Field(..., json_schema_extra={"example": ["S1", "S2"]})
+
+class SeatHoldResponse(BaseModel):
+    hold_token: str = Field(..., json_schema_extra={"example": "kq1X4lH8n6Yc0u6pR3dG7w"})
+    bus_id: str = Field(..., json_schema_extra={"example": "2c347a5d-b0ac-4b88-8fe8-5bc79765193d"})
+    travel_date: str = Field(..., json_schema_extra={"example": "2025-09-01"})
+    seats: List[str] = Field(..., json_schema_extra={"example": ["S1", "S2"]})
+    expires_at: datetime = Field(..., json_schema_extra={"example": "2025-09-01T10:05:00Z"})
+
+class ReleaseHoldResponse(BaseModel):
+    message: str = Field(..., json_schema_extra={"example": "Seat hold released"})
+    hold_token: str = Field(..., json_schema_extra={"example": "kq1X4lH8n6Yc0u6pR3dG7w"})
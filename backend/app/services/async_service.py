@@ -0,0 +1,39 @@
+from typing import Any, Callable, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.tracing import span
+
+
+class AsyncServiceAdapter:
+    """
+    Async front for a sync service class.
+
+    With an ``AsyncSession`` the sync service runs through
+    ``AsyncSession.run_sync``, in a greenlet on the event loop thread: its
+    queries go through the async driver and yield to the loop while waiting
+    on the database. Anything else in that code that blocks (the Redis hold
+    store's socket I/O, retry backoff) must go through
+    ``app.core.resp.run_blocking`` / ``app.db.async_session.sleep``, which hand it to the
+    threadpool or the loop; a plain blocking call would stall the worker.
+    With a plain ``Session`` (``DB_ASYNC`` off) the whole call is handed to
+    Starlette's threadpool, which is what a sync ``def`` route does.
+    Either way the business logic lives once, in the sync service.
+
+    Each call is a tracing span named after the service method.
+    """
+
+    service_class: Callable[..., Any]
+
+    def __init__(self, db: Union[AsyncSession, Session]):
+        self.db = db
+
+    async def _call(self, method: str, *args, **kwargs):
+        with span(f"{self.service_class.__name__}.{method}"):
+            if isinstance(self.db, AsyncSession):
+                return await self.db.run_sync(
+                    lambda session: getattr(self.service_class(session), method)(*args, **kwargs)
+                )
+            return await run_in_threadpool(
+                lambda: getattr(self.service_class(self.db), method)(*args, **kwargs)
+            )
@@ -5,6 +5,7 @@ from app.schemas.auth import OTPRequest
 from app.core.security import generate_otp, create_access_token
 from datetime import datetime, timedelta, timezone
 from app.core.logging import logger
+from app.services.async_service import AsyncServiceAdapter
 
 class AuthService:
     def __init__(self, db: Session):
@@ -64,4 +65,13 @@ class AuthService:
         access_token = create_access_token(data={"sub": str(user.id)})
         logger.info("Access token generated for user_id={user_id}", user_id=user.id)
         
-        return {"token": access_token, "user": user}
\ No newline at end of file
+        return {"token": access_token, "user": user}
+
+class AsyncAuthService(AsyncServiceAdapter):
+    service_class = AuthService
+
+    async def request_otp(self, otp_in: OTPRequest):
+        return await self._call("request_otp", otp_in)
+
+    async def verify_otp(self, otp_id: str, otp_code: str):
+        return await self._call("verify_otp", otp_id, otp_code)
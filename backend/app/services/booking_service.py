@@ -1,23 +1,64 @@
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from app.schemas.booking import BookingCreate, BookingResponse
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, aliased
+from typing import List, Dict, Any, Optional, Tuple
+from app.schemas.booking import BookingCreate, BookingListItem, BookingListResponse, BookingResponse
 from app.db.models.user import User
 from app.db.models.booking import Booking
 from app.db.models.booking_seat import BookingSeat
 from app.db.models.seat import Seat
 from app.db.models.bus import Bus
 from app.db.models.city import City
+from app.db.models.trip import Trip
+from app.services import seat_bitmap, user_stats
+from app.core.seat_hold_store import SeatHoldStore, get_seat_hold_store
+from app.config import settings
+from app.services.async_service import AsyncServiceAdapter
+from app.db.async_session import sleep
+from app.db.compat import comma_list
+import base64
+import random
 import uuid
-from datetime import datetime
-from loguru import logger
+from datetime import date, datetime
+from app.core.logging import logger
+
+# serialization_failure, deadlock_detected
+RETRYABLE_PGCODES = {"40001", "40P01"}
+
+BOOKING_FILTERS = ("upcoming", "past", "cancelled")
+MAX_BOOKINGS_PAGE_SIZE = 100
+
+class SeatConflictError(ValueError):
+    """Raised when some of the requested seats are already booked for the trip."""
+
+    def __init__(self, seats: List[str]):
+        self.seats = seats
+        super().__init__(f"Seats already booked: {', '.join(seats)}")
+
+class BookingContentionError(RuntimeError):
+    """Raised when a booking keeps losing races for the trip and runs out of attempts."""
 
 class BookingService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, hold_store: Optional[SeatHoldStore] = None):
         self.db = db
+        self.hold_store = hold_store or get_seat_hold_store()
     
     def create_booking(self, booking_data: BookingCreate, user: User) -> Dict[str, Any]:
         """
-        Create a new real booking in the database
+        Create a new real booking in the database.
+
+        Seats are claimed without table locks. The trip bitmap gives a fast,
+        unlocked conflict check; the unique (bus_id, travel_date, seat_id)
+        constraint on booking_seats is what guarantees a seat is never sold
+        twice, and losing it raises SeatConflictError naming exactly the lost
+        seats. The trip row is only locked for the final bitmap merge, right
+        before commit. Deadlocks and serialization failures are retried up to
+        ``settings.BOOKING_MAX_ATTEMPTS`` times.
+
+        Seats held by another user's checkout are rejected. With a live
+        ``hold_token`` of the user's own covering every requested seat, the
+        seats were already validated when the hold was taken, so the bitmap
+        check is skipped; the hold is released once the booking commits.
         """
         try:
             logger.info("Creating booking for user_id={user_id} bus_id={bus_id} seats={seats} travel_date={travel_date}", 
@@ -36,136 +77,283 @@ class BookingService:
                 bus_uuid = uuid.UUID(booking_data.bus_id)
             except ValueError:
                 raise ValueError("Invalid bus ID format")
-                
-            bus = self.db.query(Bus).filter(Bus.id == bus_uuid).first()
-            if not bus:
-                raise ValueError("Bus not found")
-            
-            # Get city details
-            from_city = self.db.query(City).filter(City.id == bus.from_city_id).first()
-            to_city = self.db.query(City).filter(City.id == bus.to_city_id).first()
-            
-            # Calculate total amount from actual seat prices
-            total_amount = 0
-            for seat_no in booking_data.seats:
-                seat = self.db.query(Seat).filter(
-                    Seat.bus_id == bus_uuid,
-                    Seat.seat_no == seat_no
-                ).first()
-                if seat:
-                    total_amount += seat.price
-                else:
-                    raise ValueError(f"Seat {seat_no} not found")
-            
-            # Create the booking
-            new_booking = Booking(
-                id=uuid.uuid4(),
-                user_id=user.id,
-                bus_id=bus_uuid,
-                date=booking_data.travel_date,
-                status="CONFIRMED",
-                amount=total_amount
-            )
-            
-            self.db.add(new_booking)
-            self.db.flush()  # Get the booking ID
-            
-            # Create booking seats
-            for seat_no in booking_data.seats:
-                seat = self.db.query(Seat).filter(
-                    Seat.bus_id == bus_uuid,
-                    Seat.seat_no == seat_no
-                ).first()
-                
-                if seat:
-                    # Create booking seat record
-                    booking_seat = BookingSeat(
-                        id=uuid.uuid4(),
-                        booking_id=new_booking.id,
-                        seat_id=seat.id
-                    )
-                    self.db.add(booking_seat)
-                    
-                    # Note: Seat availability is determined by BookingSeat records, not a flag
-                    print(f"Marked seat {seat_no} as booked")
-            
-            # Commit all changes
-            self.db.commit()
-            
-            logger.info("Booking created successfully booking_id={booking_id} total_amount={amount}", 
-                       booking_id=new_booking.id, amount=total_amount)
-            
-            # Return the booking response
-            return {
-                "booking_id": str(new_booking.id),
-                "status": "CONFIRMED",
-                "amount": total_amount,
-                "seats": booking_data.seats,
-                "bus_id": str(booking_data.bus_id),
-                "travel_date": str(booking_data.travel_date),  # Changed from 'date' to 'travel_date'
-                "bus_name": bus.operator,
-                "from_city": from_city.name if from_city else "Unknown",
-                "to_city": to_city.name if to_city else "Unknown"
-            }
+
+            seat_nos = list(dict.fromkeys(booking_data.seats))
+            held = self._check_holds(booking_data, bus_uuid, seat_nos, user)
+            max_attempts = settings.BOOKING_MAX_ATTEMPTS
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    booking = self._create_booking_once(booking_data, bus_uuid, seat_nos, user, prevalidated=held)
+                    if held:
+                        self._release_hold(booking_data.hold_token)
+                    return booking
+                except IntegrityError:
+                    self.db.rollback()
+                    lost = self._booked_seat_nos(bus_uuid, booking_data.travel_date, seat_nos)
+                    if lost:
+                        raise SeatConflictError(lost)
+                    reason = "integrity error"
+                except OperationalError as e:
+                    if getattr(e.orig, "pgcode", None) not in RETRYABLE_PGCODES:
+                        raise
+                    self.db.rollback()
+                    reason = f"transient database error {e.orig.pgcode}"
+                logger.warning("Booking attempt {attempt}/{max_attempts} lost a race ({reason})",
+                               attempt=attempt, max_attempts=max_attempts, reason=reason)
+                if attempt < max_attempts:
+                    sleep(random.uniform(0, 0.005 * attempt))
+            raise BookingContentionError(f"Booking could not be completed after {max_attempts} attempts")
             
         except Exception as e:
             logger.error("Error creating booking: {error}", error=str(e))
             self.db.rollback()
             raise
-    
-    def get_user_bookings(self, user: User) -> List[Dict[str, Any]]:
+
+    def _check_holds(self, booking_data: BookingCreate, bus_uuid: uuid.UUID, seat_nos: List[str], user: User) -> bool:
         """
-        Get all real bookings for a user from the database
+        Reject seats held by someone else; return True when the user's own
+        hold covers the whole request.
         """
+        travel_date = booking_data.travel_date.isoformat()
+        holders = self.hold_store.holders(str(bus_uuid), travel_date, seat_nos)
+        foreign = [seat_no for seat_no in seat_nos if holders.get(seat_no, booking_data.hold_token) != booking_data.hold_token]
+        if foreign:
+            raise SeatConflictError(foreign)
+        if not booking_data.hold_token:
+            return False
+
+        hold = self.hold_store.get(booking_data.hold_token)
+        if (
+            hold is None
+            or hold.user_id != str(user.id)
+            or hold.bus_id != str(bus_uuid)
+            or hold.travel_date != travel_date
+            or not set(seat_nos) <= set(hold.seats)
+        ):
+            logger.warning("Hold token {token} does not cover the booking, validating seats", token=booking_data.hold_token)
+            return False
+        return True
+
+    def _release_hold(self, token: str) -> None:
         try:
-            print(f"=== FETCHING REAL BOOKINGS FOR USER {user.id} ===")
-            
-            # Query real bookings from database
-            bookings = self.db.query(Booking).filter(Booking.user_id == user.id).all()
-            
-            booking_list = []
-            for booking in bookings:
-                # Get bus details
-                bus = self.db.query(Bus).filter(Bus.id == booking.bus_id).first()
-                if not bus:
-                    continue
-                
-                # Get city details
-                from_city = self.db.query(City).filter(City.id == bus.from_city_id).first()
-                to_city = self.db.query(City).filter(City.id == bus.to_city_id).first()
-                
-                # Get seat numbers for this booking
-                booking_seats = self.db.query(BookingSeat).filter(BookingSeat.booking_id == booking.id).all()
-                seat_numbers = []
-                for bs in booking_seats:
-                    seat = self.db.query(Seat).filter(Seat.id == bs.seat_id).first()
-                    if seat:
-                        seat_numbers.append(seat.seat_no)
-                
-                booking_info = {
-                    "booking_id": str(booking.id),
-                    "bus_name": bus.operator,
-                    "from_city": from_city.name if from_city else "Unknown",
-                    "to_city": to_city.name if to_city else "Unknown",
-                    "date": str(booking.date),
-                    "seats": seat_numbers,
-                    "status": booking.status,
-                    "amount": booking.amount
-                }
-                
-                booking_list.append(booking_info)
-                print(f"Found booking: {booking_info}")
-            
-            print(f"Total bookings found: {len(booking_list)}")
-            return booking_list
-            
+            self.hold_store.release(token)
         except Exception as e:
-            print(f"Error fetching user bookings: {e}")
-            return []
+            # The hold expires on its own; the booking already stands
+            logger.warning("Could not release seat hold {token}: {error}", token=token, error=str(e))
+
+    def _create_booking_once(self, booking_data: BookingCreate, bus_uuid: uuid.UUID, seat_nos: List[str], user: User, prevalidated: bool = False) -> Dict[str, Any]:
+        bus = self.db.query(Bus).filter(Bus.id == bus_uuid).first()
+        if not bus:
+            raise ValueError("Bus not found")
+        
+        # Both city names in one query
+        cities = {
+            city.id: city
+            for city in self.db.query(City).filter(City.id.in_([bus.from_city_id, bus.to_city_id])).all()
+        }
+        from_city, to_city = cities.get(bus.from_city_id), cities.get(bus.to_city_id)
+        
+        # Load all requested seats in one query
+        seats = self.db.query(Seat).filter(
+            Seat.bus_id == bus_uuid,
+            Seat.seat_no.in_(seat_nos)
+        ).all()
+        seats_by_no = {seat.seat_no: seat for seat in seats}
+        for seat_no in seat_nos:
+            if seat_no not in seats_by_no:
+                raise ValueError(f"Seat {seat_no} not found")
+        total_amount = sum(seats_by_no[seat_no].price for seat_no in seat_nos)
+
+        # Fast conflict check against the trip's occupancy bitmap (no lock taken)
+        trip = self.db.query(Trip).filter(
+            Trip.bus_id == bus_uuid,
+            Trip.service_date == booking_data.travel_date,
+            Trip.status == "ACTIVE"
+        ).first()
+        if not trip:
+            raise ValueError("Bus does not run on the selected date")
+
+        # A hold was validated when taken; the unique constraint still backs it
+        if not prevalidated:
+            taken = [
+                seat_no for seat_no in seat_nos
+                if seat_bitmap.is_set(trip.seat_bitmap, seats_by_no[seat_no].seat_index)
+            ]
+            if taken:
+                raise SeatConflictError(taken)
+
+        # Create the booking
+        new_booking = Booking(
+            id=uuid.uuid4(),
+            user_id=user.id,
+            bus_id=bus_uuid,
+            date=booking_data.travel_date,
+            status="CONFIRMED",
+            amount=total_amount
+        )
+        
+        self.db.add(new_booking)
+        self.db.flush()  # Get the booking ID
+        
+        # Claim the seats. uq_booking_seats_bus_date_seat rejects double sales;
+        # inserting in seat order keeps concurrent claims from deadlocking.
+        seat_indexes = sorted(seats_by_no[seat_no].seat_index for seat_no in seat_nos)
+        for seat in sorted(seats_by_no.values(), key=lambda s: s.seat_index):
+            self.db.add(BookingSeat(
+                id=uuid.uuid4(),
+                booking_id=new_booking.id,
+                bus_id=bus_uuid,
+                travel_date=booking_data.travel_date,
+                seat_id=seat.id
+            ))
+        self.db.flush()
+
+        # Seats are ours: merge them into the freshly locked bitmap
+        trip = self.db.query(Trip).filter(Trip.id == trip.id).with_for_update().populate_existing().first()
+        if trip.status != "ACTIVE":
+            # The trip was cancelled while these seats were being claimed
+            raise ValueError("Bus does not run on the selected date")
+        trip.seat_bitmap = seat_bitmap.set_bits(trip.seat_bitmap, seat_indexes)
+        user_stats.record_booking(self.db, user.id, total_amount)
+        
+        # Commit all changes
+        self.db.commit()
+        
+        logger.info("Booking created successfully booking_id={booking_id} total_amount={amount}", 
+                   booking_id=new_booking.id, amount=total_amount)
+        
+        # Return the booking response
+        return {
+            "booking_id": str(new_booking.id),
+            "status": "CONFIRMED",
+            "amount": total_amount,
+            "seats": seat_nos,
+            "bus_id": str(booking_data.bus_id),
+            "travel_date": str(booking_data.travel_date),  # Changed from 'date' to 'travel_date'
+            "bus_name": bus.operator,
+            "from_city": from_city.name if from_city else "Unknown",
+            "to_city": to_city.name if to_city else "Unknown"
+        }
+
+    def _booked_seat_nos(self, bus_uuid: uuid.UUID, travel_date, seat_nos: List[str]) -> List[str]:
+        """Return which of ``seat_nos`` are already sold for the bus and date."""
+        booked = set(self.db.execute(
+            select(Seat.seat_no)
+            .join(BookingSeat, BookingSeat.seat_id == Seat.id)
+            .where(
+                BookingSeat.bus_id == bus_uuid,
+                BookingSeat.travel_date == travel_date,
+                Seat.seat_no.in_(seat_nos),
+            )
+        ).scalars())
+        return [seat_no for seat_no in seat_nos if seat_no in booked]
+    
+    def get_user_bookings(
+        self,
+        user: User,
+        booking_filter: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> BookingListResponse:
+        """
+        Get one page of the user's bookings with bus, cities and seat numbers.
+
+        The page comes back from a single statement: bookings joined to their
+        bus and both cities, with seat numbers aggregated by a correlated
+        subquery, paginated by keyset on (date, id) so the cost does not grow
+        with the user's history. ``booking_filter`` is one of
+        ``BOOKING_FILTERS``; upcoming trips are listed soonest first,
+        everything else most recent first. Pass the returned ``next_cursor``
+        back to fetch the following page. The page is built as the response
+        model directly, without validation.
+        """
+        if booking_filter is not None and booking_filter not in BOOKING_FILTERS:
+            raise ValueError(f"Unknown booking filter: {booking_filter}")
+        limit = max(1, min(limit, MAX_BOOKINGS_PAGE_SIZE))
+
+        FromCity, ToCity = aliased(City), aliased(City)
+        stmt = (
+            select(
+                Booking.id, Bus.operator, FromCity.name, ToCity.name,
+                Booking.date, Booking.status, Booking.amount,
+                self._seat_numbers_subquery(),
+            )
+            .join(Bus, Bus.id == Booking.bus_id)
+            .outerjoin(FromCity, FromCity.id == Bus.from_city_id)
+            .outerjoin(ToCity, ToCity.id == Bus.to_city_id)
+            .where(Booking.user_id == user.id)
+        )
+
+        today = date.today()
+        if booking_filter == "upcoming":
+            stmt = stmt.where(Booking.status == "CONFIRMED", Booking.date >= today)
+        elif booking_filter == "past":
+            stmt = stmt.where(Booking.status == "CONFIRMED", Booking.date < today)
+        elif booking_filter == "cancelled":
+            stmt = stmt.where(Booking.status == "CANCELLED")
+
+        ascending = booking_filter == "upcoming"
+        if cursor:
+            after_date, after_id = self._decode_cursor(cursor)
+            key = tuple_(Booking.date, Booking.id)
+            stmt = stmt.where(key > tuple_(after_date, after_id) if ascending else key < tuple_(after_date, after_id))
+        if ascending:
+            stmt = stmt.order_by(Booking.date.asc(), Booking.id.asc())
+        else:
+            stmt = stmt.order_by(Booking.date.desc(), Booking.id.desc())
+
+        rows = self.db.execute(stmt.limit(limit + 1)).all()
+        page = rows[:limit]
+        bookings = [
+            BookingListItem.model_construct(
+                booking_id=str(booking_id),
+                bus_name=operator,
+                from_city=from_city or "Unknown",
+                to_city=to_city or "Unknown",
+                date=str(travel_date),
+                seats=seat_nos.split(",") if seat_nos else [],
+                status=status,
+                amount=amount,
+            )
+            for booking_id, operator, from_city, to_city, travel_date, status, amount, seat_nos in page
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = self._encode_cursor(last.date, last.id)
+
+        logger.debug("Fetched {count} bookings for user_id={user_id} filter={booking_filter}",
+                     count=len(bookings), user_id=user.id, booking_filter=booking_filter)
+        return BookingListResponse.model_construct(bookings=bookings, next_cursor=next_cursor)
+
+    def _seat_numbers_subquery(self):
+        """Comma-separated seat numbers of the outer booking, in seat order."""
+        seats = (
+            select(Seat.seat_no)
+            .join(BookingSeat, BookingSeat.seat_id == Seat.id)
+            .where(BookingSeat.booking_id == Booking.id)
+        )
+        return comma_list(self.db, seats, Seat.seat_index, correlate=Booking)
+
+    @staticmethod
+    def _encode_cursor(travel_date: date, booking_id: uuid.UUID) -> str:
+        return base64.urlsafe_b64encode(f"{travel_date.isoformat()}|{booking_id}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        try:
+            travel_date, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return date.fromisoformat(travel_date), uuid.UUID(booking_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
 
     def cancel_booking(self, booking_id: str, user: User) -> Dict[str, Any]:
         """
-        Cancel a booking and make seats available again
+        Cancel a booking and make seats available again.
+
+        Runs a fixed number of statements however many seats the booking
+        holds: the seat indexes are read in one query, the booking's seat rows
+        removed with one DELETE, and the trip bitmap cleared in one update.
         """
         try:
             logger.info("Cancelling booking {booking_id} for user {user_id}", 
@@ -189,25 +377,30 @@ class BookingService:
             if booking.status == "CANCELLED":
                 raise ValueError("Booking is already cancelled")
             
-            # Get all seats for this booking
-            booking_seats = self.db.query(BookingSeat).filter(BookingSeat.booking_id == booking_uuid).all()
-            
-            if not booking_seats:
+            # Lock the trip first, in the same order as booking, before touching seats
+            trip = self.db.query(Trip).filter(
+                Trip.bus_id == booking.bus_id,
+                Trip.service_date == booking.date
+            ).with_for_update().first()
+
+            seat_indexes = list(self.db.execute(
+                select(Seat.seat_index)
+                .join(BookingSeat, BookingSeat.seat_id == Seat.id)
+                .where(BookingSeat.booking_id == booking_uuid)
+            ).scalars())
+            if not seat_indexes:
                 raise ValueError("No seats found for this booking")
-            
-            # Mark seats as available again
-            for bs in booking_seats:
-                seat = self.db.query(Seat).filter(Seat.id == bs.seat_id).first()
-                if seat:
-                    seat.is_available = True
-                    logger.info("Marked seat {seat_no} as available", seat_no=seat.seat_no)
+
+            # Release the seats in the trip's occupancy bitmap
+            if trip:
+                trip.seat_bitmap = seat_bitmap.clear_bits(trip.seat_bitmap, seat_indexes)
             
             # Delete all booking seat records
-            for bs in booking_seats:
-                self.db.delete(bs)
+            self.db.execute(delete(BookingSeat).where(BookingSeat.booking_id == booking_uuid))
             
             # Update booking status to cancelled
             booking.status = "CANCELLED"
+            user_stats.record_cancellation(self.db, user.id, booking.amount)
             
             # Commit all changes
             self.db.commit()
@@ -225,3 +418,82 @@ class BookingService:
                         booking_id=booking_id, error=str(e))
             self.db.rollback()
             raise
+
+    def cancel_trip(self, bus_id: str, travel_date: date) -> Dict[str, Any]:
+        """
+        Cancel a whole trip: every confirmed booking on the bus and date, in one transaction.
+
+        The trip row is locked and marked CANCELLED so no new booking can land
+        on it, the bookings are flipped with a single UPDATE ... RETURNING,
+        their seat rows removed with a single DELETE, and the affected users'
+        stats adjusted with one multi-row upsert. Returns the cancelled
+        booking IDs for refund processing.
+        """
+        try:
+            try:
+                bus_uuid = uuid.UUID(bus_id)
+            except ValueError:
+                raise ValueError("Invalid bus ID format")
+
+            trip = self.db.query(Trip).filter(
+                Trip.bus_id == bus_uuid,
+                Trip.service_date == travel_date
+            ).with_for_update().first()
+            if not trip:
+                raise ValueError("Trip not found")
+
+            cancelled = self.db.execute(
+                update(Booking)
+                .where(Booking.bus_id == bus_uuid, Booking.date == travel_date, Booking.status == "CONFIRMED")
+                .values(status="CANCELLED")
+                .returning(Booking.id, Booking.user_id, Booking.amount)
+                .execution_options(synchronize_session=False)
+            ).all()
+            released = self.db.execute(
+                delete(BookingSeat)
+                .where(BookingSeat.bus_id == bus_uuid, BookingSeat.travel_date == travel_date)
+            ).rowcount
+
+            by_user: Dict[uuid.UUID, Tuple[int, float]] = {}
+            for _, user_id, amount in cancelled:
+                count, total = by_user.get(user_id, (0, 0.0))
+                by_user[user_id] = (count + 1, total + amount)
+            user_stats.record_cancellations(self.db, by_user)
+
+            trip.status = "CANCELLED"
+            trip.seat_bitmap = b""
+            self.db.commit()
+
+            booking_ids = sorted(str(booking_id) for booking_id, _, _ in cancelled)
+            logger.info("Trip bus_id={bus_id} date={travel_date} cancelled bookings={bookings} seats={seats}",
+                        bus_id=bus_id, travel_date=travel_date, bookings=len(booking_ids), seats=released)
+            return {
+                "bus_id": bus_id,
+                "travel_date": str(travel_date),
+                "status": "CANCELLED",
+                "cancelled_booking_ids": booking_ids,
+                "seats_released": released,
+                "refund_amount": sum(amount for _, _, amount in cancelled),
+            }
+
+        except Exception as e:
+            logger.error("Error cancelling trip bus_id={bus_id} date={travel_date}: {error}",
+                         bus_id=bus_id, travel_date=travel_date, error=str(e))
+            self.db.rollback()
+            raise
+
+class AsyncBookingService(AsyncServiceAdapter):
+    service_class = BookingService
+
+    async def create_booking(self, booking_data: BookingCreate, user: User) -> Dict[str, Any]:
+        return await self._call("create_booking", booking_data, user)
+
+    async def get_user_bookings(self, user: User, booking_filter: Optional[str] = None,
+                                cursor: Optional[str] = None, limit: int = 20) -> BookingListResponse:
+        return await self._call("get_user_bookings", user, booking_filter, cursor, limit)
+
+    async def cancel_booking(self, booking_id: str, user: User) -> Dict[str, Any]:
+        return await self._call("cancel_booking", booking_id, user)
+
+    async def cancel_trip(self, bus_id: str, travel_date: date) -> Dict[str, Any]:
+        return await self._call("cancel_trip", bus_id, travel_date)
@@ -1,12 +1,18 @@
+from sqlalchemy import select, and_, null
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from app.schemas.bus import BusSearchRequest, BusResponse, SeatResponse
+from typing import List, Dict, Any, Optional, Tuple
+from app.schemas.bus import BusSearchRequest, BusResponse, SeatLayoutResponse, SeatResponse
 from app.db.models.bus import Bus
 from app.db.models.city import City
 from app.db.models.seat import Seat
 from app.db.models.booking import Booking
 from app.db.models.booking_seat import BookingSeat
 from app.db.models.trip import Trip
+from app.services.route_index import route_index
+from app.services import seat_bitmap
+from app.core.seat_hold_store import get_seat_hold_store
+from app.core.logging import logger
+from app.services.async_service import AsyncServiceAdapter
 from datetime import date
 import uuid
 
@@ -14,129 +20,167 @@ class BusService:
     def __init__(self, db: Session):
         self.db = db
     
-    def search_buses(self, search_request: BusSearchRequest) -> List[Dict[str, Any]]:
+    def search_buses(self, search_request: BusSearchRequest) -> List[BusResponse]:
         """
-        Search for buses based on route and date from the database
+        Search for buses based on route and date.
+
+        The bus list is served from the in-memory route index once it has
+        been built, otherwise from the database. When a date is given, the
+        seats left and lowest price per seat type are attached from a single
+        aggregated query. The buses come back as response models built
+        without validation, since every field is already the right type.
         """
         try:
-            # Query buses from database based on from_city_id and to_city_id
-            query = self.db.query(Bus).filter(
-                Bus.from_city_id == search_request.from_city_id,
-                Bus.to_city_id == search_request.to_city_id
-            )
-            
-            # If date is provided, only show buses that have trips on that date
-            if search_request.actual_date:
-                query = query.join(Trip, Trip.bus_id == Bus.id).filter(
-                    Trip.service_date == search_request.actual_date
+            if route_index.ready:
+                summaries = route_index.search(
+                    search_request.from_city_id,
+                    search_request.to_city_id,
+                    search_request.actual_date,
                 )
-            
-            buses = query.all()
-            
-            # Convert to response format
-            filtered_buses = []
-            for bus in buses:
-                filtered_bus = {
-                    "id": str(bus.id),
-                    "operator": bus.operator,
-                    "departure_time": bus.departure_time,
-                    "arrival_time": bus.arrival_time,
-                    "duration": bus.duration or "N/A",
-                    "fare": bus.fare,
-                    "rating": bus.rating or 0.0
-                }
-                filtered_buses.append(filtered_bus)
-            
-            print(f"Found {len(filtered_buses)} buses for route {search_request.from_city_id} -> {search_request.to_city_id}")
-            print(f"Search date: {search_request.actual_date}")
-            
-            # If no buses found, return a special message
+                filtered_buses = [summary.as_dict() for summary in summaries]
+            else:
+                filtered_buses = self._search_buses_from_db(search_request)
+
+            logger.debug(
+                "Found {count} buses for route {from_city_id} -> {to_city_id} on {travel_date}",
+                count=len(filtered_buses), from_city_id=search_request.from_city_id,
+                to_city_id=search_request.to_city_id, travel_date=search_request.actual_date,
+            )
+
             if not filtered_buses:
-                print("No buses found for this route")
                 return []
-            
-            return filtered_buses
-            
+
+            if search_request.actual_date:
+                availability = self.get_seat_availability(
+                    [uuid.UUID(bus["id"]) for bus in filtered_buses],
+                    search_request.actual_date,
+                )
+                for bus in filtered_buses:
+                    seats = availability.get(bus["id"], {})
+                    bus["seats_available"] = sum(count for count, _ in seats.values())
+                    bus["lowest_price_by_seat_type"] = {
+                        seat_type: price for seat_type, (_, price) in seats.items()
+                    }
+                if search_request.hide_sold_out:
+                    filtered_buses = [bus for bus in filtered_buses if bus["seats_available"] > 0]
+
+            return [BusResponse.model_construct(**bus) for bus in filtered_buses]
+
         except Exception as e:
-            print(f"Error searching buses: {e}")
+            logger.exception("Error searching buses: {error}", error=e)
             # Fallback to empty list if database query fails
             return []
-    
-    def get_seat_layout(self, bus_id: str, travel_date: Optional[date] = None) -> Dict[str, Any]:
+
+    def _search_buses_from_db(self, search_request: BusSearchRequest) -> List[Dict[str, Any]]:
+        # Query buses from database based on from_city_id and to_city_id
+        query = self.db.query(Bus).filter(
+            Bus.from_city_id == search_request.from_city_id,
+            Bus.to_city_id == search_request.to_city_id
+        )
+
+        # If date is provided, only show buses that have trips on that date
+        if search_request.actual_date:
+            query = query.join(Trip, Trip.bus_id == Bus.id).filter(
+                Trip.service_date == search_request.actual_date,
+                Trip.status == "ACTIVE"
+            )
+
+        # Convert to response format
+        return [
+            {
+                "id": str(bus.id),
+                "operator": bus.operator,
+                "departure_time": bus.departure_time,
+                "arrival_time": bus.arrival_time,
+                "duration": bus.duration or "N/A",
+                "fare": bus.fare,
+                "rating": bus.rating or 0.0
+            }
+            for bus in query.all()
+        ]
+
+    def get_seat_availability(self, bus_ids: List[uuid.UUID], travel_date: date) -> Dict[str, Dict[str, Tuple[int, float]]]:
         """
-        Get seat layout for a specific bus with real-time availability
+        Count unbooked seats per bus and seat type for one travel date.
+
+        Returns ``{bus_id: {seat_type: (seats_available, lowest_price)}}``
+        from one query over the buses' seats and their trips' occupancy
+        bitmaps. Seat types with nothing left are omitted.
+        """
+        if not bus_ids:
+            return {}
+        stmt = (
+            select(Seat.bus_id, Seat.seat_type, Seat.price, Seat.seat_index, Trip.seat_bitmap)
+            .join(Trip, and_(Trip.bus_id == Seat.bus_id, Trip.service_date == travel_date))
+            .where(Seat.bus_id.in_(bus_ids))
+        )
+        availability: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        for bus_id, seat_type, price, seat_index, bitmap in self.db.execute(stmt).all():
+            if seat_bitmap.is_set(bitmap, seat_index):
+                continue
+            by_type = availability.setdefault(str(bus_id), {})
+            seats_available, lowest_price = by_type.get(seat_type, (0, price))
+            by_type[seat_type] = (seats_available + 1, min(lowest_price, price))
+        return availability
+
+    def get_seat_layout(self, bus_id: str, travel_date: Optional[date] = None, hold_token: Optional[str] = None) -> SeatLayoutResponse:
+        """
+        Get seat layout for a specific bus with real-time availability.
+
+        Seats and their booked state come back from one statement: the bus's
+        seats in seat order, left-joined to the trip's occupancy bitmap.
+        Seats held by another checkout are shown as unavailable; seats held
+        under ``hold_token`` stay available to its owner. The layout is built
+        as the response model directly, without validation.
         """
         try:
-            print(f"=== DEBUG: Fetching seats for bus {bus_id} ===")
-            print(f"Travel date: {travel_date}")
-            
             # Convert string bus_id to UUID for database query
             try:
                 bus_uuid = uuid.UUID(bus_id)
             except ValueError:
-                print(f"Invalid bus_id format: {bus_id}")
-                return {"bus_id": bus_id, "seats": []}
-            
-            # Get all seats for this bus
-            seats = self.db.query(Seat).filter(Seat.bus_id == bus_uuid).all()
-            print(f"Raw seats from database: {len(seats)} found")
-            
-            if not seats:
-                print(f"No seats found for bus {bus_id}")
-                return {"bus_id": bus_id, "seats": []}
-            
-            # Check which seats are actually booked for the given date
-            booked_seat_ids = set()
+                logger.warning("Invalid bus_id format: {bus_id}", bus_id=bus_id)
+                return SeatLayoutResponse.model_construct(bus_id=bus_id, seats=[])
+
+            # Without a travel date no bitmap is joined and every seat is available
+            trip_bitmap = Trip.seat_bitmap if travel_date else null()
+            stmt = select(Seat.id, Seat.seat_no, Seat.seat_type, Seat.price, Seat.seat_index, trip_bitmap)
             if travel_date:
-                print(f"Checking bookings for date: {travel_date}")
-                # Query bookings table for this bus and date
-                bookings = self.db.query(Booking).filter(
-                    Booking.bus_id == bus_uuid,
-                    Booking.date == travel_date,  # Use 'date' field from Booking model
-                    Booking.status == 'CONFIRMED'
-                ).all()
-                
-                print(f"Found {len(bookings)} confirmed bookings for this date")
-                
-                # Get all booked seat IDs
-                for booking in bookings:
-                    booking_seats = self.db.query(BookingSeat).filter(
-                        BookingSeat.booking_id == booking.id
-                    ).all()
-                    for booking_seat in booking_seats:
-                        booked_seat_ids.add(str(booking_seat.seat_id))
-                
-                print(f"Booked seat IDs: {booked_seat_ids}")
-            else:
-                print("No travel date provided, assuming all seats are available")
-            
-            # Convert seats to response format with real-time availability
-            seat_responses = []
-            for seat in seats:
-                # A seat is available if it's NOT in the booked_seat_ids set
-                is_available = str(seat.id) not in booked_seat_ids
-                
-                seat_response = {
-                    "id": str(seat.id),
-                    "seat_no": seat.seat_no,
-                    "seat_type": seat.seat_type,
-                    "price": seat.price,
-                    "is_available": is_available
-                }
-                seat_responses.append(seat_response)
-                print(f"Seat {seat.seat_no}: {seat.seat_type} - ₹{seat.price} - Available: {is_available}")
-            
-            print(f"Final response: {len(seat_responses)} seats")
-            print(f"Available seats: {sum(1 for s in seat_responses if s['is_available'])}")
-            
-            return {
-                "bus_id": bus_id,
-                "seats": seat_responses
-            }
-            
+                stmt = stmt.outerjoin(Trip, and_(Trip.bus_id == Seat.bus_id, Trip.service_date == travel_date))
+            stmt = stmt.where(Seat.bus_id == bus_uuid).order_by(Seat.seat_index)
+
+            rows = self.db.execute(stmt).all()
+            held = {}
+            if travel_date and rows:
+                held = get_seat_hold_store().holders(str(bus_uuid), travel_date.isoformat(), [row.seat_no for row in rows])
+
+            seat_responses = [
+                SeatResponse.model_construct(
+                    id=str(seat_id),
+                    seat_no=seat_no,
+                    seat_type=seat_type,
+                    price=price,
+                    is_available=not seat_bitmap.is_set(bitmap, seat_index)
+                    and held.get(seat_no, hold_token) == hold_token,
+                )
+                for seat_id, seat_no, seat_type, price, seat_index, bitmap in rows
+            ]
+            logger.debug(
+                "Seat layout bus_id={bus_id} travel_date={travel_date} seats={seats}",
+                bus_id=bus_id, travel_date=travel_date, seats=len(seat_responses),
+            )
+
+            return SeatLayoutResponse.model_construct(bus_id=bus_id, seats=seat_responses)
+
         except Exception as e:
-            print(f"Error fetching seat layout: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error fetching seat layout: {error}", error=e)
             # Fallback to empty list if database query fails
-            return {"bus_id": bus_id, "seats": []}
+            return SeatLayoutResponse.model_construct(bus_id=bus_id, seats=[])
+
+class AsyncBusService(AsyncServiceAdapter):
+    service_class = BusService
+
+    async def search_buses(self, search_request: BusSearchRequest) -> List[BusResponse]:
+        return await self._call("search_buses", search_request)
+
+    async def get_seat_layout(self, bus_id: str, travel_date: Optional[date] = None, hold_token: Optional[str] = None) -> SeatLayoutResponse:
+        return await self._call("get_seat_layout", bus_id, travel_date, hold_token)
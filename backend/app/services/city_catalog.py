@@ -0,0 +1,139 @@
+"""
+In-process city catalog.
+
+Cities change about once a month but are listed on every page load, so each
+worker keeps the list in memory as an immutable, versioned snapshot:
+
+- ORM commits that touch City, including bulk ``query(City).delete()``,
+  invalidate it through the session hooks installed by ``attach``;
+- writes from other processes (another worker, ``seed_data.py``) are picked
+  up when the snapshot is older than CITY_CACHE_TTL_SECONDS.
+
+The snapshot carries a strong ETag derived from its contents, so every
+worker serving the same cities hands out the same tag, and a sorted array of
+name keys for prefix search.
+"""
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_left
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logging import logger
+from app.db.models.city import City
+
+
+def city_dict(city) -> Dict[str, Any]:
+    return {"id": str(city.id), "name": city.name}
+
+
+class CitySnapshot:
+    """One immutable load of the catalog."""
+
+    __slots__ = ("cities", "etag", "version", "loaded_at", "_keys", "_positions")
+
+    def __init__(self, cities: Iterable, version: int):
+        self.cities: Tuple[Dict[str, Any], ...] = tuple(
+            sorted((city_dict(city) for city in cities), key=lambda c: (c["name"].casefold(), c["id"]))
+        )
+        self.version = version
+        self.loaded_at = time.monotonic()
+        body = json.dumps(self.cities, separators=(",", ":"), ensure_ascii=False).encode()
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        # Every word of a name is a key, so "mum" finds "Navi Mumbai" too
+        entries = sorted(
+            (word_start, position)
+            for position, city in enumerate(self.cities)
+            for word_start in _word_starts(city["name"].casefold())
+        )
+        self._keys = [key for key, _ in entries]
+        self._positions = [position for _, position in entries]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Cities with a word starting with ``prefix`` (case-insensitive), in name order."""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        matches = set()
+        index = bisect_left(self._keys, prefix)
+        while index < len(self._keys) and self._keys[index].startswith(prefix):
+            matches.add(self._positions[index])
+            index += 1
+        return [self.cities[position] for position in sorted(matches)[:limit]]
+
+
+def _word_starts(name: str) -> List[str]:
+    words = name.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class CityCatalog:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CitySnapshot] = None
+        self.version = 0
+
+    def fresh(self) -> Optional[CitySnapshot]:
+        """The current snapshot, or None when there is none or it has expired."""
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.loaded_at >= settings.CITY_CACHE_TTL_SECONDS:
+            return None
+        return snapshot
+
+    def store(self, version: int, cities: Iterable) -> CitySnapshot:
+        """
+        Build a snapshot from cities read while the catalog was at ``version``.
+
+        It is only kept if nothing invalidated the catalog during the read;
+        otherwise it is returned to the caller but the next one reloads.
+        """
+        snapshot = CitySnapshot(cities, version)
+        with self._lock:
+            if self.version == version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._snapshot = None
+        logger.info("City catalog invalidated version={version}", version=self.version)
+
+    # ------------------------------------------------------------------
+    # ORM session hooks
+    # ------------------------------------------------------------------
+    def attach(self, session_factory) -> None:
+        """Invalidate on City changes committed through ``session_factory``."""
+        if not event.contains(session_factory, "after_flush", self._after_flush):
+            event.listen(session_factory, "after_flush", self._after_flush)
+            event.listen(session_factory, "do_orm_execute", self._do_orm_execute)
+            event.listen(session_factory, "after_commit", self._after_commit)
+            event.listen(session_factory, "after_rollback", self._after_rollback)
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        if any(isinstance(obj, City) for obj in chain(session.new, session.dirty, session.deleted)):
+            session.info["city_catalog_changed"] = True
+
+    def _do_orm_execute(self, orm_execute_state) -> None:
+        # Bulk statements skip the flush
+        if orm_execute_state.is_select:
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is City:
+            orm_execute_state.session.info["city_catalog_changed"] = True
+
+    def _after_commit(self, session: Session) -> None:
+        if session.info.pop("city_catalog_changed", False):
+            self.invalidate()
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop("city_catalog_changed", None)
+
+
+city_catalog = CityCatalog()
@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.schemas.city import CityResponse
 from app.db.models.city import City
+from app.core.logging import logger
+from app.services.async_service import AsyncServiceAdapter
+from app.services.city_catalog import CitySnapshot, city_catalog, city_dict
 
 class CityService:
     def __init__(self, db: Session):
@@ -13,14 +16,34 @@ class CityService:
         """
         try:
             cities = self.db.query(City).all()
-            return [
-                {
-                    "id": str(city.id),
-                    "name": city.name
-                }
-                for city in cities
-            ]
+            return [city_dict(city) for city in cities]
         except Exception as e:
-            print(f"Error fetching cities: {e}")
+            logger.exception("Error fetching cities: {error}", error=e)
             # Fallback to empty list if database query fails
             return []
+
+    def get_catalog(self) -> Optional[CitySnapshot]:
+        """
+        The cached city catalog, reloaded from the database when it is missing
+        or expired; None if that load fails
+        """
+        snapshot = city_catalog.fresh()
+        if snapshot is not None:
+            return snapshot
+        version = city_catalog.version
+        try:
+            cities = self.db.query(City).all()
+        except Exception as e:
+            logger.exception("Error loading city catalog: {error}", error=e)
+            return None
+        return city_catalog.store(version, cities)
+
+class AsyncCityService(AsyncServiceAdapter):
+    service_class = CityService
+
+    async def get_all_cities(self) -> List[Dict[str, Any]]:
+        return await self._call("get_all_cities")
+
+    async def get_catalog(self) -> Optional[CitySnapshot]:
+        # Served from memory without a threadpool hop or a connection checkout while fresh
+        return city_catalog.fresh() or await self._call("get_catalog")
@@ -0,0 +1,284 @@
+import threading
+import uuid
+from datetime import date
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.db.models.bus import Bus
+from app.db.models.trip import Trip
+from app.core.logging import logger
+
+RouteKey = Tuple[uuid.UUID, uuid.UUID]
+RouteDateKey = Tuple[uuid.UUID, uuid.UUID, date]
+
+
+class BusSummary(NamedTuple):
+    """Compact, immutable view of a bus as returned by search."""
+    id: uuid.UUID
+    operator: str
+    from_city_id: uuid.UUID
+    to_city_id: uuid.UUID
+    departure_time: str
+    arrival_time: str
+    duration: Optional[str]
+    fare: float
+    rating: Optional[float]
+
+    @classmethod
+    def from_bus(cls, bus) -> "BusSummary":
+        return cls(
+            id=bus.id,
+            operator=bus.operator,
+            from_city_id=bus.from_city_id,
+            to_city_id=bus.to_city_id,
+            departure_time=bus.departure_time,
+            arrival_time=bus.arrival_time,
+            duration=bus.duration,
+            fare=bus.fare,
+            rating=bus.rating,
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": str(self.id),
+            "operator": self.operator,
+            "departure_time": self.departure_time,
+            "arrival_time": self.arrival_time,
+            "duration": self.duration or "N/A",
+            "fare": self.fare,
+            "rating": self.rating or 0.0,
+        }
+
+
+class RouteIndex:
+    """
+    In-process index of buses by (from_city_id, to_city_id, service_date).
+
+    The index is built in bulk at startup and kept current by applying
+    committed Bus/Trip changes from ORM sessions. Bulk statements such as
+    ``query(Trip).delete()`` and writes from other processes bypass the ORM
+    events, so ``verify`` / ``rebuild`` are run periodically to catch drift.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buses: Dict[uuid.UUID, BusSummary] = {}
+        self._bus_dates: Dict[uuid.UUID, Set[date]] = {}
+        self._by_route: Dict[RouteKey, Set[uuid.UUID]] = {}
+        self._by_route_date: Dict[RouteDateKey, Set[uuid.UUID]] = {}
+        self.ready = False
+
+    # ------------------------------------------------------------------
+    # Bulk build
+    # ------------------------------------------------------------------
+    def load(self, buses: Iterable, trips: Iterable[Tuple[uuid.UUID, date]]) -> None:
+        """Replace the index contents with the given buses and active (bus_id, date) trips."""
+        summaries = {bus.id: BusSummary.from_bus(bus) for bus in buses}
+        bus_dates: Dict[uuid.UUID, Set[date]] = {}
+        for bus_id, service_date in trips:
+            if bus_id in summaries:
+                bus_dates.setdefault(bus_id, set()).add(service_date)
+
+        by_route: Dict[RouteKey, Set[uuid.UUID]] = {}
+        by_route_date: Dict[RouteDateKey, Set[uuid.UUID]] = {}
+        for bus_id, summary in summaries.items():
+            route = (summary.from_city_id, summary.to_city_id)
+            by_route.setdefault(route, set()).add(bus_id)
+            for service_date in bus_dates.get(bus_id, ()):
+                by_route_date.setdefault(route + (service_date,), set()).add(bus_id)
+
+        with self._lock:
+            self._buses = summaries
+            self._bus_dates = bus_dates
+            self._by_route = by_route
+            self._by_route_date = by_route_date
+            self.ready = True
+
+    def _load_from_db(self, db: Session) -> None:
+        buses = db.query(Bus).yield_per(1000)
+        trips = (
+            db.query(Trip.bus_id, Trip.service_date)
+            .filter(Trip.status == "ACTIVE")
+            .yield_per(5000)
+        )
+        self.load(buses, trips)
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """Rebuild the whole index from the database in two streaming queries."""
+        self._load_from_db(db)
+        stats = self.stats()
+        logger.info("Route index rebuilt buses={buses} trips={trips}", buses=stats["buses"], trips=stats["trips"])
+        return stats
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def upsert_bus(self, summary: BusSummary) -> None:
+        with self._lock:
+            previous = self._buses.get(summary.id)
+            if previous is not None and (previous.from_city_id, previous.to_city_id) != (summary.from_city_id, summary.to_city_id):
+                self._unlink_bus(previous)
+            self._buses[summary.id] = summary
+            self._link_bus(summary)
+
+    def remove_bus(self, bus_id: uuid.UUID) -> None:
+        with self._lock:
+            summary = self._buses.pop(bus_id, None)
+            if summary is not None:
+                self._unlink_bus(summary)
+            self._bus_dates.pop(bus_id, None)
+
+    def add_trip(self, bus_id: uuid.UUID, service_date: date) -> None:
+        with self._lock:
+            summary = self._buses.get(bus_id)
+            if summary is None:
+                return
+            self._bus_dates.setdefault(bus_id, set()).add(service_date)
+            key = (summary.from_city_id, summary.to_city_id, service_date)
+            self._by_route_date.setdefault(key, set()).add(bus_id)
+
+    def remove_trip(self, bus_id: uuid.UUID, service_date: date) -> None:
+        with self._lock:
+            self._bus_dates.get(bus_id, set()).discard(service_date)
+            summary = self._buses.get(bus_id)
+            if summary is None:
+                return
+            key = (summary.from_city_id, summary.to_city_id, service_date)
+            bucket = self._by_route_date.get(key)
+            if bucket is not None:
+                bucket.discard(bus_id)
+                if not bucket:
+                    del self._by_route_date[key]
+
+    def _link_bus(self, summary: BusSummary) -> None:
+        route = (summary.from_city_id, summary.to_city_id)
+        self._by_route.setdefault(route, set()).add(summary.id)
+        for service_date in self._bus_dates.get(summary.id, ()):
+            self._by_route_date.setdefault(route + (service_date,), set()).add(summary.id)
+
+    def _unlink_bus(self, summary: BusSummary) -> None:
+        route = (summary.from_city_id, summary.to_city_id)
+        keys = [route] + [route + (d,) for d in self._bus_dates.get(summary.id, ())]
+        for key in keys:
+            index = self._by_route if len(key) == 2 else self._by_route_date
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.discard(summary.id)
+                if not bucket:
+                    del index[key]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def search(self, from_city_id: uuid.UUID, to_city_id: uuid.UUID, service_date: Optional[date] = None) -> List[BusSummary]:
+        """Return the buses on a route, optionally only those running on ``service_date``."""
+        with self._lock:
+            if service_date is None:
+                bus_ids = self._by_route.get((from_city_id, to_city_id), ())
+            else:
+                bus_ids = self._by_route_date.get((from_city_id, to_city_id, service_date), ())
+            summaries = [self._buses[bus_id] for bus_id in bus_ids]
+        summaries.sort(key=lambda s: (s.departure_time, s.operator))
+        return summaries
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "buses": len(self._buses),
+                "trips": sum(len(dates) for dates in self._bus_dates.values()),
+                "routes": len(self._by_route),
+                "route_dates": len(self._by_route_date),
+            }
+
+    def verify(self, db: Session) -> Dict[str, Any]:
+        """
+        Compare the live index with a fresh build from the database.
+
+        Returns the ids of buses that are missing, unexpected or stale and the
+        (bus_id, date) trips that differ, plus an overall ``consistent`` flag.
+        """
+        expected = RouteIndex()
+        expected._load_from_db(db)
+        with self._lock:
+            actual_buses = dict(self._buses)
+            actual_trips = {(b, d) for b, dates in self._bus_dates.items() for d in dates}
+        expected_trips = {(b, d) for b, dates in expected._bus_dates.items() for d in dates}
+
+        missing = [str(b) for b in expected._buses.keys() - actual_buses.keys()]
+        unexpected = [str(b) for b in actual_buses.keys() - expected._buses.keys()]
+        stale = [
+            str(b) for b, summary in expected._buses.items()
+            if b in actual_buses and actual_buses[b] != summary
+        ]
+        missing_trips = sorted((str(b), str(d)) for b, d in expected_trips - actual_trips)
+        unexpected_trips = sorted((str(b), str(d)) for b, d in actual_trips - expected_trips)
+        return {
+            "consistent": not (missing or unexpected or stale or missing_trips or unexpected_trips),
+            "missing_buses": missing,
+            "unexpected_buses": unexpected,
+            "stale_buses": stale,
+            "missing_trips": missing_trips,
+            "unexpected_trips": unexpected_trips,
+        }
+
+    # ------------------------------------------------------------------
+    # ORM session hooks
+    # ------------------------------------------------------------------
+    def attach(self, session_factory) -> None:
+        """Keep the index current with Bus/Trip changes committed through ``session_factory``."""
+        if not event.contains(session_factory, "after_flush", self._after_flush):
+            event.listen(session_factory, "after_flush", self._after_flush)
+            event.listen(session_factory, "after_commit", self._after_commit)
+            event.listen(session_factory, "after_rollback", self._after_rollback)
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        if not self.ready:
+            return
+        changes = session.info.setdefault("route_index_changes", [])
+        for obj in session.new:
+            if isinstance(obj, Bus):
+                changes.append(("bus", BusSummary.from_bus(obj)))
+            elif isinstance(obj, Trip):
+                changes.append(("trip_remove" if obj.status != "ACTIVE" else "trip_add", obj.bus_id, obj.service_date))
+        for obj in session.dirty:
+            if isinstance(obj, Bus):
+                changes.append(("bus", BusSummary.from_bus(obj)))
+            elif isinstance(obj, Trip):
+                state = inspect(obj)
+                if not any(state.attrs[name].history.has_changes() for name in ("bus_id", "service_date", "status")):
+                    continue  # e.g. seat bitmap updates from bookings
+                old_bus = state.attrs.bus_id.history.deleted or [obj.bus_id]
+                old_date = state.attrs.service_date.history.deleted or [obj.service_date]
+                changes.append(("trip_remove", old_bus[0], old_date[0]))
+                if obj.status == "ACTIVE":
+                    changes.append(("trip_add", obj.bus_id, obj.service_date))
+        for obj in session.deleted:
+            if isinstance(obj, Bus):
+                changes.append(("bus_remove", obj.id))
+            elif isinstance(obj, Trip):
+                changes.append(("trip_remove", obj.bus_id, obj.service_date))
+
+    def _after_commit(self, session: Session) -> None:
+        changes = session.info.pop("route_index_changes", None)
+        if not changes or not self.ready:
+            return
+        # Buses first so that trips added in the same transaction find their route.
+        for change in sorted(changes, key=lambda c: not c[0].startswith("bus")):
+            kind = change[0]
+            if kind == "bus":
+                self.upsert_bus(change[1])
+            elif kind == "bus_remove":
+                self.remove_bus(change[1])
+            elif kind == "trip_add":
+                self.add_trip(change[1], change[2])
+            elif kind == "trip_remove":
+                self.remove_trip(change[1], change[2])
+        logger.info("Route index applied {count} catalog changes", count=len(changes))
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop("route_index_changes", None)
+
+
+route_index = RouteIndex()
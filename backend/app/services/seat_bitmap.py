@@ -0,0 +1,128 @@
+"""
+Seat-occupancy bitmaps stored on each trip.
+
+Bit ``i`` of ``Trip.seat_bitmap`` is set when the seat with ``seat_index == i``
+on that bus is held by a confirmed booking for the trip's service date. Byte
+``i // 8`` holds bit ``i % 8``; trailing zero bytes are trimmed so an empty
+trip stores ``b""``.
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models.booking import Booking
+from app.db.models.booking_seat import BookingSeat
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.core.logging import logger
+
+
+def _trim(buf: bytearray) -> bytes:
+    end = len(buf)
+    while end and not buf[end - 1]:
+        end -= 1
+    return bytes(buf[:end])
+
+
+def from_indexes(indexes: Iterable[int]) -> bytes:
+    return set_bits(b"", indexes)
+
+
+def set_bits(bitmap: Optional[bytes], indexes: Iterable[int]) -> bytes:
+    buf = bytearray(bitmap or b"")
+    for i in indexes:
+        byte = i >> 3
+        if byte >= len(buf):
+            buf.extend(b"\x00" * (byte + 1 - len(buf)))
+        buf[byte] |= 1 << (i & 7)
+    return _trim(buf)
+
+
+def clear_bits(bitmap: Optional[bytes], indexes: Iterable[int]) -> bytes:
+    buf = bytearray(bitmap or b"")
+    for i in indexes:
+        byte = i >> 3
+        if byte < len(buf):
+            buf[byte] &= ~(1 << (i & 7)) & 0xFF
+    return _trim(buf)
+
+
+def is_set(bitmap: Optional[bytes], index: int) -> bool:
+    byte = index >> 3
+    return bool(bitmap) and byte < len(bitmap) and bool(bitmap[byte] & (1 << (index & 7)))
+
+
+def iter_set(bitmap: Optional[bytes]) -> Iterator[int]:
+    for byte_no, byte in enumerate(bitmap or b""):
+        while byte:
+            low = byte & -byte
+            yield (byte_no << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+def count(bitmap: Optional[bytes]) -> int:
+    return sum(bin(byte).count("1") for byte in (bitmap or b""))
+
+
+def compute_bitmaps(db: Session) -> Dict[Tuple[uuid.UUID, date], bytes]:
+    """Recompute every trip's bitmap from confirmed bookings in one query."""
+    stmt = (
+        select(Booking.bus_id, Booking.date, Seat.seat_index)
+        .join(BookingSeat, BookingSeat.booking_id == Booking.id)
+        .join(Seat, Seat.id == BookingSeat.seat_id)
+        .where(Booking.status == "CONFIRMED")
+    )
+    indexes: Dict[Tuple[uuid.UUID, date], List[int]] = {}
+    for bus_id, travel_date, seat_index in db.execute(stmt).yield_per(10000):
+        indexes.setdefault((bus_id, travel_date), []).append(seat_index)
+    return {key: from_indexes(seat_indexes) for key, seat_indexes in indexes.items()}
+
+
+def verify_bitmaps(db: Session, repair: bool = False) -> Dict[str, Any]:
+    """
+    Compare stored trip bitmaps with the ones derived from ``booking_seats``.
+
+    Every drifted trip is reported with the seat indexes that should be set
+    but are not (``missing``) and the ones set without a booking (``extra``).
+    Bookings on a bus/date without a trip row are reported as ``orphaned``.
+    With ``repair=True`` drifted bitmaps are overwritten and committed.
+    """
+    expected = compute_bitmaps(db)
+    drift: List[Dict[str, Any]] = []
+    seen = set()
+    for trip in db.query(Trip).all():
+        key = (trip.bus_id, trip.service_date)
+        seen.add(key)
+        want = expected.get(key, b"")
+        have = trip.seat_bitmap or b""
+        if want == have:
+            continue
+        want_set, have_set = set(iter_set(want)), set(iter_set(have))
+        drift.append({
+            "bus_id": str(trip.bus_id),
+            "date": str(trip.service_date),
+            "missing": sorted(want_set - have_set),
+            "extra": sorted(have_set - want_set),
+        })
+        if repair:
+            trip.seat_bitmap = want
+    orphaned = [
+        {"bus_id": str(bus_id), "date": str(travel_date), "booked": count(bitmap)}
+        for (bus_id, travel_date), bitmap in expected.items()
+        if (bus_id, travel_date) not in seen
+    ]
+    if repair and drift:
+        db.commit()
+    logger.info(
+        "Seat bitmap check trips={trips} drifted={drifted} orphaned={orphaned} repaired={repaired}",
+        trips=len(seen), drifted=len(drift), orphaned=len(orphaned), repaired=repair and bool(drift),
+    )
+    return {
+        "trips_checked": len(seen),
+        "drifted": drift,
+        "orphaned": orphaned,
+        "repaired": repair and bool(drift),
+    }
@@ -0,0 +1,113 @@
+from sqlalchemy import select, and_
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional
+from app.schemas.hold import SeatHoldCreate
+from app.db.models.user import User
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.core.seat_hold_store import SeatHold, SeatHoldStore, get_seat_hold_store
+from app.services.booking_service import SeatConflictError
+from app.services import seat_bitmap
+from app.config import settings
+from app.services.async_service import AsyncServiceAdapter
+from datetime import datetime, timezone
+from app.core.logging import logger
+import uuid
+
+class SeatHoldNotFoundError(LookupError):
+    """Raised when a hold token is unknown, expired, or belongs to another user."""
+
+class SeatHoldService:
+    def __init__(self, db: Session, store: Optional[SeatHoldStore] = None):
+        self.db = db
+        self.store = store or get_seat_hold_store()
+
+    def hold_seats(self, hold_data: SeatHoldCreate, user: User) -> Dict[str, Any]:
+        """
+        Hold seats for the user until ``settings.SEAT_HOLD_TTL_SECONDS`` pass.
+
+        The seats must exist and be unsold for the trip (one query against the
+        trip bitmap); the store then takes all of them or none. Seats already
+        sold or held by someone else raise SeatConflictError.
+        """
+        if not hold_data.seats:
+            raise ValueError("No seats selected")
+        seat_nos = list(dict.fromkeys(hold_data.seats))
+        if len(seat_nos) > settings.SEAT_HOLD_MAX_SEATS:
+            raise ValueError(f"At most {settings.SEAT_HOLD_MAX_SEATS} seats can be held at once")
+        try:
+            bus_uuid = uuid.UUID(hold_data.bus_id)
+        except ValueError:
+            raise ValueError("Invalid bus ID format")
+
+        rows = self.db.execute(
+            select(Seat.seat_no, Seat.seat_index, Trip.seat_bitmap)
+            .join(Trip, and_(
+                Trip.bus_id == Seat.bus_id,
+                Trip.service_date == hold_data.travel_date,
+                Trip.status == "ACTIVE",
+            ))
+            .where(Seat.bus_id == bus_uuid, Seat.seat_no.in_(seat_nos))
+        ).all()
+        found = {seat_no: (seat_index, bitmap) for seat_no, seat_index, bitmap in rows}
+        if not found:
+            raise ValueError("Bus does not run on the selected date")
+        for seat_no in seat_nos:
+            if seat_no not in found:
+                raise ValueError(f"Seat {seat_no} not found")
+        sold = [seat_no for seat_no in seat_nos if seat_bitmap.is_set(found[seat_no][1], found[seat_no][0])]
+        if sold:
+            raise SeatConflictError(sold)
+
+        ttl = settings.SEAT_HOLD_TTL_SECONDS
+        hold = SeatHold.new(str(user.id), str(bus_uuid), hold_data.travel_date.isoformat(), seat_nos, ttl)
+        conflicts = self.store.acquire(hold, ttl)
+        if conflicts:
+            raise SeatConflictError(conflicts)
+
+        logger.info("Seats held token={token} user_id={user_id} bus_id={bus_id} seats={seats}",
+                    token=hold.token, user_id=user.id, bus_id=hold.bus_id, seats=seat_nos)
+        return self._to_response(hold)
+
+    def extend_hold(self, token: str, user: User) -> Dict[str, Any]:
+        """Restart the TTL of one of the user's live holds."""
+        self._owned_hold(token, user)
+        hold = self.store.extend(token, settings.SEAT_HOLD_TTL_SECONDS)
+        if hold is None:
+            raise SeatHoldNotFoundError("Seat hold not found or expired")
+        return self._to_response(hold)
+
+    def release_hold(self, token: str, user: User) -> Dict[str, Any]:
+        """Give the held seats back before the TTL runs out."""
+        self._owned_hold(token, user)
+        self.store.release(token)
+        logger.info("Seat hold released token={token} user_id={user_id}", token=token, user_id=user.id)
+        return {"message": "Seat hold released", "hold_token": token}
+
+    def _owned_hold(self, token: str, user: User) -> SeatHold:
+        hold = self.store.get(token)
+        if hold is None or hold.user_id != str(user.id):
+            raise SeatHoldNotFoundError("Seat hold not found or expired")
+        return hold
+
+    @staticmethod
+    def _to_response(hold: SeatHold) -> Dict[str, Any]:
+        return {
+            "hold_token": hold.token,
+            "bus_id": hold.bus_id,
+            "travel_date": hold.travel_date,
+            "seats": list(hold.seats),
+            "expires_at": datetime.fromtimestamp(hold.expires_at, tz=timezone.utc),
+        }
+
+class AsyncSeatHoldService(AsyncServiceAdapter):
+    service_class = SeatHoldService
+
+    async def hold_seats(self, hold_data: SeatHoldCreate, user: User) -> Dict[str, Any]:
+        return await self._call("hold_seats", hold_data, user)
+
+    async def extend_hold(self, token: str, user: User) -> Dict[str, Any]:
+        return await self._call("extend_hold", token, user)
+
+    async def release_hold(self, token: str, user: User) -> Dict[str, Any]:
+        return await self._call("release_hold", token, user)
@@ -1,9 +1,10 @@
 from sqlalchemy.orm import Session
 from app.db.models.user import User
-from app.db.models.booking import Booking
+from app.db.models.user_booking_stats import UserBookingStats
 from app.schemas.user import UserUpdate
 import uuid
 from app.core.logging import logger
+from app.services.async_service import AsyncServiceAdapter
 
 class UserService:
     def __init__(self, db: Session):
@@ -36,9 +37,10 @@ class UserService:
         if not user:
             return None
 
-        bookings = self.db.query(Booking).filter(Booking.user_id == user_id).all()
-        total_bookings = len(bookings)
-        total_amount_spent = sum(booking.amount for booking in bookings)
+        # One row maintained by BookingService instead of scanning bookings
+        stats = self.db.query(UserBookingStats).filter(UserBookingStats.user_id == user_id).first()
+        total_bookings = stats.total_bookings if stats else 0
+        total_amount_spent = stats.confirmed_spend if stats else 0.0
         
         wallet_balance = total_bookings * 75.0
         
@@ -59,4 +61,16 @@ class UserService:
             "total_amount_spent": total_amount_spent,
             "wallet_balance": wallet_balance,
             "personal_details_added": personal_details_added
-        }
\ No newline at end of file
+        }
+
+class AsyncUserService(AsyncServiceAdapter):
+    service_class = UserService
+
+    async def get_user_by_id(self, user_id: uuid.UUID):
+        return await self._call("get_user_by_id", user_id)
+
+    async def update_user(self, user_id: uuid.UUID, user_in: UserUpdate):
+        return await self._call("update_user", user_id, user_in)
+
+    async def get_user_profile(self, user_id: uuid.UUID):
+        return await self._call("get_user_profile", user_id)
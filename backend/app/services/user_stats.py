@@ -0,0 +1,110 @@
+"""
+Per-user booking aggregates in ``user_booking_stats``.
+
+``record_booking`` and ``record_cancellation`` are called by BookingService
+inside the booking's own transaction, so the stats commit or roll back with
+it. Each is a single upsert that increments in place, which keeps concurrent
+bookings by one user from losing updates. ``verify_stats`` recomputes the
+aggregates from ``bookings`` to backfill or repair the table.
+"""
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from app.core.logging import logger
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+
+from app.db.compat import insert
+from app.db.models.booking import Booking
+from app.db.models.user_booking_stats import UserBookingStats
+
+
+def _upsert(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Add each row's deltas to the user's stats in one statement, creating missing rows."""
+    if not rows:
+        return
+    stats = UserBookingStats.__table__
+    # Fixed row order keeps concurrent multi-user upserts from deadlocking
+    stmt = insert(db, stats).values(sorted(rows, key=lambda row: str(row["user_id"])))
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[stats.c.user_id],
+        set_={
+            "total_bookings": stats.c.total_bookings + stmt.excluded.total_bookings,
+            "confirmed_spend": stats.c.confirmed_spend + stmt.excluded.confirmed_spend,
+            "cancellations": stats.c.cancellations + stmt.excluded.cancellations,
+            "updated_at": func.now(),
+        },
+    ))
+
+
+def record_booking(db: Session, user_id: uuid.UUID, amount: float) -> None:
+    _upsert(db, [{"user_id": user_id, "total_bookings": 1, "confirmed_spend": amount, "cancellations": 0}])
+
+
+def record_cancellation(db: Session, user_id: uuid.UUID, amount: float, count: int = 1) -> None:
+    """Move ``count`` bookings worth ``amount`` in total from confirmed to cancelled."""
+    record_cancellations(db, {user_id: (count, amount)})
+
+
+def record_cancellations(db: Session, cancelled: Dict[uuid.UUID, Tuple[int, float]]) -> None:
+    """Apply ``{user_id: (bookings, amount)}`` cancellations for many users at once."""
+    _upsert(db, [
+        {"user_id": user_id, "total_bookings": 0, "confirmed_spend": -amount, "cancellations": count}
+        for user_id, (count, amount) in cancelled.items()
+    ])
+
+
+def compute_stats(db: Session) -> Dict[uuid.UUID, Tuple[int, float, int]]:
+    """Aggregate every user's bookings in one query."""
+    stmt = select(
+        Booking.user_id,
+        func.count(),
+        func.coalesce(func.sum(case((Booking.status == "CONFIRMED", Booking.amount), else_=0.0)), 0.0),
+        func.count().filter(Booking.status == "CANCELLED"),
+    ).group_by(Booking.user_id)
+    return {
+        user_id: (total, float(spend), cancellations)
+        for user_id, total, spend, cancellations in db.execute(stmt)
+    }
+
+
+def verify_stats(db: Session, repair: bool = False) -> Dict[str, Any]:
+    """
+    Compare ``user_booking_stats`` with aggregates derived from ``bookings``.
+
+    Users whose row is missing or differs are reported in ``drifted`` with
+    the stored and expected values. With ``repair=True`` those rows are
+    overwritten (or created) and committed, which also serves as the
+    backfill for existing data.
+    """
+    expected = compute_stats(db)
+    stored = {
+        row.user_id: (row.total_bookings, row.confirmed_spend, row.cancellations)
+        for row in db.query(UserBookingStats).all()
+    }
+    drift: List[Dict[str, Any]] = []
+    for user_id in expected.keys() | stored.keys():
+        want = expected.get(user_id, (0, 0.0, 0))
+        have = stored.get(user_id)
+        if have is not None and have[0] == want[0] and have[2] == want[2] and abs(have[1] - want[1]) < 0.005:
+            continue
+        drift.append({
+            "user_id": str(user_id),
+            "stored": None if have is None else dict(zip(("total_bookings", "confirmed_spend", "cancellations"), have)),
+            "expected": dict(zip(("total_bookings", "confirmed_spend", "cancellations"), want)),
+        })
+        if repair:
+            row = db.get(UserBookingStats, user_id) or UserBookingStats(user_id=user_id)
+            row.total_bookings, row.confirmed_spend, row.cancellations = want
+            db.add(row)
+    if repair and drift:
+        db.commit()
+    logger.info(
+        "User stats check users={users} drifted={drifted} repaired={repaired}",
+        users=len(expected), drifted=len(drift), repaired=repair and bool(drift),
+    )
+    return {
+        "users_checked": len(expected),
+        "drifted": drift,
+        "repaired": repair and bool(drift),
+    }
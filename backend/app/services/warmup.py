@@ -0,0 +1,61 @@
+"""
+Statement cache warm-up for production startup.
+
+SQLAlchemy compiles each statement shape once per engine and caches the
+result, so the first request to reach each shape pays for compiling it.
+``StatementWarmup.warm`` runs the read hot paths with ids that match
+nothing, leaving each worker with those statements compiled and a pooled
+connection open for the cost of a few index lookups. Write paths stay cold
+rather than writing at boot.
+"""
+import uuid
+from contextlib import suppress
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from app.db.models.user import User
+from app.schemas.bus import BusSearchRequest
+from app.schemas.hold import SeatHoldCreate
+from app.services.async_service import AsyncServiceAdapter
+from app.services.booking_service import BookingService, BOOKING_FILTERS
+from app.services.bus_service import BusService
+from app.services.city_service import CityService
+from app.services.seat_hold_service import SeatHoldService
+from app.services.user_service import UserService
+
+NO_MATCH = uuid.UUID(int=0)
+
+
+class StatementWarmup:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def warm(self) -> None:
+        today = date.today()
+        CityService(self.db).get_all_cities()
+
+        buses = BusService(self.db)
+        buses._search_buses_from_db(BusSearchRequest(from_city_id=NO_MATCH, to_city_id=NO_MATCH, travel_date=today))
+        buses.get_seat_availability([NO_MATCH], today)
+        buses.get_seat_layout(str(NO_MATCH), today)
+
+        users = UserService(self.db)
+        users.get_user_by_id(NO_MATCH)
+        bookings = BookingService(self.db)
+        nobody = User(id=NO_MATCH)
+        for booking_filter in (None, *BOOKING_FILTERS):
+            bookings.get_user_bookings(nobody, booking_filter)
+
+        # Stops with "Bus does not run on the selected date" after its one query
+        with suppress(ValueError):
+            SeatHoldService(self.db).hold_seats(
+                SeatHoldCreate(bus_id=str(NO_MATCH), travel_date=today, seats=["-"]), nobody
+            )
+
+
+class AsyncStatementWarmup(AsyncServiceAdapter):
+    service_class = StatementWarmup
+
+    async def warm(self) -> None:
+        return await self._call("warm")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Compare throughput and tail latency of the sync and async database modes.
+
+Starts the API once with DB_ASYNC=false and once with DB_ASYNC=true, drives
+the same read-heavy load at each (city list, bus search, seat layout) and
+prints requests/second and p50/p99 latency per mode.
+
+Needs the PostgreSQL database from .env with seed data loaded
+(``python seed_data.py``).
+
+Usage:
+    python benchmarks/bench_db_modes.py --concurrency 64 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _start_server(port: int, db_async: bool, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_ASYNC="true" if db_async else "false")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/cities")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def _build_requests(client: httpx.AsyncClient, travel_date: str) -> List[Dict]:
+    cities = (await client.get("/api/cities")).json()["cities"]
+    if len(cities) < 2:
+        raise RuntimeError("seed the database first (python seed_data.py)")
+    requests = [{"method": "GET", "url": "/api/cities"}]
+    for _ in range(20):
+        src, dst = random.sample(cities, 2)
+        body = {"from_city_id": src["id"], "to_city_id": dst["id"], "travel_date": travel_date}
+        requests.append({"method": "POST", "url": "/api/search-buses", "json": body})
+        found = await client.post("/api/search-buses", json=body)
+        for bus in (found.json().get("buses", []) if found.status_code == 200 else [])[:2]:
+            requests.append({"method": "GET", "url": f"/api/bus/{bus['id']}/seats",
+                             "params": {"travel_date": travel_date}})
+    return requests
+
+
+async def _run_load(base_url: str, concurrency: int, duration: float, travel_date: str) -> Dict[str, float]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        requests = await _build_requests(client, travel_date)
+        latencies: List[float] = []
+        errors = 0
+        stop_at = time.monotonic() + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                spec = random.choice(requests)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(**spec)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per mode")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of untimed load per mode")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--travel-date", default=time.strftime("%Y-%m-%d"))
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    for mode, db_async in (("sync", False), ("async", True)):
+        server = _start_server(args.port, db_async, args.workers)
+        try:
+            asyncio.run(_wait_ready(base_url))
+            asyncio.run(_run_load(base_url, args.concurrency, args.warmup, args.travel_date))
+            results[mode] = asyncio.run(_run_load(base_url, args.concurrency, args.duration, args.travel_date))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(f"concurrency={args.concurrency} duration={args.duration}s workers={args.workers}")
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Measure what logging costs on the request path.
+
+Prints the cost of a disabled debug call, plain and lazy, and the time per
+request of a small app driven in-process (httpx.ASGITransport) with:
+
+- no logging at all,
+- the request middleware and JSON lines to the enqueued stdout (/dev/null)
+  and file sinks,
+- the same with the route sampled out (LOG_SAMPLE_RATES at 0),
+- the same with LOG_LEVEL=DEBUG, so the handler's debug line is written too.
+
+No database is needed. The difference between the first row and the others
+is the per-request logging overhead.
+
+Usage:
+    python benchmarks/bench_logging.py --requests 5000 --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+from app.core.logging import configure_logging, logger  # noqa: E402
+from app.core.middleware import RequestLoggingMiddleware  # noqa: E402
+
+ROUTE = "/api/items/{item_id}"
+
+
+def _build_app(with_middleware: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(ROUTE)
+    async def get_item(item_id: int):
+        logger.debug("Loading item {item_id}", item_id=item_id)
+        return {"id": item_id}
+
+    if with_middleware:
+        app.add_middleware(RequestLoggingMiddleware)
+    return app
+
+
+async def _drive(app: FastAPI, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(min(count, 200)):
+            await client.get(f"/api/items/{i}")
+        started = time.perf_counter()
+        for i in range(count):
+            await client.get(f"/api/items/{i}")
+        elapsed = time.perf_counter() - started
+    await logger.complete()
+    return elapsed / count
+
+
+def _configure(log_file: str, devnull, level: str = "INFO", sample_rates=None) -> None:
+    settings.LOG_FILE = log_file
+    settings.LOG_LEVEL = level
+    settings.LOG_SAMPLE_RATES = sample_rates or {}
+    # The stdout sink is kept, writing to /dev/null, so both sinks are measured
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        configure_logging()
+    finally:
+        sys.stdout = stdout
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per config; the fastest is reported")
+    args = parser.parse_args()
+
+    settings.LOG_FORMAT = "json"
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        log_file = os.path.join(tmp, "bench.log")
+
+        _configure(log_file, devnull)
+        number = 200_000
+        plain = timeit.timeit(lambda: logger.debug("Loading item {item_id}", item_id=1), number=number)
+        lazy = timeit.timeit(lambda: logger.opt(lazy=True).debug("Loading {value}", value=lambda: 1), number=number)
+        noop = timeit.timeit(lambda: None, number=number)
+
+        rows = []
+        logger.remove()
+        rows.append(("no logging", min(asyncio.run(_drive(_build_app(False), args.requests))
+                                       for _ in range(args.repeat))))
+        for label, level, rates in (
+            ("json file sink", "INFO", None),
+            ("sampled out", "INFO", {ROUTE: 0.0}),
+            ("debug enabled", "DEBUG", None),
+        ):
+            _configure(log_file, devnull, level, rates)
+            rows.append((label, min(asyncio.run(_drive(_build_app(True), args.requests))
+                                    for _ in range(args.repeat))))
+        logger.remove()
+
+    print(f"disabled debug call: {(plain - noop) / number * 1e9:.0f} ns, lazy: {(lazy - noop) / number * 1e9:.0f} ns")
+    baseline = rows[0][1]
+    print(f"{'config':<16} {'us/request':>11} {'overhead us':>12}")
+    for label, per_request in rows:
+        print(f"{label:<16} {per_request * 1e6:>11.1f} {(per_request - baseline) * 1e6:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Soak test for memory growth.
+
+Starts the API, drives a mixed load (city list, bus search, seat layout and,
+with --token, the booking list) for --duration seconds and samples the
+server's resident set size every --interval seconds. Samples go to a CSV
+(elapsed seconds, requests served, RSS in MiB); the summary compares RSS
+after warmup with RSS at the end, so steady growth under a flat workload
+stands out. Follow up with the tracemalloc diff endpoints
+(/api/internal/memory/*) to find where it comes from.
+
+Linux only (reads /proc/<pid>/statm). Needs the database from .env with
+seed data loaded (``python seed_data.py``).
+
+Usage:
+    python benchmarks/bench_memory_soak.py --duration 600 --csv soak.csv
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _rss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+
+
+def _start_server(port: int) -> subprocess.Popen:
+    # A single process, so the RSS sampled is the one serving requests
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+
+
+async def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/cities")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def _build_requests(client: httpx.AsyncClient, travel_date: str, token: Optional[str]) -> List[Dict]:
+    cities = (await client.get("/api/cities")).json()["cities"]
+    if len(cities) < 2:
+        raise RuntimeError("seed the database first (python seed_data.py)")
+    requests = [{"method": "GET", "url": "/api/cities"}]
+    if token:
+        requests.append({"method": "GET", "url": "/api/bookings", "headers": {"Authorization": f"Bearer {token}"}})
+    for _ in range(20):
+        src, dst = random.sample(cities, 2)
+        body = {"from_city_id": src["id"], "to_city_id": dst["id"], "travel_date": travel_date}
+        requests.append({"method": "POST", "url": "/api/search-buses", "json": body})
+        found = await client.post("/api/search-buses", json=body)
+        for bus in (found.json().get("buses", []) if found.status_code == 200 else [])[:2]:
+            requests.append({"method": "GET", "url": f"/api/bus/{bus['id']}/seats",
+                             "params": {"travel_date": travel_date}})
+    return requests
+
+
+async def _soak(base_url: str, pid: int, args) -> List[Dict[str, float]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        requests = await _build_requests(client, args.travel_date, args.token)
+        served = errors = 0
+        started = time.monotonic()
+        stop_at = started + args.warmup + args.duration
+        samples: List[Dict[str, float]] = []
+
+        async def worker() -> None:
+            nonlocal served, errors
+            while time.monotonic() < stop_at:
+                try:
+                    response = await client.request(**random.choice(requests))
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                served += 1
+
+        async def sampler() -> None:
+            while time.monotonic() < stop_at:
+                samples.append({"elapsed": time.monotonic() - started, "requests": served,
+                                "errors": errors, "rss_mib": _rss_mib(pid)})
+                await asyncio.sleep(args.interval)
+
+        await asyncio.gather(sampler(), *(worker() for _ in range(args.concurrency)))
+        samples.append({"elapsed": time.monotonic() - started, "requests": served,
+                        "errors": errors, "rss_mib": _rss_mib(pid)})
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=300.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=30.0, help="seconds of load before the baseline sample")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between RSS samples")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--travel-date", default=time.strftime("%Y-%m-%d"))
+    parser.add_argument("--token", help="bearer token, to include the booking list in the mix")
+    parser.add_argument("--csv", default="memory_soak.csv")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = _start_server(args.port)
+    try:
+        asyncio.run(_wait_ready(base_url))
+        samples = asyncio.run(_soak(base_url, server.pid, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    with open(args.csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["elapsed", "requests", "errors", "rss_mib"])
+        writer.writeheader()
+        writer.writerows(samples)
+
+    baseline = next((s for s in samples if s["elapsed"] >= args.warmup), samples[-1])
+    end = samples[-1]
+    served = end["requests"] - baseline["requests"]
+    growth = end["rss_mib"] - baseline["rss_mib"]
+    print(f"concurrency={args.concurrency} duration={args.duration}s samples={len(samples)} -> {args.csv}")
+    print(f"requests={served} errors={end['errors']}")
+    print(f"rss after warmup={baseline['rss_mib']:.1f} MiB  end={end['rss_mib']:.1f} MiB  "
+          f"peak={max(s['rss_mib'] for s in samples):.1f} MiB")
+    print(f"growth={growth:+.1f} MiB ({growth * 1024 * 1024 / served if served else 0:.1f} bytes/request)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
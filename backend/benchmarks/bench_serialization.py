@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of serializing the largest responses.
+
+For each endpoint this builds a representative payload: a 40-seat layout,
+a search with 50 buses and a 100-booking page. It then times, per response:
+
+- ``stdlib json``: json.dumps of the service's dict, with no validation.
+  This is the floor for the old path.
+- ``response_model``: what FastAPI does with a returned dict before its own
+  dump_json fast path (FastAPI 0.116, the oldest version pyproject allows).
+  It validates into the model, dumps back to a JSON-compatible dict, then
+  calls json.dumps.
+- ``model_response``: app.core.responses, where pydantic-core validates and
+  serializes to bytes in one pass.
+- ``prebuilt model``: model_response given the model the service built,
+  which is what the routes do; this costs the serialization alone.
+
+It also checks that every path produces the same bytes. No database is needed.
+
+Usage:
+    python benchmarks/bench_serialization.py --number 2000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.booking import BookingListResponse  # noqa: E402
+from app.schemas.bus import BusSearchResponse, SeatLayoutResponse  # noqa: E402
+
+
+def _seat_layout(seats: int = 40) -> Dict[str, Any]:
+    return {
+        "bus_id": str(uuid.uuid4()),
+        "seats": [
+            {"id": str(uuid.uuid4()), "seat_no": f"{'LU'[n % 2]}{n}", "seat_type": ("Lower", "Upper")[n % 2],
+             "price": 810.0 + 90 * (n % 2), "is_available": n % 3 != 0}
+            for n in range(seats)
+        ],
+    }
+
+
+def _search(buses: int = 50) -> Dict[str, Any]:
+    return {
+        "buses": [
+            {"id": str(uuid.uuid4()), "operator": f"Operator {n}", "departure_time": "21:00",
+             "arrival_time": "06:00", "duration": "9h", "fare": 900.0 + n, "rating": 4.3,
+             "seats_available": 28, "lowest_price_by_seat_type": {"Lower": 810.0, "Upper": 900.0 + n}}
+            for n in range(buses)
+        ],
+        "message": f"Found {buses} buses for your journey",
+    }
+
+
+def _bookings(count: int = 100) -> Dict[str, Any]:
+    start = date(2025, 9, 1)
+    return {
+        "bookings": [
+            {"booking_id": str(uuid.uuid4()), "bus_name": "VRL Travels", "from_city": "Bangalore",
+             "to_city": "Hyderabad", "date": str(start + timedelta(days=n)), "seats": ["L1", "L2"],
+             "status": "CONFIRMED", "amount": 1800.0}
+            for n in range(count)
+        ],
+        "next_cursor": "MjAyNS0wOS0wMXwuLi4=",
+    }
+
+
+ENDPOINTS: List[Tuple[str, Type[BaseModel], Callable[[], Dict[str, Any]]]] = [
+    ("GET /api/bus/{bus_id}/seats", SeatLayoutResponse, _seat_layout),
+    ("POST /api/search-buses", BusSearchResponse, _search),
+    ("GET /api/bookings", BookingListResponse, _bookings),
+]
+
+
+def _stdlib(content: Any) -> bytes:
+    # Starlette's JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _paths(model: Type[BaseModel], content: Dict[str, Any]) -> Dict[str, Callable[[], bytes]]:
+    adapter = TypeAdapter(model)
+    prebuilt = model.model_validate(content)
+    return {
+        "stdlib json": lambda: _stdlib(content),
+        "response_model": lambda: _stdlib(adapter.dump_python(adapter.validate_python(content), mode="json")),
+        "model_response": lambda: model.model_validate(content).model_dump_json().encode(),
+        "prebuilt model": lambda: prebuilt.model_dump_json().encode(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="serializations per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per path; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<30} {'path':<16} {'bytes':>7} {'us/response':>12} {'vs response_model':>18}")
+    for name, model, build in ENDPOINTS:
+        paths = _paths(model, build())
+        bodies = {label: fn() for label, fn in paths.items()}
+        if len(set(bodies.values())) != 1:
+            print(f"{name}: paths disagree on the bytes", file=sys.stderr)
+            return 1
+        timings = {
+            label: min(timeit.repeat(fn, number=args.number, repeat=args.repeat)) / args.number * 1e6
+            for label, fn in paths.items()
+        }
+        for label, micros in timings.items():
+            print(f"{name:<30} {label:<16} {len(bodies[label]):>7} {micros:>12.1f} "
+                  f"{timings['response_model'] / micros:>17.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
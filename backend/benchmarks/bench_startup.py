@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Measure import time of ``app.main`` and lifespan startup time against a budget.
+
+Each run is a fresh interpreter, so nothing is served from a warm module
+cache. Startup is the time from entering the app's lifespan to the point it
+would start accepting requests. Run it with ENVIRONMENT=production (and the
+database from .env migrated) to measure the production path.
+
+Budgets live in benchmarks/startup_budget.json; the script exits non-zero when
+the median of either measurement is over budget, so CI can track it.
+
+Usage:
+    ENVIRONMENT=production python benchmarks/bench_startup.py --runs 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(BACKEND_DIR, "benchmarks", "startup_budget.json")
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+
+def _measure_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"startup failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=BUDGET_FILE, help="JSON file with import_ms and startup_ms budgets")
+    args = parser.parse_args()
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+    samples = [_measure_once() for _ in range(args.runs)]
+
+    over = False
+    print(f"environment={os.environ.get('ENVIRONMENT', 'development')} runs={args.runs}")
+    print(f"{'phase':<8} {'median ms':>10} {'max ms':>8} {'budget ms':>10}")
+    for key, label in (("import_ms", "import"), ("startup_ms", "startup")):
+        values = [sample[key] for sample in samples]
+        median = statistics.median(values)
+        over = over or median > budget[key]
+        flag = "  OVER BUDGET" if median > budget[key] else ""
+        print(f"{label:<8} {median:>10.1f} {max(values):>8.1f} {budget[key]:>10}{flag}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the bus booking backend.
+
+Usage:
+    python manage.py seat-bitmaps verify    # report trips whose seat bitmap drifted
+    python manage.py seat-bitmaps rebuild   # recompute drifted bitmaps from booking_seats
+    python manage.py user-stats verify      # report users whose booking stats drifted
+    python manage.py user-stats rebuild     # backfill/repair user_booking_stats from bookings
+    python manage.py precompress-static     # write .br/.gz siblings for the built SPA in static/
+"""
+import argparse
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+
+
+def seat_bitmaps(args) -> int:
+    from app.services.seat_bitmap import verify_bitmaps
+
+    with SessionLocal() as db:
+        report = verify_bitmaps(db, repair=args.action == "rebuild")
+    print(json.dumps(report, indent=2))
+    # Non-zero exit on unrepaired drift so the check can gate deploys/cron alerts
+    return 1 if report["drifted"] and not report["repaired"] else 0
+
+
+def user_stats(args) -> int:
+    from app.services.user_stats import verify_stats
+
+    with SessionLocal() as db:
+        report = verify_stats(db, repair=args.action == "rebuild")
+    print(json.dumps(report, indent=2))
+    return 1 if report["drifted"] and not report["repaired"] else 0
+
+
+def precompress_static(args) -> int:
+    from app.config import settings
+    from app.core.compression import SUFFIXES, precompress_directory
+
+    min_size = settings.COMPRESSION_MIN_SIZE if args.min_size is None else args.min_size
+    report = precompress_directory(args.directory, settings.COMPRESSION_TYPES, min_size)
+    report["encodings"] = list(SUFFIXES)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bitmaps = commands.add_parser("seat-bitmaps", help="verify or rebuild per-trip seat occupancy bitmaps")
+    bitmaps.add_argument("action", choices=["verify", "rebuild"])
+    bitmaps.set_defaults(handler=seat_bitmaps)
+
+    stats = commands.add_parser("user-stats", help="verify or rebuild per-user booking statistics")
+    stats.add_argument("action", choices=["verify", "rebuild"])
+    stats.set_defaults(handler=user_stats)
+
+    precompress = commands.add_parser("precompress-static", help="write .br/.gz siblings for static files at build time")
+    precompress.add_argument("directory", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+    precompress.add_argument("--min-size", type=int, help="leave smaller files uncompressed (default COMPRESSION_MIN_SIZE)")
+    precompress.set_defaults(handler=precompress_static)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""seat index and trip seat bitmap
+
+Revision ID: 4a7c1e9b2d35
+Revises: bd51210351dd
+Create Date: 2025-09-02 10:12:31.418220
+
+After upgrading, run ``python manage.py seat-bitmaps rebuild`` to fill the
+bitmaps of trips that already have bookings.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7c1e9b2d35'
+down_revision: Union[str, Sequence[str], None] = 'bd51210351dd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Set on trips when upgrade() had to create the table, so downgrade() knows to drop it
+TRIPS_CREATED_COMMENT = 'created by revision 4a7c1e9b2d35'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('seats', sa.Column('seat_index', sa.Integer(), nullable=True))
+    # Number each bus's seats in natural seat_no order (S1, S2, ..., S10)
+    op.execute("""
+        UPDATE seats SET seat_index = numbered.rn - 1
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY bus_id ORDER BY length(seat_no), seat_no
+            ) AS rn
+            FROM seats
+        ) AS numbered
+        WHERE seats.id = numbered.id
+    """)
+    op.alter_column('seats', 'seat_index', nullable=False)
+    op.create_unique_constraint('uq_seats_bus_seat_index', 'seats', ['bus_id', 'seat_index'])
+
+    # bd51210351dd was generated empty, so the trips table may only exist
+    # on databases that were bootstrapped with create_all().
+    if not sa.inspect(op.get_bind()).has_table('trips'):
+        op.create_table('trips',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('bus_id', sa.UUID(), nullable=False),
+        sa.Column('service_date', sa.Date(), nullable=False),
+        sa.Column('departure_time', sa.String(length=10), nullable=True),
+        sa.Column('arrival_time', sa.String(length=10), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('seat_bitmap', sa.LargeBinary(), server_default='', nullable=False),
+        sa.ForeignKeyConstraint(['bus_id'], ['buses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bus_id', 'service_date', name='uq_trips_bus_date'),
+        comment=TRIPS_CREATED_COMMENT
+        )
+    else:
+        op.add_column('trips', sa.Column('seat_bitmap', sa.LargeBinary(), server_default='', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    comment = sa.inspect(op.get_bind()).get_table_comment('trips').get('text')
+    if comment == TRIPS_CREATED_COMMENT:
+        op.drop_table('trips')
+    else:
+        op.drop_column('trips', 'seat_bitmap')
+    op.drop_constraint('uq_seats_bus_seat_index', 'seats', type_='unique')
+    op.drop_column('seats', 'seat_index')
@@ -0,0 +1,30 @@
+"""booking history indexes
+
+Revision ID: 5b9e2c7d1f84
+Revises: 8d3e5f0a6c21
+Create Date: 2025-09-05 11:24:47.310582
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e2c7d1f84'
+down_revision: Union[str, Sequence[str], None] = '8d3e5f0a6c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_bookings_user_date_id', 'bookings', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_booking_seats_booking_id', 'booking_seats', ['booking_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_seats_booking_id', table_name='booking_seats')
+    op.drop_index('ix_bookings_user_date_id', table_name='bookings')
@@ -0,0 +1,56 @@
+"""unique seat per bus and date
+
+Revision ID: 8d3e5f0a6c21
+Revises: 4a7c1e9b2d35
+Create Date: 2025-09-03 16:40:12.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3e5f0a6c21'
+down_revision: Union[str, Sequence[str], None] = '4a7c1e9b2d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('booking_seats', sa.Column('bus_id', sa.UUID(), nullable=True))
+    op.add_column('booking_seats', sa.Column('travel_date', sa.Date(), nullable=True))
+    op.execute("""
+        UPDATE booking_seats SET bus_id = bookings.bus_id, travel_date = bookings.date
+        FROM bookings
+        WHERE bookings.id = booking_seats.booking_id
+    """)
+    op.alter_column('booking_seats', 'bus_id', nullable=False)
+    op.alter_column('booking_seats', 'travel_date', nullable=False)
+    op.create_foreign_key('booking_seats_bus_id_fkey', 'booking_seats', 'buses', ['bus_id'], ['id'])
+
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT count(*) FROM (
+            SELECT 1 FROM booking_seats
+            GROUP BY bus_id, travel_date, seat_id
+            HAVING count(*) > 1
+        ) AS dup
+    """)).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} seats are already double-booked; cancel the duplicate bookings "
+            "before adding uq_booking_seats_bus_date_seat"
+        )
+    op.create_unique_constraint(
+        'uq_booking_seats_bus_date_seat', 'booking_seats', ['bus_id', 'travel_date', 'seat_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_booking_seats_bus_date_seat', 'booking_seats', type_='unique')
+    op.drop_constraint('booking_seats_bus_id_fkey', 'booking_seats', type_='foreignkey')
+    op.drop_column('booking_seats', 'travel_date')
+    op.drop_column('booking_seats', 'bus_id')
@@ -0,0 +1,41 @@
+"""hot path indexes
+
+Revision ID: a6d2f9c4e317
+Revises: e3a1f6b8c052
+Create Date: 2025-09-07 10:12:05.118934
+
+Lookups already served by earlier constraints and indexes are not repeated:
+seats.bus_id and trips(bus_id, service_date) by uq_seats_bus_seat_index and
+uq_trips_bus_date, bookings.user_id by ix_bookings_user_date_id and
+booking_seats.booking_id by ix_booking_seats_booking_id.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2f9c4e317'
+down_revision: Union[str, Sequence[str], None] = 'e3a1f6b8c052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_buses_from_to_city', 'buses', ['from_city_id', 'to_city_id'], unique=False)
+    op.create_index('ix_trips_service_date', 'trips', ['service_date'], unique=False)
+    op.create_index('ix_seats_bus_layout', 'seats', ['bus_id', 'seat_index'], unique=False,
+                    postgresql_include=['id', 'seat_no', 'seat_type', 'price'])
+    op.create_index('ix_bookings_bus_date_status', 'bookings', ['bus_id', 'date', 'status'], unique=False)
+    op.create_index('ix_booking_seats_seat_id', 'booking_seats', ['seat_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_seats_seat_id', table_name='booking_seats')
+    op.drop_index('ix_bookings_bus_date_status', table_name='bookings')
+    op.drop_index('ix_seats_bus_layout', table_name='seats')
+    op.drop_index('ix_trips_service_date', table_name='trips')
+    op.drop_index('ix_buses_from_to_city', table_name='buses')
@@ -0,0 +1,47 @@
+"""user booking stats
+
+Revision ID: e3a1f6b8c052
+Revises: 5b9e2c7d1f84
+Create Date: 2025-09-06 09:51:18.642730
+
+The table is backfilled from bookings here; ``python manage.py user-stats
+verify`` checks it against bookings afterwards and ``rebuild`` repairs it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a1f6b8c052'
+down_revision: Union[str, Sequence[str], None] = '5b9e2c7d1f84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_booking_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('total_bookings', sa.Integer(), nullable=False),
+    sa.Column('confirmed_spend', sa.Float(), nullable=False),
+    sa.Column('cancellations', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute("""
+        INSERT INTO user_booking_stats (user_id, total_bookings, confirmed_spend, cancellations)
+        SELECT user_id,
+               count(*),
+               coalesce(sum(amount) FILTER (WHERE status = 'CONFIRMED'), 0),
+               count(*) FILTER (WHERE status = 'CANCELLED')
+        FROM bookings
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_booking_stats')
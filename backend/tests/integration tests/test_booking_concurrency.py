@@ -0,0 +1,119 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import text, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import engine
+from app.db.base import Base
+from app.db.models.booking import Booking
+from app.db.models.booking_seat import BookingSeat
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.db.models.user import User
+from app.schemas.booking import BookingCreate
+from app.services import seat_bitmap
+from app.services.booking_service import BookingService, SeatConflictError, BookingContentionError
+
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+REQUESTS = 300
+WORKERS = 32
+SEATS = 36
+TRAVEL_DATE = date(2025, 9, 1)
+
+
+@pytest.fixture(scope="module")
+def db_session():
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE;"))
+            connection.execute(text("CREATE SCHEMA public;"))
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'))
+            connection.commit()
+    except OperationalError:
+        pytest.skip("PostgreSQL is not reachable")
+
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def sleeper_bus(db_session):
+    a, b = City(id=uuid.uuid4(), name="From"), City(id=uuid.uuid4(), name="To")
+    bus = Bus(id=uuid.uuid4(), operator="Flash Sale Travels", from_city_id=a.id, to_city_id=b.id,
+              departure_time="21:00", arrival_time="06:00", fare=900.0)
+    db_session.add_all([a, b])
+    db_session.commit()
+    db_session.add(bus)
+    db_session.commit()
+    db_session.add_all(
+        [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i, seat_type="Lower", price=900.0)
+         for i in range(SEATS)]
+        + [Trip(bus_id=bus.id, service_date=TRAVEL_DATE, status="ACTIVE")]
+    )
+    db_session.add_all([User(id=uuid.uuid4(), phone=f"7{i:09d}", country_code="+91") for i in range(REQUESTS)])
+    db_session.commit()
+    return bus.id
+
+
+def test_parallel_bookings_never_double_book(db_session, sleeper_bus):
+    users = db_session.query(User).order_by(User.phone).all()
+    rng = random.Random(42)
+    # Everyone fights over the same 36 seats, one or two at a time
+    wanted = [rng.sample([f"S{i + 1}" for i in range(SEATS)], rng.choice([1, 2])) for _ in range(REQUESTS)]
+
+    def book(i):
+        db = TestingSessionLocal()
+        try:
+            user = db.get(User, users[i].id)
+            BookingService(db).create_booking(
+                BookingCreate(bus_id=str(sleeper_bus), travel_date=TRAVEL_DATE, seats=wanted[i]), user
+            )
+            return "booked", wanted[i]
+        except SeatConflictError as e:
+            assert set(e.seats) <= set(wanted[i])
+            return "conflict", e.seats
+        except BookingContentionError:
+            return "contention", []
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        outcomes = list(pool.map(book, range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+
+    booked_seats = [seat for kind, seats in outcomes if kind == "booked" for seat in seats]
+    print(
+        f"\n{REQUESTS} booking requests in {elapsed:.2f}s ({REQUESTS / elapsed:.0f} req/s): "
+        f"{sum(k == 'booked' for k, _ in outcomes)} booked, "
+        f"{sum(k == 'conflict' for k, _ in outcomes)} conflicts, "
+        f"{sum(k == 'contention' for k, _ in outcomes)} gave up"
+    )
+
+    # Zero double-booking, both from the callers' view and in storage
+    assert len(booked_seats) == len(set(booked_seats))
+    rows = db_session.query(BookingSeat.seat_id, func.count()).group_by(BookingSeat.seat_id).all()
+    assert all(n == 1 for _, n in rows)
+    assert len(rows) == len(booked_seats)
+    assert db_session.query(Booking).filter(Booking.status == "CONFIRMED").count() == \
+        sum(k == "booked" for k, _ in outcomes)
+
+    # The trip bitmap matches the rows that won
+    db_session.expire_all()
+    trip = db_session.query(Trip).filter(Trip.bus_id == sleeper_bus).one()
+    assert seat_bitmap.count(trip.seat_bitmap) == len(booked_seats)
+    assert seat_bitmap.verify_bitmaps(db_session)["drifted"] == []
@@ -0,0 +1,85 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+
+class _RespStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server (SET NX PX, GET, MGET, DEL, PEXPIRE, EVAL) for the Redis-backed stores."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def live(self, key):
+        value = self.data.get(key)
+        if value is not None and value[1] is not None and value[1] <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2].decode())
+            with self.server.lock:
+                self.wfile.write(self.run(args[0].upper(), args[1:]))
+
+    def run(self, cmd, args):
+        server = self.server
+        if cmd == "PING":
+            return b"+PONG\r\n"
+        if cmd == "SET":
+            key, value, opts = args[0], args[1], [a.upper() for a in args[2:]]
+            if "NX" in opts and server.live(key) is not None:
+                return b"$-1\r\n"
+            expires = time.time() + int(args[2 + opts.index("PX") + 1]) / 1000 if "PX" in opts else None
+            server.data[key] = (value, expires)
+            return b"+OK\r\n"
+        if cmd in ("GET", "MGET"):
+            values = [server.live(key) for key in args]
+            out = b"".join(b"$-1\r\n" if v is None else b"$%d\r\n%s\r\n" % (len(v[0]), v[0].encode())
+                           for v in values)
+            return out if cmd == "GET" else b"*%d\r\n" % len(values) + out
+        if cmd == "DEL":
+            removed = sum(server.data.pop(key, None) is not None for key in args)
+            return b":%d\r\n" % removed
+        if cmd == "PEXPIRE":
+            value = server.live(args[0])
+            if value is None:
+                return b":0\r\n"
+            server.data[args[0]] = (value[0], time.time() + int(args[1]) / 1000)
+            return b":1\r\n"
+        if cmd == "EVAL":
+            # Only the stores' compare-and-set scripts: act if KEYS[1] holds ARGV[1]
+            script, keys = args[0], args[2:2 + int(args[1])]
+            argv = args[2 + len(keys):]
+            value = server.live(keys[0])
+            if value is None or value[0] != argv[0]:
+                return b"$-1\r\n"
+            if "'DEL'" in script:
+                return self.run("DEL", keys[:1])
+            return self.run("SET", [keys[0], argv[1], "PX", argv[2]])
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.fixture
+def resp_server():
+    server = _RespStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,158 @@
+import asyncio
+import gzip
+import os
+
+import brotli
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import settings
+from app.core.compression import choose_encoding, precompress_directory
+from app.core.http_cache import etag_matches
+from app.core.middleware import CompressionMiddleware
+from app.core.static_files import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles
+
+BIG = {"seats": [{"seat_no": f"A{n}", "seat_type": "Sleeper", "is_available": True} for n in range(100)]}
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/big")
+    async def big(request: Request):
+        if etag_matches(request.headers.get("If-None-Match"), '"v1"'):
+            return Response(status_code=304, headers={"ETag": '"v1"'})
+        return Response(content=httpx.Response(200, json=BIG).content, media_type="application/json",
+                        headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    async def image():
+        return Response(content=b"\x89PNG" + b"0" * 5000, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for n in range(50):
+                yield f"line {n} ".encode() * 20
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+def _get(app, path, accept="gzip", **headers):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": accept, **headers})
+    return asyncio.run(run())
+
+
+def test_large_json_is_gzipped_with_its_own_strong_etag():
+    response = _get(_app(), "/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert int(response.headers["content-length"]) < len(httpx.Response(200, json=BIG).content)
+    assert response.json() == BIG
+
+
+def test_encoded_etag_revalidates_to_304_with_that_etag():
+    response = _get(_app(), "/big", **{"If-None-Match": '"v1-gzip"'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"v1-gzip"' and response.headers["vary"] == "Accept-Encoding"
+
+    plain = _get(_app(), "/big", accept="identity", **{"If-None-Match": '"v1"'})
+    assert plain.status_code == 304 and plain.headers["etag"] == '"v1"'
+
+
+def test_streamed_response_is_compressed_chunk_by_chunk():
+    response = _get(_app(), "/stream")
+    assert response.headers["content-encoding"] == "gzip" and "content-length" not in response.headers
+    assert response.text == "".join(f"line {n} " * 20 for n in range(50))
+
+
+def test_brotli_preferred_for_responses_and_static_files(static_dir):
+    response = _get(_app(), "/big", accept="gzip, br")
+    assert response.headers["content-encoding"] == "br" and response.headers["etag"] == '"v1-br"'
+    assert response.json() == BIG
+
+    asset = _static_get(static_dir, "/assets/index-D8sTzP1q.js", accept="gzip, br")
+    assert asset.headers["content-encoding"] == "br"
+    assert int(asset.headers["content-length"]) == (static_dir / "index-D8sTzP1q.js.br").stat().st_size
+    assert brotli.decompress((static_dir / "index-D8sTzP1q.js.br").read_bytes()) == (static_dir / "index-D8sTzP1q.js").read_bytes()
+
+
+#edge case: below the minimum size or outside the type allowlist, bodies go out as they are
+@pytest.mark.parametrize("path", ["/small", "/image"])
+def test_small_and_unlisted_responses_are_not_compressed(path, monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+    response = _get(_app(), path)
+    assert "content-encoding" not in response.headers
+    assert ("vary" in response.headers) == (path == "/small")
+
+
+#negative path: clients that don't accept an encoding get identity
+@pytest.mark.parametrize("accept", ["identity", "gzip;q=0", ""])
+def test_identity_when_not_accepted(accept):
+    response = _get(_app(), "/big", accept=accept)
+    assert "content-encoding" not in response.headers and response.headers["etag"] == '"v1"'
+
+
+def test_choose_encoding_honours_preference_and_q_values():
+    assert choose_encoding("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("gzip, br;q=0", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("*;q=0.5", ["br", "gzip"]) == "br"
+    assert choose_encoding("deflate", ["br", "gzip"]) is None
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "index-D8sTzP1q.js").write_text("console.log('bus');" * 200)
+    (tmp_path / "logo.png").write_bytes(os.urandom(4000))
+    report = precompress_directory(str(tmp_path), settings.COMPRESSION_TYPES, min_size=100)
+    assert report["files"] == 1
+    return tmp_path
+
+
+def _static_get(directory, path, **headers):
+    app = FastAPI()
+    app.mount("/assets", PrecompressedStaticFiles(directory=str(directory), immutable=True), name="assets")
+    app.add_middleware(CompressionMiddleware)
+    return _get(app, path, **headers)
+
+
+def test_precompressed_sibling_is_served_as_is(static_dir):
+    response = _static_get(static_dir, "/assets/index-D8sTzP1q.js")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert int(response.headers["content-length"]) == (static_dir / "index-D8sTzP1q.js.gz").stat().st_size
+    assert response.text == "console.log('bus');" * 200
+
+    revalidated = _static_get(static_dir, "/assets/index-D8sTzP1q.js", **{"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+#edge case: without gzip the original file is served, with its own ETag
+def test_original_served_without_accept_encoding(static_dir):
+    plain = _static_get(static_dir, "/assets/index-D8sTzP1q.js", accept="identity")
+    gzipped = _static_get(static_dir, "/assets/index-D8sTzP1q.js")
+    assert "content-encoding" not in plain.headers and plain.headers["vary"] == "Accept-Encoding"
+    assert plain.headers["etag"] != gzipped.headers["etag"]
+
+
+#negative path: incompressible files get no sibling
+def test_incompressible_files_are_not_precompressed(static_dir):
+    assert not (static_dir / "logo.png.gz").exists()
+    random_text = static_dir / "noise.txt"
+    random_text.write_bytes(os.urandom(3000).hex().encode()[:50])
+    precompress_directory(str(static_dir), ["text/plain"])
+    assert not (static_dir / "noise.txt.gz").exists()
+    assert gzip.decompress((static_dir / "index-D8sTzP1q.js.gz").read_bytes()).startswith(b"console")
@@ -0,0 +1,225 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.idempotency import (
+    InMemoryIdempotencyStore, RedisIdempotencyStore, StoredResponse,
+    IdempotencyKeyReuseError, IdempotencyInProgressError,
+)
+from app.core.resp import RespClient
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_store(request):
+    clients = []
+
+    def make(**kwargs):
+        if request.param == "memory":
+            return InMemoryIdempotencyStore(**kwargs)
+        server = request.getfixturevalue("resp_server")
+        clients.append(RespClient(f"redis://127.0.0.1:{server.server_address[1]}/0"))
+        return RedisIdempotencyStore(clients[-1], **kwargs)
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def _stored(status_code=201, body=None):
+    async def handler():
+        return StoredResponse(status_code, {} if body is None else body, {})
+    return handler
+
+
+def _run(store, key, fingerprint, handler):
+    return asyncio.run(store.execute(key, fingerprint, handler))
+
+
+def test_repeat_replays_stored_response(make_store):
+    store = make_store(ttl=60, wait_timeout=1)
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return StoredResponse(201, {"booking_id": "b1"}, {})
+
+    first, replayed = _run(store, "u1:k1", "fp", handler)
+    assert (first.body, replayed) == ({"booking_id": "b1"}, False)
+    again, replayed = _run(store, "u1:k1", "fp", handler)
+    assert (again, replayed) == (first, True)
+    assert len(calls) == 1
+
+
+def test_concurrent_duplicates_run_handler_once(make_store):
+    store = make_store(ttl=60, wait_timeout=5)
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return StoredResponse(201, {"booking_id": "b1"}, {})
+
+    async def run():
+        return await asyncio.gather(*(store.execute("u1:k1", "fp", handler) for _ in range(8)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * 7
+    assert {r.body["booking_id"] for r, _ in results} == {"b1"}
+
+
+#negative path: same key with a different payload is rejected
+def test_key_reuse_with_other_payload_rejected(make_store):
+    store = make_store(ttl=60, wait_timeout=1)
+    _run(store, "u1:k1", "fp-a", _stored())
+    with pytest.raises(IdempotencyKeyReuseError):
+        _run(store, "u1:k1", "fp-b", _stored())
+
+
+def test_client_errors_are_stored_server_errors_are_not(make_store):
+    store = make_store(ttl=60, wait_timeout=1)
+
+    async def conflict():
+        raise HTTPException(status_code=409, detail={"seats": ["S1"]})
+
+    with pytest.raises(HTTPException):
+        _run(store, "u1:k1", "fp", conflict)
+    stored, replayed = _run(store, "u1:k1", "fp", _stored())
+    assert (stored.status_code, stored.body, replayed) == (409, {"detail": {"seats": ["S1"]}}, True)
+
+    async def unavailable():
+        raise HTTPException(status_code=503, detail="busy")
+
+    with pytest.raises(HTTPException):
+        _run(store, "u1:k2", "fp", unavailable)
+    stored, replayed = _run(store, "u1:k2", "fp", _stored(body={"ok": True}))
+    assert (stored.status_code, replayed) == (201, False)
+
+
+#edge case: a repeat waiting on a failed original runs the handler itself
+def test_waiting_repeat_retries_after_server_error(make_store):
+    store = make_store(ttl=60, wait_timeout=1)
+
+    async def unavailable():
+        await asyncio.sleep(0.02)
+        raise HTTPException(status_code=503, detail="busy")
+
+    async def run():
+        return await asyncio.gather(
+            store.execute("u1:k1", "fp", unavailable),
+            store.execute("u1:k1", "fp", _stored(body={"n": 2})),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, HTTPException)
+    assert (second[0].body, second[1]) == ({"n": 2}, False)
+
+
+#edge case: a repeat gives up if the original never finishes
+def test_waiting_repeat_times_out(make_store):
+    store = make_store(ttl=60, wait_timeout=0.05)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return StoredResponse(201, {}, {})
+
+        owner = asyncio.create_task(store.execute("u1:k1", "fp", slow))
+        await asyncio.sleep(0.01)
+        with pytest.raises(IdempotencyInProgressError):
+            await store.execute("u1:k1", "fp", _stored())
+        release.set()
+        return await owner
+
+    assert asyncio.run(run())[1] is False
+
+
+def test_expired_keys_are_evicted_in_bulk():
+    store = InMemoryIdempotencyStore(ttl=10, wait_timeout=1)
+    for i in range(5):
+        _run(store, f"u1:k{i}", "fp", _stored())
+    assert len(store) == 5
+    assert store.evict_expired(now=time.monotonic() + 11) == 5
+    assert len(store) == 0
+
+    # An expired key runs the handler again
+    stored, replayed = _run(store, "u1:k0", "fp", _stored(body={"n": 2}))
+    assert (stored.body, replayed) == ({"n": 2}, False)
+
+
+#edge case: past max_entries the oldest keys are dropped to make room
+def test_memory_store_is_bounded():
+    store = InMemoryIdempotencyStore(ttl=60, wait_timeout=1, max_entries=3)
+    for i in range(5):
+        _run(store, f"u1:k{i}", "fp", _stored(body={"n": i}))
+    assert len(store) == 3
+    assert _run(store, "u1:k4", "fp", _stored())[1] is True
+    stored, replayed = _run(store, "u1:k0", "fp", _stored(body={"n": 5}))
+    assert (stored.body, replayed) == ({"n": 5}, False)
+    assert len(store) == 3
+
+
+#edge case: a full table never drops a key whose request is still running
+def test_memory_store_keeps_in_flight_keys_when_full():
+    store = InMemoryIdempotencyStore(ttl=60, wait_timeout=1, max_entries=1)
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow():
+            calls.append(1)
+            await release.wait()
+            return StoredResponse(201, {"booking_id": "b1"}, {})
+
+        first = asyncio.create_task(store.execute("u1:k1", "fp", slow))
+        await asyncio.sleep(0.01)
+        await store.execute("u1:k2", "fp", _stored())
+        repeat = asyncio.create_task(store.execute("u1:k1", "fp", slow))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await first, await repeat
+
+    first, repeat = asyncio.run(run())
+    assert (first[1], repeat) == (False, (first[0], True))
+    assert len(calls) == 1
+
+
+#edge case: a worker whose claim was taken over leaves the new owner's key alone
+@pytest.mark.parametrize("status_code", [201, 409, 503])
+def test_redis_lost_claim_is_not_overwritten_or_released(resp_server, status_code):
+    client = RespClient(f"redis://127.0.0.1:{resp_server.server_address[1]}/0")
+    store = RedisIdempotencyStore(client, ttl=60, wait_timeout=0.05, lock_seconds=1)
+    takeover = '{"fingerprint": "fp", "owner": "other"}'
+
+    async def handler():
+        # The claim expired mid-request and another worker claimed the key
+        client.execute("SET", "idempotency:u1:k1", takeover, "PX", 1000)
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail="failed")
+        return StoredResponse(status_code, {}, {})
+
+    try:
+        _run(store, "u1:k1", "fp", handler)
+    except HTTPException:
+        pass
+    assert client.execute("GET", "idempotency:u1:k1") == takeover
+    client.close()
+
+
+#edge case: a claim left by a worker that died mid-request expires on its own
+def test_redis_claim_of_dead_worker_expires(resp_server):
+    client = RespClient(f"redis://127.0.0.1:{resp_server.server_address[1]}/0")
+    store = RedisIdempotencyStore(client, ttl=60, wait_timeout=0.05, lock_seconds=1)
+    client.execute("SET", "idempotency:u1:k1", '{"fingerprint": "fp", "owner": "gone"}', "NX", "PX", 1000)
+    with pytest.raises(IdempotencyInProgressError):
+        _run(store, "u1:k1", "fp", _stored())
+    time.sleep(1.05)
+    stored, replayed = _run(store, "u1:k1", "fp", _stored(body={"n": 1}))
+    assert (stored.body, replayed) == ({"n": 1}, False)
+    client.close()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config import settings
+from app.core import logging as app_logging
+from app.core.logging import logger
+from app.core.middleware import RequestLoggingMiddleware
+
+
+@pytest.fixture
+def lines():
+    captured = []
+    handler_id = logger.add(
+        captured.append, format=app_logging._json_format, filter=app_logging._sampling_filter, level="DEBUG"
+    )
+    try:
+        yield captured
+    finally:
+        logger.remove(handler_id)
+
+
+def _records(lines):
+    return [json.loads(line) for line in lines]
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def get_item(item_id: int):
+        logger.debug("Loading item {item_id}", item_id=item_id)
+        if item_id == 0:
+            logger.warning("Item zero requested")
+        return {"id": item_id}
+
+    app.add_middleware(RequestLoggingMiddleware)
+    return app
+
+
+def _get(app, path, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, **kwargs)
+    return asyncio.run(run())
+
+
+def test_json_lines_carry_fields_and_exception(lines):
+    logger.info("Booked {seats} seats", seats=2)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Booking failed")
+
+    booked, failed = _records(lines)
+    assert booked["level"] == "INFO" and booked["msg"] == "Booked 2 seats" and booked["seats"] == 2
+    assert booked["logger"] == __name__ and "ts" in booked and "_json" not in booked
+    assert failed["level"] == "ERROR" and "ValueError: boom" in failed["exc"]
+
+
+def test_request_lines_carry_route_and_request_id(lines):
+    response = _get(_app(), "/api/items/7", headers={"X-Request-ID": "req-1"})
+
+    assert response.headers["x-request-id"] == "req-1"
+    debug, access = _records(lines)
+    assert debug["msg"] == "Loading item 7" and debug["route"] == "/api/items/{item_id}"
+    assert debug["request_id"] == access["request_id"] == "req-1"
+    assert access["status"] == 200 and access["method"] == "GET" and access["duration_ms"] >= 0
+
+
+#edge case: an unsampled route drops its info/debug lines but keeps warnings
+def test_sampling_is_per_route_and_keeps_warnings(lines, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATES", {"/api/items/{item_id}": 0.0})
+    app = _app()
+
+    _get(app, "/api/items/1")
+    _get(app, "/api/items/0")
+    logger.info("Outside a request")
+
+    assert [record["msg"] for record in _records(lines)] == ["Item zero requested", "Outside a request"]
+
+
+#negative path: disabled debug lines never build their arguments
+def test_disabled_debug_skips_lazy_arguments():
+    calls = []
+    handler_id = logger.add(lambda message: None, level="INFO")
+    try:
+        logger.opt(lazy=True).debug("expensive {value}", value=lambda: calls.append(1))
+    finally:
+        logger.remove(handler_id)
+    assert calls == []
@@ -0,0 +1,87 @@
+import asyncio
+import tracemalloc
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.memory import PEAK_ALLOCATION, memory_profiler, route_peaks
+from app.core.middleware import MemoryTrackingMiddleware
+
+_retained = []
+
+
+def allocate_blocks(count):
+    _retained.extend(bytearray(1024) for _ in range(count))
+
+
+@pytest.fixture
+def tracing_memory():
+    memory_profiler.start(frames=5)
+    yield memory_profiler
+    memory_profiler.stop()
+    _retained.clear()
+
+
+def test_diff_points_at_the_allocating_line(tracing_memory):
+    allocate_blocks(2000)
+    tracing_memory.take_snapshot("after")
+
+    grown = tracing_memory.diff("start", "after", limit=5)
+    top = grown[0]
+    assert "test_memory.py" in top["location"][0]
+    assert top["size_diff_bytes"] >= 2000 * 1024 and top["count_diff"] >= 2000
+    assert any("test_memory.py" in row["location"][0] for row in tracing_memory.top(limit=5))
+
+
+def test_middleware_records_peak_allocation_per_route(tracing_memory):
+    app = FastAPI()
+
+    @app.get("/api/blobs/{size}")
+    async def blob(size: int):
+        data = bytearray(size)
+        return {"bytes": len(data)}
+
+    app.add_middleware(MemoryTrackingMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/blobs/4000000")
+    assert asyncio.run(run()).status_code == 200
+
+    peak = route_peaks()["/api/blobs/{size}"]
+    assert peak["requests"] == 1 and peak["max_bytes"] >= 4_000_000
+
+
+#edge case: snapshots are capped, the oldest dropped first
+def test_snapshots_are_capped(tracing_memory, monkeypatch):
+    monkeypatch.setattr("app.core.memory.MAX_SNAPSHOTS", 3)
+    for label in ("a", "b", "c"):
+        tracing_memory.take_snapshot(label)
+    assert tracing_memory.status()["snapshots"] == ["a", "b", "c"]
+    with pytest.raises(KeyError):
+        tracing_memory.diff("start")
+
+
+#negative path: without tracemalloc nothing is snapshotted or measured
+def test_nothing_is_traced_when_stopped():
+    assert not tracemalloc.is_tracing()
+    with pytest.raises(RuntimeError):
+        memory_profiler.take_snapshot()
+    before = sum(snap.snapshot()["count"] for _, snap in PEAK_ALLOCATION.children())
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    app.add_middleware(MemoryTrackingMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/ping")
+    asyncio.run(run())
+    assert sum(snap.snapshot()["count"] for _, snap in PEAK_ALLOCATION.children()) == before
+    assert memory_profiler.status()["rss_bytes"] > 0
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.core.metrics import Counter, Histogram, MetricFamily, render_prometheus
+from app.core.middleware import (
+    DB_STATEMENTS, HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION, HTTP_RESPONSES, MetricsMiddleware, QueryDebugMiddleware,
+)
+from app.db.instrumentation import instrument_queries
+from app.routes import internal_routes
+
+
+def _app(*middleware):
+    instrument_queries()
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    app = FastAPI()
+
+    # Sync handler: the statements run in the threadpool, under a copy of the request context
+    @app.get("/api/things/{thing_id}")
+    def get_thing(thing_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"id": thing_id}
+
+    @app.get("/api/loop")
+    def loop():
+        with engine.connect() as conn:
+            for n in range(4):
+                conn.execute(text("SELECT :n"), {"n": n})
+        return {}
+
+    app.include_router(internal_routes.router)
+    for cls in (*middleware, MetricsMiddleware):
+        app.add_middleware(cls)
+    return app
+
+
+def _get(app, *paths, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path, headers=headers) for path in paths]
+    return asyncio.run(run())
+
+
+def test_requests_are_recorded_per_route_template():
+    route = "/api/things/{thing_id}"
+    before = HTTP_REQUEST_DURATION.labels("GET", route).count
+    statements_before = DB_STATEMENTS.labels(route).snapshot()["sum"]
+
+    _get(_app(), "/api/things/1", "/api/things/2", "/nowhere")
+
+    assert HTTP_REQUEST_DURATION.labels("GET", route).count == before + 2
+    assert DB_STATEMENTS.labels(route).snapshot()["sum"] == statements_before + 4
+    assert HTTP_RESPONSES.labels("GET", "unmatched", "404").value >= 1
+    assert HTTP_IN_FLIGHT.labels().value == 0
+
+
+def test_metrics_endpoint_serves_prometheus_text(monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "secret")
+    app = _app()
+    _get(app, "/api/things/1")
+
+    denied, = _get(app, "/api/internal/metrics")
+    response, = _get(app, "/api/internal/metrics", headers={"X-Internal-Token": "secret"})
+
+    assert denied.status_code == 401
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_responses_total{method="GET",route="/api/things/{thing_id}",status="200"}' in body
+    assert 'http_request_db_statements_bucket{route="/api/things/{thing_id}",le="2"}' in body
+
+
+def test_debug_headers_report_statements_and_repeats():
+    app = _app(QueryDebugMiddleware)
+    single, looped = _get(app, "/api/things/1", "/api/loop")
+
+    assert single.headers["x-db-statements"] == "2" and single.headers["x-db-repeated"] == "0"
+    assert float(single.headers["x-db-time-ms"]) >= 0
+    assert looped.headers["x-db-statements"] == "4" and looped.headers["x-db-repeated"] == "1"
+    # The metrics middleware outside still sees the statements
+    assert DB_STATEMENTS.labels("/api/loop").snapshot()["sum"] >= 4
+
+
+#edge case: label values are escaped and histograms end with +Inf, _sum and _count
+def test_render_prometheus_format():
+    counter = MetricFamily("jobs_total", "Jobs.", "counter", ("name",))
+    counter.labels('say "hi"\n').inc(3)
+    latency = MetricFamily("job_seconds", "Job time.", "histogram", factory=lambda: Histogram(buckets=(1.0,)))
+    latency.labels().observe(0.5)
+    latency.labels().observe(2.0)
+
+    assert render_prometheus([counter, latency]).splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{name="say \\"hi\\"\\n"} 3',
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="1.0"} 1',
+        'job_seconds_bucket{le="+Inf"} 2',
+        "job_seconds_sum 2.5",
+        "job_seconds_count 2",
+    ]
+    assert isinstance(counter.labels('say "hi"\n'), Counter)
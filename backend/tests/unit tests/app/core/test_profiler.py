@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config import settings
+from app.core.middleware import ProfilingMiddleware
+from app.core.profiler import (
+    ProfilerBusyError, StackSampler, profiler, sign_profile_request, verify_profile_header,
+)
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILER_SECRET", "profile-secret")
+    monkeypatch.setattr(settings, "PROFILER_INTERVAL_MS", 1.0)
+    yield tmp_path
+    profiler.stop()
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def sleeper(seconds):
+    time.sleep(seconds)
+
+
+def _sample(mode):
+    sampler = StackSampler(mode, interval=0.001).start()
+    threads = [threading.Thread(target=busy_loop, args=(0.2,)), threading.Thread(target=sleeper, args=(0.2,))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sampler.stop()
+
+
+def test_wall_mode_sees_busy_and_waiting_threads():
+    stacks = _sample("wall")
+    assert any("busy_loop (" in stack for stack in stacks)
+    assert any("sleeper (" in stack for stack in stacks)
+
+
+#edge case: cpu mode weights by CPU time, so the sleeping thread drops out
+def test_cpu_mode_ignores_waiting_threads():
+    stacks = _sample("cpu")
+    busy = sum(count for stack, count in stacks.items() if "busy_loop (" in stack)
+    sleeping = sum(count for stack, count in stacks.items() if "sleeper (" in stack)
+    assert busy > 0 and sleeping < busy / 10
+
+
+def test_signed_header_profiles_the_request(profile_dir):
+    app = FastAPI()
+
+    @app.get("/api/slow")
+    def slow():
+        busy_loop(0.05)
+        return {}
+
+    app.add_middleware(ProfilingMiddleware)
+
+    async def run(headers):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/slow", headers=headers)
+
+    profiled = asyncio.run(run({"X-Profile": sign_profile_request("wall")}))
+    plain = asyncio.run(run({}))
+
+    name = profiled.headers["x-profile"]
+    assert name.endswith("-GET-_api_slow-wall.collapsed") and "x-profile" not in plain.headers
+    lines = (profile_dir / name).read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_loop" in line for line in lines)
+    assert profiler.list_profiles()[0]["name"] == name
+
+
+#negative path: tampered, expired or unsigned headers are ignored
+def test_invalid_profile_headers_are_rejected(profile_dir, monkeypatch):
+    valid = sign_profile_request("cpu", ttl=60)
+    expires, mode, signature = valid.split(".")
+    assert verify_profile_header(valid) == "cpu"
+    assert verify_profile_header(f"{expires}.wall.{signature}") is None
+    assert verify_profile_header(sign_profile_request("wall", ttl=-1)) is None
+    assert verify_profile_header("garbage") is None
+    monkeypatch.setattr(settings, "PROFILER_SECRET", "")
+    assert verify_profile_header(valid) is None
+
+
+def test_window_runs_one_session_at_a_time(profile_dir):
+    name = profiler.start_window(0.05)
+    with pytest.raises(ProfilerBusyError):
+        profiler.start("other")
+    deadline = time.monotonic() + 5
+    while not (profile_dir / name).exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not profiler.running and (profile_dir / name).exists()
+    assert profiler.profile_path("../" + name) is None
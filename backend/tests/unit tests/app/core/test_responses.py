@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from pydantic import ValidationError
+
+from app.config import settings
+from app.core.responses import model_response
+from app.schemas.bus import SeatLayoutResponse
+
+LAYOUT = {
+    "bus_id": "bus-1",
+    "seats": [
+        {"id": f"seat-{n}", "seat_no": f"A{n}", "seat_type": "Sleeper", "price": 900, "is_available": n % 2 == 0}
+        for n in range(1, 4)
+    ] + [{"id": "seat-9", "seat_no": "Ü9", "seat_type": "Sleeper", "price": 1250.5, "is_available": True}],
+}
+
+
+def _app(content):
+    app = FastAPI()
+
+    @app.get("/api/bus/{bus_id}/seats", response_model=SeatLayoutResponse)
+    async def seats(request: Request, bus_id: str):
+        return model_response(request, SeatLayoutResponse, content)
+
+    return app
+
+
+def _get(app):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/bus/bus-1/seats")
+    return asyncio.run(run())
+
+
+def test_fast_path_matches_response_model_bytes(monkeypatch):
+    fast = _get(_app(LAYOUT))
+    monkeypatch.setattr(settings, "FAST_JSON_ROUTES", {"/api/bus/{bus_id}/seats": False})
+    regular = _get(_app(LAYOUT))
+
+    assert fast.status_code == regular.status_code == 200
+    assert fast.content == regular.content
+    assert fast.headers["content-type"] == regular.headers["content-type"] == "application/json"
+    assert fast.json()["seats"][0]["price"] == 900.0
+
+
+#edge case: an already built model is serialized without validating again
+def test_model_instances_skip_validation(monkeypatch):
+    layout = SeatLayoutResponse.model_validate(LAYOUT)
+
+    def validate(*args, **kwargs):
+        raise AssertionError("validated twice")
+    monkeypatch.setattr(SeatLayoutResponse, "model_validate", validate)
+    assert _get(_app(layout)).json() == layout.model_dump()
+
+
+#negative path: content that doesn't fit the model fails on the fast path too
+def test_invalid_content_raises():
+    request = Request({"type": "http", "route": None})
+    with pytest.raises(ValidationError):
+        model_response(request, SeatLayoutResponse, {"bus_id": "bus-1"})
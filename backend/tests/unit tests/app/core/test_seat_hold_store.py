@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from app.core.resp import RespClient
+from app.core.seat_hold_store import InMemorySeatHoldStore, RedisSeatHoldStore, SeatHold
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        yield InMemorySeatHoldStore()
+    else:
+        server = request.getfixturevalue("resp_server")
+        client = RespClient(f"redis://127.0.0.1:{server.server_address[1]}/0")
+        yield RedisSeatHoldStore(client)
+        client.close()
+
+
+def _hold(user="u1", seats=("S1", "S2"), ttl=60):
+    return SeatHold.new(user, "bus-1", "2025-01-15", seats, ttl)
+
+
+def test_acquire_get_and_holders(store):
+    hold = _hold()
+    assert store.acquire(hold, 60) == []
+    assert store.get(hold.token) == hold
+    assert store.holders("bus-1", "2025-01-15", ["S1", "S2", "S3"]) == {"S1": hold.token, "S2": hold.token}
+    assert store.holders("bus-1", "2025-01-16", ["S1"]) == {}
+
+
+#negative path: overlapping hold gets nothing and reports the contested seats
+def test_acquire_is_all_or_nothing(store):
+    first = _hold(seats=("S2",))
+    assert store.acquire(first, 60) == []
+
+    second = _hold(user="u2", seats=("S1", "S2", "S3"))
+    assert store.acquire(second, 60) == ["S2"]
+    assert store.get(second.token) is None
+    assert store.holders("bus-1", "2025-01-15", ["S1", "S3"]) == {}
+
+
+def test_release_frees_seats(store):
+    hold = _hold()
+    store.acquire(hold, 60)
+    assert store.release(hold.token) is True
+    assert store.get(hold.token) is None
+    assert store.acquire(_hold(user="u2"), 60) == []
+    assert store.release("unknown") is False
+
+
+def test_hold_expires_and_extend_keeps_it(store):
+    short = _hold(seats=("S1",), ttl=1)
+    kept = _hold(seats=("S2",), ttl=1)
+    store.acquire(short, 1)
+    store.acquire(kept, 1)
+
+    extended = store.extend(kept.token, 60)
+    assert extended.expires_at > kept.expires_at
+    time.sleep(1.1)
+
+    assert store.get(short.token) is None
+    assert store.holders("bus-1", "2025-01-15", ["S1", "S2"]) == {"S2": kept.token}
+    assert store.extend(short.token, 60) is None
+
+
+#edge case: client reconnects after the server drops the connection
+def test_resp_client_reconnects(resp_server):
+    client = RespClient(f"redis://127.0.0.1:{resp_server.server_address[1]}")
+    assert client.execute("PING") == "PONG"
+    client._sock.close()
+    assert client.execute("SET", "k", "v") == "OK"
+    assert client.execute("GET", "k") == "v"
+    client.close()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.core import tracing
+from app.core.middleware import TracingMiddleware
+from app.core.tracing import FileSpanExporter, parse_traceparent, span
+from app.db.instrumentation import instrument_queries
+from app.services.async_service import AsyncServiceAdapter
+
+INCOMING = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, payload):
+        self.spans.extend(payload["resourceSpans"][0]["scopeSpans"][0]["spans"])
+
+
+class ThingService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def touch(self):
+        self.db.execute(text("SELECT 1"))
+        self.db.commit()
+        return {"ok": True}
+
+
+class AsyncThingService(AsyncServiceAdapter):
+    service_class = ThingService
+
+    async def touch(self):
+        return await self._call("touch")
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    exporter = ListExporter()
+    monkeypatch.setattr(tracing.get_span_processor(), "exporter", exporter)
+    yield exporter
+    tracing.get_span_processor().flush()
+
+
+def _app():
+    instrument_queries()
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Session = sessionmaker(bind=engine)
+    app = FastAPI()
+
+    @app.post("/api/things/{thing_id}")
+    async def touch(thing_id: int):
+        with Session() as db:
+            return await AsyncThingService(db).touch()
+
+    app.add_middleware(TracingMiddleware)
+    return app
+
+
+def _post(app, path, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, headers=headers)
+    return asyncio.run(run())
+
+
+def test_spans_cover_route_service_sql_and_commit(exported, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 1.0)
+    response = _post(_app(), "/api/things/1")
+    tracing.get_span_processor().flush()
+
+    by_name = {s["name"]: s for s in exported.spans}
+    root = by_name["POST /api/things/{thing_id}"]
+    service = by_name["ThingService.touch"]
+    assert "parentSpanId" not in root and root["kind"] == tracing.KIND_SERVER
+    assert service["parentSpanId"] == root["spanId"]
+    assert by_name["db.query"]["parentSpanId"] == service["spanId"]
+    assert by_name["db.commit"]["parentSpanId"] == service["spanId"]
+    assert {s["traceId"] for s in exported.spans} == {root["traceId"]}
+    assert response.headers["traceresponse"] == f"00-{root['traceId']}-{root['spanId']}-01"
+    attributes = {a["key"]: a["value"] for a in root["attributes"]}
+    assert attributes["http.status_code"] == {"intValue": "200"}
+
+
+def test_sampled_parent_is_followed_even_when_sampling_is_off(exported, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    app = _app()
+
+    _post(app, "/api/things/1", headers={"traceparent": INCOMING})
+    _post(app, "/api/things/2", headers={"traceparent": INCOMING[:-2] + "00"})
+    unsampled = _post(app, "/api/things/3")
+    tracing.get_span_processor().flush()
+
+    roots = [s for s in exported.spans if s["name"].startswith("POST")]
+    assert len(roots) == 1
+    assert roots[0]["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert roots[0]["parentSpanId"] == "00f067aa0ba902b7"
+    assert "traceresponse" not in unsampled.headers
+
+
+#edge case: malformed or all-zero traceparent headers are ignored
+@pytest.mark.parametrize("header", [None, "", "garbage", "01-" + INCOMING[3:], INCOMING.replace("4bf9", "XYZ9"),
+                                    "00-" + "0" * 32 + "-00f067aa0ba902b7-01"])
+def test_invalid_traceparent_is_ignored(header):
+    assert parse_traceparent(header) is None
+
+
+#negative path: outside a sampled trace span() records nothing
+def test_span_without_trace_is_a_no_op(exported):
+    with span("orphan") as orphan:
+        pass
+    tracing.get_span_processor().flush()
+    assert orphan is None and exported.spans == []
+
+
+def test_file_exporter_writes_otlp_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing.get_span_processor(), "exporter", FileSpanExporter(str(path)))
+    root = tracing.start_trace("job", INCOMING)
+    root.finish()
+    tracing.get_span_processor().flush()
+
+    payload = json.loads(path.read_text().splitlines()[0])
+    exported = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert exported["name"] == "job" and exported["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
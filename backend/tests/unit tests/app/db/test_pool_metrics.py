@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.metrics import Histogram
+from app.db.pool_metrics import InstrumentedQueuePool, instrument_engine, pool_stats
+
+
+def _engine(name, **kw):
+    engine = create_engine(
+        "sqlite://", poolclass=InstrumentedQueuePool, pool_logging_name=name,
+        connect_args={"check_same_thread": False}, **kw,
+    )
+    return engine, instrument_engine(engine, name)
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        hist.observe(value)
+    snap = hist.snapshot()
+    assert snap["buckets"] == {"0.01": 1, "0.1": 3, "1.0": 4, "+Inf": 5}
+    assert snap["count"] == 5 and snap["max"] == 5.0
+    assert hist.quantile(0.5) == 0.1
+    assert hist.quantile(0.99) == 5.0
+
+
+def test_checkouts_and_overflow_are_counted():
+    engine, metrics = _engine("t-overflow", pool_size=1, max_overflow=1, pool_timeout=1)
+    first = engine.connect()
+    second = engine.connect()
+    assert metrics.checked_out.value == 2
+    assert metrics.overflow_checkouts.value == 1
+    second.close()
+    first.close()
+
+    snap = pool_stats()["t-overflow"]
+    assert snap["checked_out"] == {"value": 0, "max": 2}
+    assert snap["checkouts"] == 2
+    assert snap["checkout_wait_seconds"]["count"] == 2
+    assert snap["pool_size"] == 1
+
+
+#edge case: a request queued behind an exhausted pool shows up in the wait histogram, then times out
+def test_checkout_wait_and_timeout():
+    engine, metrics = _engine("t-wait", pool_size=1, max_overflow=0, pool_timeout=0.3)
+    held = engine.connect()
+    threading.Timer(0.1, held.close).start()
+    with engine.connect():
+        pass
+    assert metrics.checkout_wait.snapshot()["max"] >= 0.05
+
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    assert metrics.checkout_timeouts.value == 1
+
+
+#negative path: a dead pooled connection fails pre-ping and is replaced
+def test_pre_ping_failures_are_counted():
+    engine, metrics = _engine("t-ping", pool_size=1, max_overflow=0, pool_pre_ping=True)
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        dbapi_connection = conn.connection.dbapi_connection
+    dbapi_connection.close()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("select 1")).scalar() == 1
+    assert metrics.pre_ping_failures.value == 1
+    assert metrics.invalidations.value >= 1
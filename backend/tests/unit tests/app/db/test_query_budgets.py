@@ -0,0 +1,142 @@
+"""
+Query budgets per endpoint.
+
+Each hot endpoint is called through the real app, against seeded in-memory
+sqlite, inside ``query_budget``: more statements than the budget, or any
+statement shape repeated per row (the N+1 signature), fails the test.
+Budgets are set at the current counts so a regression shows up as a failure.
+"""
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.security import create_access_token
+from app.db.async_session import get_session
+from app.db.base import Base
+from app.db.instrumentation import QueryBudgetExceeded, QueryStats, query_budget, statement_shape
+from app.db.models.booking import Booking
+from app.db.models.booking_seat import BookingSeat
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.db.models.user import User
+from app.deps import get_read_session
+from app.main import app
+from app.services.route_index import route_index
+
+TRAVEL_DATE = date.today() + timedelta(days=7)
+PAST_DATES = [date.today() - timedelta(days=d) for d in range(1, 6)]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    with Session() as db:
+        src, dst = City(id=uuid.uuid4(), name="Pune"), City(id=uuid.uuid4(), name="Goa")
+        user = User(id=uuid.uuid4(), phone="9000000001", country_code="+91")
+        buses = [Bus(id=uuid.uuid4(), operator=f"Op {i}", from_city_id=src.id, to_city_id=dst.id,
+                     departure_time="09:00", arrival_time="18:00", fare=500.0) for i in range(5)]
+        db.add_all([src, dst, user, *buses])
+        seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{n + 1}", seat_index=n,
+                      seat_type="Lower" if n % 2 else "Upper", price=500.0 + n)
+                 for bus in buses for n in range(12)]
+        db.add_all(seats)
+        db.add_all([Trip(bus_id=bus.id, service_date=d, status="ACTIVE")
+                    for bus in buses for d in [TRAVEL_DATE, *PAST_DATES]])
+        db.flush()
+        # Several past bookings, so per-booking lookups would repeat
+        for travel_date, bus in zip(PAST_DATES, buses):
+            booking = Booking(id=uuid.uuid4(), user_id=user.id, bus_id=bus.id, date=travel_date,
+                              status="CONFIRMED", amount=500.0)
+            db.add(booking)
+            db.add(BookingSeat(booking_id=booking.id, seat_id=seats[buses.index(bus) * 12].id,
+                               bus_id=bus.id, travel_date=travel_date))
+        db.commit()
+        ids = {"from": str(src.id), "to": str(dst.id), "bus": str(buses[0].id), "user": str(user.id)}
+
+    async def session_override():
+        with Session() as db:
+            yield db
+
+    monkeypatch.setattr(route_index, "ready", False)
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_read_session] = session_override
+    try:
+        yield ids
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def _call(method, url, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    response = asyncio.run(run())
+    assert response.status_code < 400, response.text
+    return response
+
+
+def _auth(ids):
+    return {"Authorization": f"Bearer {create_access_token({'sub': ids['user']})}"}
+
+
+def test_read_endpoints_stay_within_budget(api):
+    with query_budget(1):
+        _call("GET", "/api/cities")
+    with query_budget(2):
+        _call("POST", "/api/search-buses",
+              json={"from_city_id": api["from"], "to_city_id": api["to"], "travel_date": str(TRAVEL_DATE)})
+    with query_budget(1):
+        _call("GET", f"/api/bus/{api['bus']}/seats", params={"travel_date": str(TRAVEL_DATE)})
+
+
+def test_user_endpoints_stay_within_budget(api):
+    auth = _auth(api)
+    # The current user, then one query for the page
+    with query_budget(2) as budget:
+        page = _call("GET", "/api/bookings", headers=auth).json()
+    assert len(page["bookings"]) == len(PAST_DATES)
+    assert not budget.stats.repeated()
+    with query_budget(3):
+        _call("GET", "/api/me/profile", headers=auth)
+
+
+def test_booking_stays_within_budget(api):
+    auth = _auth(api)
+    with query_budget(2):
+        hold = _call("POST", "/api/holds", headers=auth,
+                     json={"bus_id": api["bus"], "travel_date": str(TRAVEL_DATE), "seats": ["S1", "S2", "S3"]}).json()
+    with query_budget(10):
+        _call("POST", "/api/book", headers=auth,
+              json={"bus_id": api["bus"], "travel_date": str(TRAVEL_DATE), "seats": ["S1", "S2", "S3"],
+                    "hold_token": hold["hold_token"]})
+
+
+#negative path: a per-row query loop is reported as repeated
+def test_repeated_shapes_exceed_the_budget(api):
+    ids = [uuid.uuid4() for _ in range(4)]
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with pytest.raises(QueryBudgetExceeded, match="repeated 4x"):
+        with query_budget(10), sessionmaker(bind=engine)() as db:
+            for user_id in ids:
+                db.get(User, user_id)
+
+
+#edge case: IN lists of any length have one shape
+def test_statement_shape_folds_in_lists():
+    assert statement_shape("SELECT *\n FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?)"
+    assert statement_shape("WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "WHERE id IN (?)"
+    assert QueryStats(track_shapes=True).repeated() == {}
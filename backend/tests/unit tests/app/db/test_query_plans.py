@@ -0,0 +1,198 @@
+"""
+Query-plan regression suite.
+
+Runs the service hot paths against a seeded database, captures every
+statement they send and EXPLAINs it. Any full scan of a large table fails
+the test, so a dropped index or a query that stops using one shows up here
+instead of in production.
+
+Always runs on in-memory sqlite (EXPLAIN QUERY PLAN). Set TEST_DATABASE_URL
+to an empty PostgreSQL database to run it there too; that run disables
+enable_seqscan, so a Seq Scan in the plan means no usable index exists.
+"""
+import json
+import os
+import re
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.seat_hold_store import InMemorySeatHoldStore
+from app.db.base import Base
+from app.db.models.booking import Booking
+from app.db.models.booking_seat import BookingSeat
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.otp import OTP
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.db.models.user import User
+from app.schemas.booking import BookingCreate
+from app.schemas.bus import BusSearchRequest
+from app.schemas.hold import SeatHoldCreate
+from app.services.auth_service import AuthService
+from app.services.booking_service import BookingService
+from app.services.bus_service import BusService
+from app.services.city_service import CityService
+from app.services.route_index import route_index
+from app.services.seat_hold_service import SeatHoldService
+from app.services.user_service import UserService
+
+# Tables that grow with traffic; a full scan of any of them fails the suite.
+# cities stays small enough to read whole.
+LARGE_TABLES = {
+    "buses", "seats", "trips", "bookings", "booking_seats",
+    "users", "otp_sessions", "user_booking_stats",
+}
+
+CITY_COUNT, BUS_COUNT, SEATS_PER_BUS, USER_COUNT = 20, 200, 12, 100
+DATES = [date(2025, 1, 1) + timedelta(days=i) for i in range(3)]
+
+
+def _seed(db):
+    cities = [City(id=uuid.uuid4(), name=f"City {i}") for i in range(CITY_COUNT)]
+    users = [User(id=uuid.uuid4(), phone=f"9{i:09d}", country_code="+91") for i in range(USER_COUNT)]
+    db.add_all(cities + users)
+    buses, seats = [], []
+    for i in range(BUS_COUNT):
+        src, dst = cities[i % CITY_COUNT], cities[(i * 7 + 1) % CITY_COUNT]
+        bus = Bus(id=uuid.uuid4(), operator=f"Op {i}", from_city_id=src.id, to_city_id=dst.id,
+                  departure_time="09:00", arrival_time="18:00", fare=500.0)
+        buses.append(bus)
+        seats.append([Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{n + 1}", seat_index=n,
+                           seat_type="Lower" if n % 2 else "Upper", price=500.0 + n)
+                      for n in range(SEATS_PER_BUS)])
+    db.add_all(buses)
+    db.add_all([seat for bus_seats in seats for seat in bus_seats])
+    db.add_all([Trip(bus_id=bus.id, service_date=d, status="ACTIVE") for bus in buses for d in DATES])
+    db.flush()
+    # History on the last date only, leaving the first date free for the hot paths
+    for i, bus in enumerate(buses):
+        booking = Booking(id=uuid.uuid4(), user_id=users[i % USER_COUNT].id, bus_id=bus.id,
+                          date=DATES[-1], status="CONFIRMED", amount=500.0)
+        db.add(booking)
+        db.add(BookingSeat(booking_id=booking.id, seat_id=seats[i][0].id, bus_id=bus.id, travel_date=DATES[-1]))
+    db.commit()
+    return buses, users
+
+
+def _sqlite_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def seeded(request, monkeypatch):
+    if request.param == "postgresql":
+        url = os.environ.get("TEST_DATABASE_URL")
+        if not url:
+            pytest.skip("TEST_DATABASE_URL is not set")
+        engine = create_engine(url)
+    else:
+        engine = _sqlite_engine()
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    buses, users = _seed(db)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    # Searches must reach the database rather than the in-memory index
+    monkeypatch.setattr(route_index, "ready", False)
+    try:
+        yield engine, db, buses, users
+    finally:
+        db.close()
+        if engine.dialect.name == "postgresql":
+            Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def _run_hot_paths(db, buses, users):
+    bus, user = buses[0], users[0]
+    travel_date = DATES[0]
+    hold_store = InMemorySeatHoldStore()
+
+    CityService(db).get_all_cities()
+    bus_service = BusService(db)
+    bus_service.search_buses(BusSearchRequest(from_city_id=bus.from_city_id, to_city_id=bus.to_city_id,
+                                              travel_date=travel_date))
+    bus_service.get_seat_layout(str(bus.id), travel_date)
+
+    hold = SeatHoldService(db, store=hold_store).hold_seats(
+        SeatHoldCreate(bus_id=str(bus.id), travel_date=travel_date, seats=["S2"]), user)
+    booking_service = BookingService(db, hold_store=hold_store)
+    booking = booking_service.create_booking(
+        BookingCreate(bus_id=str(bus.id), travel_date=travel_date, seats=["S2"], hold_token=hold["hold_token"]), user)
+    for booking_filter in (None, "upcoming", "past", "cancelled"):
+        booking_service.get_user_bookings(user, booking_filter)
+    booking_service.cancel_booking(booking["booking_id"], user)
+    booking_service.cancel_trip(str(buses[1].id), travel_date)
+
+    user_service = UserService(db)
+    user_service.get_user_by_id(user.id)
+    user_service.get_user_profile(user.id)
+
+    otp = OTP(phone=users[1].phone, otp_code="123456",
+              expires_at=datetime.now(timezone.utc) + timedelta(minutes=5))
+    db.add(otp)
+    db.commit()
+    AuthService(db).verify_otp(otp.id, "123456")
+
+
+def _full_scans(conn, statement, parameters):
+    """Large tables the plan reads in full."""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        scanned, nodes = set(), [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                scanned.add(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+    else:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        # e.g. "SCAN bookings" or "SCAN cities_1"; index lookups read "SEARCH ..."
+        scanned = {
+            re.sub(r"_\d+$", "", match.group(1))
+            for match in (re.match(r"SCAN (\w+)", row[-1]) for row in rows) if match
+        }
+    return scanned & LARGE_TABLES
+
+
+def test_hot_path_queries_use_indexes(seeded):
+    engine, db, buses, users = seeded
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        _run_hot_paths(db, buses, users)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert len(captured) >= 20, "hot paths did not reach the database"
+    failures = []
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            with conn.begin():
+                scanned = _full_scans(conn, statement, parameters)
+            if scanned:
+                failures.append(f"{sorted(scanned)}: {' '.join(statement.split())[:200]}")
+    assert not failures, "Full scans of large tables:\n" + "\n".join(failures)
+
+
+#negative path: the check itself catches a query with no usable index
+def test_unindexed_query_is_reported():
+    engine = _sqlite_engine()
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        scanned = _full_scans(conn, "SELECT id FROM bookings WHERE amount > ?", (100.0,))
+    assert scanned == {"bookings"}
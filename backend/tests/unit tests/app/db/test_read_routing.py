@@ -0,0 +1,115 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.db.base import Base
+from app.db.models.city import City
+from app.db.models.user import User
+from app.db.routing import ReadYourWrites
+from app.db.session import ReadOnlySession
+from app import deps
+from app.services.city_service import AsyncCityService
+
+
+class DummyRequest:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def two_databases(tmp_path, monkeypatch):
+    """A primary and a replica that have drifted apart, so each read shows where it went."""
+    factories = {}
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine, tables=[City.__table__, User.__table__])
+        with sessionmaker(bind=engine)() as db:
+            db.add(City(id=uuid.uuid4(), name=name))
+            db.commit()
+        factories[name] = engine
+    monkeypatch.setattr(settings, "DB_ASYNC", False)
+    monkeypatch.setattr(db_session, "SessionLocal", sessionmaker(bind=factories["primary"]))
+    monkeypatch.setattr(db_session, "ReadSessionLocal", sessionmaker(bind=factories["replica"], class_=ReadOnlySession))
+    tracker = ReadYourWrites(window=60)
+    monkeypatch.setattr(deps, "read_your_writes", tracker)
+    return tracker
+
+
+async def _cities_via_read_session(request):
+    dependency = deps.get_read_session(request)
+    db = await dependency.__anext__()
+    try:
+        return [city["name"] for city in await AsyncCityService(db).get_all_cities()]
+    finally:
+        await dependency.aclose()
+
+
+def test_reads_go_to_replica_until_the_user_writes(two_databases):
+    user_id, other_id = uuid.uuid4(), uuid.uuid4()
+    mine = DummyRequest({"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"})
+    theirs = DummyRequest({"Authorization": f"Bearer {create_access_token({'sub': str(other_id)})}"})
+
+    assert asyncio.run(_cities_via_read_session(mine)) == ["replica"]
+    two_databases.record_write(user_id)
+    assert asyncio.run(_cities_via_read_session(mine)) == ["primary"]
+    # Other users and anonymous callers keep reading from the replica
+    assert asyncio.run(_cities_via_read_session(theirs)) == ["replica"]
+    assert asyncio.run(_cities_via_read_session(DummyRequest())) == ["replica"]
+
+
+def test_read_route_authenticates_through_its_read_session(two_databases, monkeypatch):
+    from app.routes import user_routes
+
+    # The user exists on the replica only, so a lookup on the primary would 401
+    user_id = uuid.uuid4()
+    with sessionmaker(bind=db_session.ReadSessionLocal.kw["bind"])() as db:
+        db.add(User(id=user_id, phone="9000000000", country_code="+91", name="Replica"))
+        db.commit()
+    opened = []
+    primary = db_session.SessionLocal
+    monkeypatch.setattr(db_session, "SessionLocal", lambda: opened.append("primary") or primary())
+
+    app = FastAPI()
+    app.include_router(user_routes.router)
+
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            token = create_access_token({"sub": str(user_id)})
+            return await client.get("/api/me/", headers={"Authorization": f"Bearer {token}"})
+
+    response = asyncio.run(get())
+    assert response.status_code == 200 and response.json()["name"] == "Replica"
+    assert opened == []
+
+
+#edge case: the sticky window runs out
+def test_read_your_writes_window_expires(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.db.routing.time.monotonic", lambda: clock[0])
+    tracker = ReadYourWrites(window=5)
+    tracker.record_write("u1")
+    assert tracker.is_sticky("u1") and not tracker.is_sticky("u2")
+    clock[0] += 5.1
+    assert not tracker.is_sticky("u1")
+    assert len(tracker) == 0 and not tracker.active()
+
+    disabled = ReadYourWrites(window=0)
+    disabled.record_write("u1")
+    assert not disabled.is_sticky("u1")
+
+
+#negative path: writing through a read-only session fails instead of hitting the replica
+def test_read_only_session_rejects_flush(two_databases):
+    with db_session.ReadSessionLocal() as db:
+        db.add(City(id=uuid.uuid4(), name="nope"))
+        with pytest.raises(RuntimeError):
+            db.flush()
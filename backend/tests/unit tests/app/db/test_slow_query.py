@@ -0,0 +1,85 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.core.logging import RequestLogContext, request_context
+from app.db.slow_query import (
+    SlowQueryLog, instrument_slow_queries, normalize_statement, parameter_shape, slow_query_log,
+)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    instrument_slow_queries()
+    # Everything counts as slow
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.000001)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE trips (id INTEGER PRIMARY KEY, bus_id INTEGER, seats INTEGER)"))
+    slow_query_log.clear()
+    yield engine
+    slow_query_log.clear()
+    engine.dispose()
+
+
+def _in_route(path):
+    scope = {"route": SimpleNamespace(path=path), "path": "/raw"}
+    return request_context.set(RequestLogContext(scope, "req-1"))
+
+
+def test_slow_statements_are_aggregated_with_route_and_plan(engine):
+    token = _in_route("/api/bus/{bus_id}/seats")
+    try:
+        with engine.connect() as conn:
+            for bus_id in (1, 2):
+                conn.execute(text("SELECT seats FROM trips WHERE bus_id = :bus_id"), {"bus_id": bus_id})
+    finally:
+        request_context.reset(token)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not slow_query_log.top()[0]["plan"]:
+        time.sleep(0.01)
+    entry = next(e for e in slow_query_log.top() if e["statement"].startswith("SELECT seats"))
+    assert entry["statement"] == "SELECT seats FROM trips WHERE bus_id = ?"
+    assert entry["count"] == 2 and entry["parameters"] == ["int"]
+    assert entry["routes"] == {"/api/bus/{bus_id}/seats": 2}
+    assert "SCAN trips" in entry["plan"]
+
+
+#edge case: plans are rate limited, only SELECTs are explained
+def test_explains_are_rate_limited(engine, monkeypatch):
+    queued = []
+    monkeypatch.setattr(slow_query_log, "_queue_explain", lambda engine, key, statement, params: queued.append(statement))
+    monkeypatch.setattr(settings, "SLOW_QUERY_EXPLAINS_PER_MINUTE", 2)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE trips SET seats = 1 WHERE id = 1"))
+        for _ in range(3):
+            conn.execute(text("SELECT id FROM trips WHERE seats = 1"))
+        conn.execute(text("SELECT id FROM trips WHERE bus_id = 2"))
+        conn.execute(text("SELECT bus_id FROM trips"))
+
+    # The UPDATE is never explained, the repeated SELECT once, and the third SELECT is over the limit
+    assert queued == ["SELECT id FROM trips WHERE seats = 1", "SELECT id FROM trips WHERE bus_id = 2"]
+    assert {e["statement"] for e in slow_query_log.top()} >= {"UPDATE trips SET seats = ? WHERE id = ?",
+                                                             "SELECT bus_id FROM trips"}
+
+
+#negative path: below the threshold nothing is recorded
+def test_fast_statements_are_not_recorded(engine, monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 10_000.0)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert slow_query_log.top() == []
+
+
+def test_normalization_and_parameter_shape():
+    assert normalize_statement("SELECT * FROM t\n WHERE a = 'x''y' AND b IN (?, ?) AND c > 10.5") == \
+        "SELECT * FROM t WHERE a = ? AND b IN (?) AND c > ?"
+    assert parameter_shape({"a": 1, "b": "x"}) == {"a": "int", "b": "str"}
+    assert parameter_shape([(1, None), (2, None)], executemany=True) == {"rows": 2, "row": ["int", "NoneType"]}
+    assert SlowQueryLog().top() == []
@@ -0,0 +1,73 @@
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.schema import SCHEMA_REVISION, SchemaRevisionError, check_schema_revision
+from app.services.warmup import StatementWarmup
+
+BACKEND_DIR = Path(__file__).resolve().parents[4]
+VERSIONS_DIR = BACKEND_DIR / "migrations" / "versions"
+
+
+def _migration_head():
+    revisions, parents = set(), set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        source = path.read_text()
+        revisions.add(re.search(r"^revision: str = '(\w+)'", source, re.M).group(1))
+        down = re.search(r"^down_revision: .* = '(\w+)'", source, re.M)
+        if down:
+            parents.add(down.group(1))
+    heads = revisions - parents
+    assert len(heads) == 1, f"migration chain has several heads: {heads}"
+    return heads.pop()
+
+
+def test_schema_revision_matches_migration_head():
+    assert SCHEMA_REVISION == _migration_head()
+
+
+def _engine_at(revision):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        if revision:
+            conn.execute(text("INSERT INTO alembic_version VALUES (:rev)"), {"rev": revision})
+    return engine
+
+
+def test_check_schema_revision():
+    assert check_schema_revision(_engine_at(SCHEMA_REVISION)) == SCHEMA_REVISION
+
+
+#negative path: an old, empty or missing alembic_version stops startup
+def test_check_schema_revision_rejects_unmigrated_database():
+    with pytest.raises(SchemaRevisionError, match="e3a1f6b8c052"):
+        check_schema_revision(_engine_at("e3a1f6b8c052"))
+    with pytest.raises(SchemaRevisionError, match="none"):
+        check_schema_revision(_engine_at(None))
+    with pytest.raises(SchemaRevisionError, match="alembic upgrade head"):
+        check_schema_revision(create_engine("sqlite://"))
+
+
+def test_importing_models_has_no_output():
+    result = subprocess.run([sys.executable, "-c", "import app.db.base"], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == ""
+
+
+def test_statement_warmup_runs_read_paths_without_writing():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    with sessionmaker(bind=engine)() as db:
+        StatementWarmup(db).warm()
+        assert not db.new and not db.dirty
+    assert len(statements) >= 8
+    assert not [s for s in statements if s.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.db.models.user import User
+from app.schemas.booking import BookingCreate
+from app.services.booking_service import AsyncBookingService, SeatConflictError
+from app.services.city_service import AsyncCityService
+from app.services.user_service import AsyncUserService
+
+
+def _seed(db):
+    a, b = City(id=uuid.uuid4(), name="A"), City(id=uuid.uuid4(), name="B")
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seat = Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no="S1", seat_index=0, seat_type="Lower", price=500.0)
+    user = User(id=uuid.uuid4(), phone="9000000000", country_code="+91")
+    db.add_all([a, b, bus, seat, user, Trip(bus_id=bus.id, service_date=date(2025, 1, 15), status="ACTIVE")])
+    return bus, user
+
+
+def _as_current_user(db, user):
+    # get_current_user hands routes a detached user
+    db.expunge(user)
+    return user
+
+
+async def _book_twice(db, bus, user):
+    service = AsyncBookingService(db)
+    request = BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 15), seats=["S1"])
+    booking = await service.create_booking(request, user)
+    with pytest.raises(SeatConflictError):
+        await service.create_booking(request, user)
+    profile = await AsyncUserService(db).get_user_profile(user.id)
+    cities = await AsyncCityService(db).get_all_cities()
+    return booking, profile, cities
+
+
+def test_async_services_over_sync_session_use_threadpool():
+    # One shared connection, since the calls run on threadpool threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    bus, user = _seed(db)
+    db.commit()
+    user = _as_current_user(db, user)
+
+    booking, profile, cities = asyncio.run(_book_twice(db, bus, user))
+    assert booking["seats"] == ["S1"]
+    assert profile["total_bookings"] == 1
+    assert sorted(c["name"] for c in cities) == ["A", "B"]
+
+
+def test_async_services_over_async_session():
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            bus, user = _seed(db)
+            await db.commit()
+            user = _as_current_user(db, user)
+            result = await _book_twice(db, bus, user)
+        await engine.dispose()
+        return result
+
+    booking, profile, cities = asyncio.run(run())
+    assert booking["seats"] == ["S1"]
+    assert profile["total_bookings"] == 1
+
+
+def test_blocking_calls_under_run_sync_leave_the_event_loop():
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.core.resp import run_blocking
+    from app.db.async_session import sleep
+
+    def service_code(session):
+        # What the hold store's socket I/O and the booking backoff do
+        sleep(0.05)
+        return run_blocking(threading.get_ident)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        task = asyncio.create_task(ticker())
+        async with AsyncSession(engine) as db:
+            worker_thread = await db.run_sync(service_code)
+        task.cancel()
+        await engine.dispose()
+        return worker_thread, ticks
+
+    worker_thread, ticks = asyncio.run(run())
+    assert worker_thread != threading.get_ident()
+    # The loop kept running other tasks while the service code waited
+    assert ticks >= 5
+
+
+def test_blocking_helpers_run_in_place_outside_run_sync():
+    from app.core.resp import run_blocking
+    from app.db.async_session import sleep
+
+    sleep(0)
+    assert run_blocking(threading.get_ident) == threading.get_ident()
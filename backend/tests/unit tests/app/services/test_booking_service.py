@@ -26,13 +26,23 @@ class DummyCity:
 
 
 class DummySeat:
-    def __init__(self, id, bus_id, seat_no, seat_type, price, is_available=True):
+    def __init__(self, id, bus_id, seat_no, seat_type, price, is_available=True, seat_index=0):
         self.id = id
         self.bus_id = bus_id
         self.seat_no = seat_no
         self.seat_type = seat_type
         self.price = price
         self.is_available = is_available
+        self.seat_index = seat_index
+
+
+class DummyTrip:
+    def __init__(self, bus_id, service_date, status="ACTIVE", seat_bitmap=b""):
+        self.id = uuid.uuid4()
+        self.bus_id = bus_id
+        self.service_date = service_date
+        self.status = status
+        self.seat_bitmap = seat_bitmap
 
 
 class DummyUser:
@@ -41,7 +51,8 @@ class DummyUser:
 
 
 class DummyDB:
-    def __init__(self, buses=None, cities=None, seats=None, bookings=None, booking_seats=None):
+    def __init__(self, buses=None, cities=None, seats=None, bookings=None, booking_seats=None, trips=None):
+        self._trips = trips or []
         self._buses = buses or []
         self._cities = cities or []
         self._seats = seats or []
@@ -49,6 +60,16 @@ class DummyDB:
         self._booking_seats = booking_seats or []
         self.committed = False
         self.flushed = False
+        self.executed = []
+
+    def get_bind(self):
+        class Bind:
+            class dialect:
+                name = 'postgresql'
+        return Bind()
+
+    def execute(self, stmt):
+        self.executed.append(stmt)
 
     def add(self, obj):
         # Append to appropriate store by type name
@@ -87,6 +108,8 @@ class DummyDB:
             dataset = self._bookings
         elif model.__name__ == 'BookingSeat':
             dataset = self._booking_seats
+        elif model.__name__ == 'Trip':
+            dataset = self._trips
         else:
             dataset = []
 
@@ -101,15 +124,25 @@ class DummyDB:
                     try:
                         colname = getattr(expr.left, 'key', None) or getattr(expr.left, 'name', None)
                         value = getattr(expr.right, 'value', None)
+                        is_in = getattr(expr.operator, '__name__', '') == 'in_op'
                         if colname is not None:
-                            self._criteria.append((colname, value))
+                            self._criteria.append((colname, value, is_in))
                     except Exception:
                         # Ignore if not a SQLAlchemy binary expression
                         pass
                 # Apply criteria
                 if self._criteria:
-                    for col, val in self._criteria:
-                        self.data = [o for o in self.data if getattr(o, col, None) == val]
+                    for col, val, is_in in self._criteria:
+                        if is_in:
+                            self.data = [o for o in self.data if getattr(o, col, None) in val]
+                        else:
+                            self.data = [o for o in self.data if getattr(o, col, None) == val]
+                return self
+
+            def with_for_update(self):
+                return self
+
+            def populate_existing(self):
                 return self
 
             def first(self):
@@ -129,9 +162,10 @@ def test_create_booking_success_marks_seats_and_returns():
         buses=[DummyBus(bus_uuid, 'ACME Travels', from_city_id, to_city_id)],
         cities=[DummyCity(from_city_id, 'FromCity'), DummyCity(to_city_id, 'ToCity')],
         seats=[
-            DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0),
-            DummySeat(uuid.uuid4(), bus_uuid, 'A2', 'Aisle', 600.0),
-        ]
+            DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0, seat_index=0),
+            DummySeat(uuid.uuid4(), bus_uuid, 'A2', 'Aisle', 600.0, seat_index=1),
+        ],
+        trips=[DummyTrip(bus_uuid, date(2025, 1, 1))]
     )
     svc = BookingService(db)
     from app.schemas.booking import BookingCreate, PassengerDetail, ContactInfo
@@ -149,6 +183,35 @@ def test_create_booking_success_marks_seats_and_returns():
     assert res['amount'] == 1100.0
     # BookingSeat records created
     assert len([o for o in db._booking_seats if isinstance(o, BookingSeat)]) == 2
+    # Both seats marked in the trip's occupancy bitmap
+    assert db._trips[0].seat_bitmap == b"\x03"
+    # User stats bumped in the same transaction
+    assert [stmt.table.name for stmt in db.executed] == ['user_booking_stats']
+
+
+#negative path: seats already set in the trip bitmap are reported as a conflict
+def test_create_booking_conflict_reports_taken_seats():
+    from app.services.booking_service import SeatConflictError
+    bus_uuid = uuid.uuid4()
+    from_city_id = uuid.uuid4()
+    to_city_id = uuid.uuid4()
+    db = DummyDB(
+        buses=[DummyBus(bus_uuid, 'ACME Travels', from_city_id, to_city_id)],
+        cities=[DummyCity(from_city_id, 'FromCity'), DummyCity(to_city_id, 'ToCity')],
+        seats=[
+            DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0, seat_index=0),
+            DummySeat(uuid.uuid4(), bus_uuid, 'A2', 'Aisle', 600.0, seat_index=1),
+        ],
+        trips=[DummyTrip(bus_uuid, date(2025, 1, 1), seat_bitmap=b"\x02")]
+    )
+    svc = BookingService(db)
+    from app.schemas.booking import BookingCreate
+    booking_data = BookingCreate(bus_id=str(bus_uuid), travel_date=date(2025, 1, 1), seats=['A1', 'A2'])
+    with pytest.raises(SeatConflictError) as exc:
+        svc.create_booking(booking_data, DummyUser(uuid.uuid4()))
+    assert exc.value.seats == ['A2']
+    assert db._trips[0].seat_bitmap == b"\x02"
+    assert db._bookings == []
 
 
 def test_create_booking_invalid_bus_id_raises():
@@ -178,7 +241,8 @@ def test_create_booking_commit_failure_rolls_back_and_raises():
     db = DummyDB(
         buses=[DummyBus(bus_uuid, 'ACME Travels', from_city_id, to_city_id)],
         cities=[DummyCity(from_city_id, 'FromCity'), DummyCity(to_city_id, 'ToCity')],
-        seats=[DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0)]
+        seats=[DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0)],
+        trips=[DummyTrip(bus_uuid, date(2025, 1, 1))]
     )
     db.fail_commit = True
     svc = BookingService(db)
@@ -260,7 +324,8 @@ def test_create_booking_commit_failure_rolls_back(monkeypatch):
     db = FailingDB(
         buses=[DummyBus(bus_uuid, 'ACME Travels', from_city_id, to_city_id)],
         cities=[DummyCity(from_city_id, 'FromCity'), DummyCity(to_city_id, 'ToCity')],
-        seats=[DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0)]
+        seats=[DummySeat(uuid.uuid4(), bus_uuid, 'A1', 'Window', 500.0)],
+        trips=[DummyTrip(bus_uuid, date(2025, 1, 1))]
     )
     svc = BookingService(db)
     from app.schemas.booking import BookingCreate, PassengerDetail, ContactInfo
@@ -277,36 +342,226 @@ def test_create_booking_commit_failure_rolls_back(monkeypatch):
     assert getattr(db, 'rolled_back', False) is True
 
 
+def _sqlite_history(dates):
+    """A user with one confirmed two-seat booking per date, each on its own trip."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.db.models.trip import Trip
+    from app.db.models.user import User
+    from app.schemas.booking import BookingCreate
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    a, b = City(id=uuid.uuid4(), name="FromCity"), City(id=uuid.uuid4(), name="ToCity")
+    bus = Bus(id=uuid.uuid4(), operator="ACME Travels", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"A{i + 1}", seat_index=i, seat_type="Window", price=500.0 + 100 * i)
+             for i in range(2)]
+    user = User(id=uuid.uuid4(), phone="9000000000", country_code="+91")
+    db.add_all([a, b, bus, *seats, user, *[Trip(bus_id=bus.id, service_date=d, status="ACTIVE") for d in dates]])
+    db.commit()
+    svc = BookingService(db)
+    for d in dates:
+        svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=d, seats=["A2", "A1"]), user)
+    return engine, db, user
+
+
 def test_get_user_bookings_returns_expected_structure():
-    user_id = uuid.uuid4()
-    bus_id = uuid.uuid4()
-    from_city_id = uuid.uuid4()
-    to_city_id = uuid.uuid4()
-    # Prepare seats
-    seat1_id, seat2_id = uuid.uuid4(), uuid.uuid4()
-    seats = [DummySeat(seat1_id, bus_id, 'A1', 'Window', 500.0), DummySeat(seat2_id, bus_id, 'A2', 'Aisle', 600.0)]
-    # Prepare booking and booking seats
-    booking = Booking(id=uuid.uuid4(), user_id=user_id, bus_id=bus_id, date=date(2025, 1, 1), status='CONFIRMED', amount=1100.0)
-    bseat1 = BookingSeat(id=uuid.uuid4(), booking_id=booking.id, seat_id=seat1_id)
-    bseat2 = BookingSeat(id=uuid.uuid4(), booking_id=booking.id, seat_id=seat2_id)
-    db = DummyDB(
-        buses=[DummyBus(bus_id, 'ACME Travels', from_city_id, to_city_id)],
-        cities=[DummyCity(from_city_id, 'FromCity'), DummyCity(to_city_id, 'ToCity')],
-        seats=seats,
-        bookings=[booking],
-        booking_seats=[bseat1, bseat2]
-    )
+    engine, db, user = _sqlite_history([date(2025, 1, 1)])
+    out = BookingService(db).get_user_bookings(user)
+    assert len(out.bookings) == 1
+    assert out.next_cursor is None
+    entry = out.bookings[0]
+    assert entry.booking_id == str(db.query(Booking).one().id)
+    assert entry.bus_name == 'ACME Travels'
+    assert entry.from_city == 'FromCity'
+    assert entry.to_city == 'ToCity'
+    assert entry.seats == ['A1', 'A2']
+    assert entry.status == 'CONFIRMED'
+    assert entry.amount == 1100.0
+
+
+BOOKING_HISTORY_QUERY_BUDGET = 1
+
+
+def test_get_user_bookings_pages_with_cursor_in_one_query_each():
+    from datetime import timedelta
+    from sqlalchemy import event
+
+    dates = [date(2025, 1, 1) + timedelta(days=i) for i in range(7)]
+    engine, db, user = _sqlite_history(dates)
+    svc = BookingService(db)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = svc.get_user_bookings(user, cursor=cursor, limit=3)
+        pages += 1
+        seen += [b.date for b in page.bookings]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [str(d) for d in reversed(dates)]
+    assert pages == 3
+    assert len(statements) <= pages * BOOKING_HISTORY_QUERY_BUDGET, statements
+
+
+def test_get_user_bookings_filters():
+    from datetime import timedelta
+
+    today = date.today()
+    dates = [today - timedelta(days=2), today + timedelta(days=3), today + timedelta(days=1), today + timedelta(days=5)]
+    engine, db, user = _sqlite_history(dates)
+    svc = BookingService(db)
+    cancelled = db.query(Booking).filter(Booking.date == today + timedelta(days=5)).one()
+    svc.cancel_booking(str(cancelled.id), user)
+
+    upcoming = svc.get_user_bookings(user, "upcoming").bookings
+    assert [b.date for b in upcoming] == [str(today + timedelta(days=1)), str(today + timedelta(days=3))]
+    assert [b.date for b in svc.get_user_bookings(user, "past").bookings] == [str(today - timedelta(days=2))]
+    assert [b.status for b in svc.get_user_bookings(user, "cancelled").bookings] == ['CANCELLED']
+
+
+#edge case: each booking lists only its own seats, in seat order
+def test_get_user_bookings_seats_per_booking():
+    from app.schemas.booking import BookingCreate
+
+    engine, db, bus, users = _sqlite_trip()
     svc = BookingService(db)
-    user = DummyUser(user_id)
-    out = svc.get_user_bookings(user)
-    assert len(out) == 1
-    entry = out[0]
-    assert entry['booking_id'] == str(booking.id)
-    assert entry['bus_name'] == 'ACME Travels'
-    assert entry['from_city'] == 'FromCity'
-    assert entry['to_city'] == 'ToCity'
-    assert entry['seats'] == ['A1', 'A2']
-    assert entry['status'] == 'CONFIRMED'
-    assert entry['amount'] == 1100.0
+    svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 1), seats=['S3', 'S1']), users[0])
+    svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 2), seats=['S2']), users[0])
 
+    bookings = svc.get_user_bookings(users[0]).bookings
+    assert [(b.date, b.seats) for b in bookings] == [('2025-01-02', ['S2']), ('2025-01-01', ['S1', 'S3'])]
 
+
+#negative path: unknown filter and garbage cursor are rejected
+def test_get_user_bookings_rejects_bad_filter_and_cursor():
+    engine, db, user = _sqlite_history([date(2025, 1, 1)])
+    svc = BookingService(db)
+    with pytest.raises(ValueError):
+        svc.get_user_bookings(user, "someday")
+    with pytest.raises(ValueError):
+        svc.get_user_bookings(user, cursor="not-a-cursor")
+
+
+#negative path: a stale bitmap cannot double-sell, the unique constraint reports the lost seats
+def test_create_booking_lost_race_reports_exact_seats():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.db.models.trip import Trip
+    from app.db.models.user import User
+    from app.schemas.booking import BookingCreate
+    from app.services.booking_service import SeatConflictError
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=uuid.uuid4(), to_city_id=uuid.uuid4(),
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i, seat_type="Lower", price=500.0)
+             for i in range(3)]
+    users = [User(id=uuid.uuid4(), phone=f"900000000{i}", country_code="+91") for i in range(2)]
+    db.add_all([bus, *seats, *users, Trip(bus_id=bus.id, service_date=date(2025, 1, 1), status="ACTIVE")])
+    db.commit()
+
+    svc = BookingService(db)
+    svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 1), seats=['S2']), users[0])
+    # Simulate the second request having read the bitmap before the first one committed
+    db.query(Trip).one().seat_bitmap = b""
+    db.commit()
+
+    with pytest.raises(SeatConflictError) as exc:
+        svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 1), seats=['S1', 'S2']), users[1])
+    assert exc.value.seats == ['S2']
+    assert db.query(Booking).count() == 1
+    assert db.query(BookingSeat).count() == 1
+
+
+def _sqlite_trip(seat_count=6, user_count=3):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.db.models.trip import Trip
+    from app.db.models.user import User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=uuid.uuid4(), to_city_id=uuid.uuid4(),
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i, seat_type="Lower", price=500.0)
+             for i in range(seat_count)]
+    users = [User(id=uuid.uuid4(), phone=f"900000000{i}", country_code="+91") for i in range(user_count)]
+    trips = [Trip(bus_id=bus.id, service_date=d, status="ACTIVE") for d in (date(2025, 1, 1), date(2025, 1, 2))]
+    db.add_all([bus, *seats, *users, *trips])
+    db.commit()
+    return engine, db, bus, users
+
+
+CANCEL_BOOKING_STATEMENT_BUDGET = 7
+
+
+def test_cancel_booking_runs_constant_statements():
+    from sqlalchemy import event
+    from app.db.models.trip import Trip
+    from app.schemas.booking import BookingCreate
+
+    engine, db, bus, users = _sqlite_trip()
+    svc = BookingService(db)
+    small = svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 1), seats=['S1']), users[0])
+    large = svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 1),
+                                             seats=['S2', 'S3', 'S4', 'S5', 'S6']), users[0])
+
+    counts = []
+    for booking in (small, large):
+        statements = []
+        listener = lambda *a: statements.append(a[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        svc.cancel_booking(booking['booking_id'], users[0])
+        event.remove(engine, "before_cursor_execute", listener)
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1] <= CANCEL_BOOKING_STATEMENT_BUDGET, counts
+    assert db.query(BookingSeat).count() == 0
+    assert db.query(Trip).filter(Trip.service_date == date(2025, 1, 1)).one().seat_bitmap == b""
+
+
+def test_cancel_trip_cancels_every_booking_in_one_transaction():
+    from app.db.models.trip import Trip
+    from app.db.models.user_booking_stats import UserBookingStats
+    from app.schemas.booking import BookingCreate
+    from app.services import user_stats
+
+    engine, db, bus, users = _sqlite_trip()
+    svc = BookingService(db)
+    day1, day2 = date(2025, 1, 1), date(2025, 1, 2)
+    ids = [
+        svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=day1, seats=seats), user)['booking_id']
+        for user, seats in ((users[0], ['S1', 'S2']), (users[1], ['S3']), (users[0], ['S4']))
+    ]
+    svc.cancel_booking(ids[2], users[0])
+    other_day = svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=day2, seats=['S1']), users[2])
+
+    res = svc.cancel_trip(str(bus.id), day1)
+
+    assert res['cancelled_booking_ids'] == sorted(ids[:2])
+    assert (res['seats_released'], res['refund_amount']) == (3, 1500.0)
+    trip = db.query(Trip).filter(Trip.service_date == day1).one()
+    db.refresh(trip)
+    assert (trip.status, trip.seat_bitmap) == ("CANCELLED", b"")
+    # The other day's booking is untouched
+    assert db.query(Booking).filter(Booking.status == "CONFIRMED").one().id == uuid.UUID(other_day['booking_id'])
+    assert db.query(BookingSeat).count() == 1
+    db.expire_all()
+    assert db.get(UserBookingStats, users[0].id).cancellations == 2
+    assert user_stats.verify_stats(db)["drifted"] == []
+
+    #negative path: no new bookings land on a cancelled trip
+    with pytest.raises(ValueError):
+        svc.create_booking(BookingCreate(bus_id=str(bus.id), travel_date=day1, seats=['S5']), users[1])
@@ -5,28 +5,6 @@ from app.services.bus_service import BusService
 from app.schemas.bus import BusSearchRequest
 
 
-class DummySeat:
-    def __init__(self, id, seat_no, seat_type, price):
-        self.id = id
-        self.seat_no = seat_no
-        self.seat_type = seat_type
-        self.price = price
-
-
-class DummyBooking:
-    def __init__(self, id, bus_id, d, status):
-        self.id = id
-        self.bus_id = bus_id
-        self.date = d
-        self.status = status
-
-
-class DummyBookingSeat:
-    def __init__(self, booking_id, seat_id):
-        self.booking_id = booking_id
-        self.seat_id = seat_id
-
-
 class DummyBus:
     def __init__(self, id, operator, from_city_id, to_city_id, departure_time="09:00", arrival_time="18:00", duration="9h", fare=500.0, rating=4.5):
         self.id = id
@@ -57,6 +35,15 @@ class DummyDB:
         self._trips = trips or []
         self.raise_on_query = False
 
+    def execute(self, stmt):
+        if self.raise_on_query:
+            raise RuntimeError("DB failure")
+        # Aggregated seat queries: no seats in the dummy store
+        class R:
+            def all(self):
+                return []
+        return R()
+
     def query(self, model):
         if self.raise_on_query:
             class Broken:
@@ -96,27 +83,45 @@ class DummyDB:
 
 
 def test_get_seat_layout_no_travel_date_all_available():
-    bus_id = str(uuid.uuid4())
-    seats = [DummySeat(uuid.uuid4(), '1A', 'Window', 500), DummySeat(uuid.uuid4(), '1B', 'Aisle', 500)]
-    db = DummyDB(seats=seats)
+    engine, db, bus, seats = _sqlite_db_with_bus(seat_count=2)
+    _book(db, bus, [seats[0]])
+    bus_id = str(bus.id)
     svc = BusService(db)
     res = svc.get_seat_layout(bus_id, None)
-    assert res['bus_id'] == bus_id
-    assert len(res['seats']) == 2
-    assert all(s['is_available'] for s in res['seats'])
+    assert res.bus_id == bus_id
+    assert len(res.seats) == 2
+    assert all(s.is_available for s in res.seats)
 
 
 def test_get_seat_layout_with_booking_marks_unavailable():
-    bus_uuid = uuid.uuid4()
-    s1, s2 = DummySeat(uuid.uuid4(), '1A', 'Window', 500), DummySeat(uuid.uuid4(), '1B', 'Aisle', 500)
-    b1 = DummyBooking(uuid.uuid4(), bus_uuid, date(2025, 1, 1), 'CONFIRMED')
-    bs1 = DummyBookingSeat(b1.id, s1.id)
-    db = DummyDB(seats=[s1, s2], bookings=[b1], booking_seats=[bs1])
+    engine, db, bus, seats = _sqlite_db_with_bus(seat_count=2)
+    _book(db, bus, [seats[0]])
+    _book(db, bus, [seats[1]], status="CANCELLED")
     svc = BusService(db)
-    res = svc.get_seat_layout(str(bus_uuid), date(2025, 1, 1))
-    seat_map = {s['seat_no']: s for s in res['seats']}
-    assert seat_map['1A']['is_available'] is False
-    assert seat_map['1B']['is_available'] is True
+    res = svc.get_seat_layout(str(bus.id), date(2025, 1, 15))
+    seat_map = {s.seat_no: s for s in res.seats}
+    assert seat_map['S1'].is_available is False
+    assert seat_map['S2'].is_available is True
+
+
+SEAT_LAYOUT_QUERY_BUDGET = 1
+
+
+def test_get_seat_layout_stays_within_query_budget():
+    from sqlalchemy import event
+
+    # A full sleeper with most seats booked across many bookings
+    engine, db, bus, seats = _sqlite_db_with_bus(seat_count=36)
+    for seat in seats[:30]:
+        _book(db, bus, [seat])
+    bus_id = str(bus.id)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    res = BusService(db).get_seat_layout(bus_id, date(2025, 1, 15))
+
+    assert sum(1 for s in res.seats if s.is_available) == 6
+    assert len(statements) <= SEAT_LAYOUT_QUERY_BUDGET, statements
 
 
 #edge case: invalid bus id returns empty seats
@@ -124,7 +129,7 @@ def test_get_seat_layout_invalid_bus_id():
     db = DummyDB()
     svc = BusService(db)
     res = svc.get_seat_layout('not-a-uuid', None)
-    assert res['seats'] == []
+    assert res.seats == []
 
 
 #negative path: db error while querying seats returns empty list gracefully
@@ -135,9 +140,11 @@ def test_get_seat_layout_db_error_returns_empty(monkeypatch):
                 def filter(self, *args, **kwargs):
                     raise RuntimeError("db broke")
             return Q()
+        def execute(self, stmt):
+            raise RuntimeError("db broke")
     svc = BusService(BrokenDB())
     res = svc.get_seat_layout(str(uuid.uuid4()), None)
-    assert res['seats'] == []
+    assert res.seats == []
 
 
 #edge case: database failure returns empty structure (graceful handling)
@@ -146,7 +153,7 @@ def test_get_seat_layout_db_failure_returns_empty():
     db.raise_on_query = True
     svc = BusService(db)
     res = svc.get_seat_layout(str(uuid.uuid4()), None)
-    assert res['seats'] == []
+    assert res.seats == []
 
 
 def test_search_buses_without_date_returns_all_route_buses():
@@ -161,7 +168,7 @@ def test_search_buses_without_date_returns_all_route_buses():
     result = svc.search_buses(search_req)
     
     assert len(result) == 2
-    operators = [bus['operator'] for bus in result]
+    operators = [bus.operator for bus in result]
     assert 'ACME Travels' in operators
     assert 'Best Bus' in operators
 
@@ -183,7 +190,7 @@ def test_search_buses_with_date_filters_by_trips():
     
     # Only bus1 should be returned since it has a trip on that date
     assert len(result) == 1
-    assert result[0]['operator'] == 'ACME Travels'
+    assert result[0].operator == 'ACME Travels'
 
 
 def test_search_buses_with_date_no_trips_returns_empty():
@@ -216,3 +223,76 @@ def test_search_buses_db_error_returns_empty():
     assert result == []
 
 
+def _sqlite_db_with_bus(seat_count=3):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.db.models.bus import Bus
+    from app.db.models.city import City
+    from app.db.models.seat import Seat
+    from app.db.models.trip import Trip
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    a, b = City(id=uuid.uuid4(), name="A"), City(id=uuid.uuid4(), name="B")
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [
+        Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i,
+             seat_type="Lower" if i % 2 == 0 else "Upper", price=400.0 + i * 10)
+        for i in range(seat_count)
+    ]
+    trips = [Trip(bus_id=bus.id, service_date=d, status="ACTIVE") for d in (date(2025, 1, 15), date(2025, 1, 16))]
+    db.add_all([a, b, bus, *seats, *trips])
+    db.commit()
+    return engine, db, bus, seats
+
+
+def _book(db, bus, seats, d=date(2025, 1, 15), status="CONFIRMED"):
+    from app.db.models.user import User
+    from app.schemas.booking import BookingCreate
+    from app.services.booking_service import BookingService
+
+    user = User(id=uuid.uuid4(), phone=str(uuid.uuid4().int)[:10], country_code="+91")
+    db.add(user)
+    db.commit()
+    svc = BookingService(db)
+    booking = svc.create_booking(
+        BookingCreate(bus_id=str(bus.id), travel_date=d, seats=[s.seat_no for s in seats]), user
+    )
+    if status == "CANCELLED":
+        svc.cancel_booking(booking["booking_id"], user)
+
+
+def test_search_buses_reports_seats_left_and_lowest_prices_in_one_query():
+    from sqlalchemy import event
+
+    engine, db, bus, seats = _sqlite_db_with_bus(seat_count=4)
+    _book(db, bus, [seats[0]])
+    _book(db, bus, [seats[1]], status="CANCELLED")
+    _book(db, bus, [seats[2]], d=date(2025, 1, 16))
+
+    search_req = BusSearchRequest(from_city_id=bus.from_city_id, to_city_id=bus.to_city_id, travel_date=date(2025, 1, 15))
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    result = BusService(db).search_buses(search_req)
+
+    assert result[0].seats_available == 3
+    # S1 (Lower, 400) is booked so the cheapest Lower seat left is S3
+    assert result[0].lowest_price_by_seat_type == {"Lower": 420.0, "Upper": 410.0}
+    # One statement for the bus list and one for availability
+    assert len(statements) == 2
+
+
+#edge case: sold-out buses are listed by default and hidden on request
+def test_search_buses_hide_sold_out():
+    engine, db, bus, seats = _sqlite_db_with_bus(seat_count=2)
+    _book(db, bus, seats)
+    search_req = BusSearchRequest(from_city_id=bus.from_city_id, to_city_id=bus.to_city_id, travel_date=date(2025, 1, 15))
+    result = BusService(db).search_buses(search_req)
+    assert result[0].seats_available == 0
+    assert result[0].lowest_price_by_seat_type == {}
+
+    search_req.hide_sold_out = True
+    assert BusService(db).search_buses(search_req) == []
@@ -0,0 +1,174 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.core.http_cache import encoded_etag
+from app.db.async_session import get_session
+from app.db.base import Base
+from app.db.instrumentation import instrument_queries, request_queries, QueryStats
+from app.db.models.city import City
+from app.deps import get_read_session
+from app.routes import city_routes
+from app.services.city_catalog import CityCatalog, CitySnapshot, city_catalog
+from app.services.city_service import CityService
+
+
+class DummyCity:
+    def __init__(self, name, id=None):
+        self.id = id or uuid.uuid4()
+        self.name = name
+
+
+NAMES = ["Mumbai", "navi Mumbai", "Mysore", "Delhi", "New Delhi", "Mangalore"]
+
+
+@pytest.fixture
+def Session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with factory() as db:
+        db.add_all(City(name=name) for name in NAMES)
+        db.commit()
+    city_catalog.attach(factory)
+    city_catalog.invalidate()
+    yield factory
+    city_catalog.invalidate()
+    engine.dispose()
+
+
+def test_prefix_search_matches_word_starts_in_name_order():
+    snapshot = CitySnapshot([DummyCity(name) for name in NAMES], version=0)
+    assert [c["name"] for c in snapshot.cities] == ["Delhi", "Mangalore", "Mumbai", "Mysore", "navi Mumbai", "New Delhi"]
+    assert [c["name"] for c in snapshot.search("MU")] == ["Mumbai", "navi Mumbai"]
+    assert [c["name"] for c in snapshot.search(" m", limit=2)] == ["Mangalore", "Mumbai"]
+    assert [c["name"] for c in snapshot.search("new d")] == ["New Delhi"]
+    assert snapshot.search("x") == [] and snapshot.search("  ") == []
+
+
+def test_etag_follows_contents_not_load_order():
+    cities = [DummyCity(name) for name in NAMES]
+    assert CitySnapshot(cities, 0).etag == CitySnapshot(reversed(cities), 5).etag
+    renamed = cities[:-1] + [DummyCity("Mangaluru", cities[-1].id)]
+    assert CitySnapshot(renamed, 0).etag != CitySnapshot(cities, 0).etag
+
+
+def test_commits_touching_cities_invalidate(Session):
+    with Session() as db:
+        first = CityService(db).get_catalog()
+        assert CityService(db).get_catalog() is first
+
+        db.add(City(name="Pune"))
+        db.commit()
+        assert city_catalog.fresh() is None
+        assert "Pune" in [c["name"] for c in CityService(db).get_catalog().cities]
+
+        # Bulk statements bypass the flush
+        db.query(City).filter(City.name == "Pune").delete()
+        db.commit()
+        assert city_catalog.fresh() is None
+
+
+#edge case: rolled-back writes and unrelated commits keep the snapshot
+def test_rollback_keeps_snapshot(Session):
+    with Session() as db:
+        snapshot = CityService(db).get_catalog()
+        db.add(City(name="Pune"))
+        db.flush()
+        db.rollback()
+        db.commit()
+        assert city_catalog.fresh() is snapshot
+
+
+#edge case: a load that raced an invalidation is served but not kept
+def test_store_drops_snapshot_loaded_before_invalidation():
+    catalog = CityCatalog()
+    version = catalog.version
+    catalog.invalidate()
+    snapshot = catalog.store(version, [DummyCity("Pune")])
+    assert snapshot.cities[0]["name"] == "Pune" and catalog.fresh() is None
+
+
+#edge case: snapshots expire after CITY_CACHE_TTL_SECONDS
+def test_snapshot_expires(monkeypatch):
+    catalog = CityCatalog()
+    catalog.store(catalog.version, [DummyCity("Pune")])
+    assert catalog.fresh() is not None
+    monkeypatch.setattr(settings, "CITY_CACHE_TTL_SECONDS", 0)
+    assert catalog.fresh() is None
+
+
+def _client_get(Session, path, headers=None, replica=None):
+    instrument_queries()
+    app = FastAPI()
+    app.include_router(city_routes.router)
+
+    def sessions(factory):
+        def session():
+            with factory() as db:
+                yield db
+        return session
+    app.dependency_overrides[get_session] = sessions(Session)
+    if replica is not None:
+        app.dependency_overrides[get_read_session] = sessions(replica)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stats = QueryStats()
+            token = request_queries.set(stats)
+            try:
+                return await client.get(path, headers=headers), stats
+            finally:
+                request_queries.reset(token)
+    return asyncio.run(run())
+
+
+def test_cities_conditional_get(Session):
+    response, _ = _client_get(Session, "/api/cities")
+    etag = response.headers["etag"]
+    assert response.status_code == 200 and len(response.json()["cities"]) == len(NAMES)
+    assert etag.startswith('"') and response.headers["cache-control"].startswith("public, max-age=")
+
+    response, stats = _client_get(Session, "/api/cities", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["etag"] == etag
+    assert stats.statements == 0
+
+    # The tag CompressionMiddleware gives the gzip representation matches too
+    response, _ = _client_get(Session, "/api/cities", headers={"If-None-Match": encoded_etag(etag, "gzip")})
+    assert response.status_code == 304
+
+
+#edge case: a replica that has not caught up with an invalidation is not cached
+def test_catalog_loads_from_the_primary(Session):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    lagging = sessionmaker(bind=engine)
+    response, _ = _client_get(Session, "/api/cities", replica=lagging)
+    assert len(response.json()["cities"]) == len(NAMES)
+    engine.dispose()
+
+
+def test_city_search_endpoint(Session):
+    response, _ = _client_get(Session, "/api/cities/search?q=del&limit=1")
+    assert response.status_code == 200
+    assert [c["name"] for c in response.json()["cities"]] == ["Delhi"]
+
+
+#negative path: an empty prefix is rejected, a failed load is not cached
+def test_city_search_requires_prefix_and_failed_loads_are_not_cached(Session, monkeypatch):
+    assert _client_get(Session, "/api/cities/search?q=")[0].status_code == 422
+
+    monkeypatch.setattr(CityService, "get_catalog", lambda self: None)
+    city_catalog.invalidate()
+    response, _ = _client_get(Session, "/api/cities")
+    assert response.json() == {"cities": []}
+    assert response.headers["cache-control"] == "no-store" and "etag" not in response.headers
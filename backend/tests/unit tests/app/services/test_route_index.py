@@ -0,0 +1,121 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.trip import Trip
+from app.services.route_index import RouteIndex, BusSummary
+
+
+class DummyBus:
+    def __init__(self, id, operator, from_city_id, to_city_id, departure_time="09:00", arrival_time="18:00", duration="9h", fare=500.0, rating=4.5):
+        self.id = id
+        self.operator = operator
+        self.from_city_id = from_city_id
+        self.to_city_id = to_city_id
+        self.departure_time = departure_time
+        self.arrival_time = arrival_time
+        self.duration = duration
+        self.fare = fare
+        self.rating = rating
+
+
+def _sqlite_session_factory():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def test_search_by_route_and_date():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    bus1 = DummyBus(uuid.uuid4(), "Late Bus", a, b, departure_time="22:00")
+    bus2 = DummyBus(uuid.uuid4(), "Early Bus", a, b, departure_time="06:00")
+    idx = RouteIndex()
+    idx.load([bus1, bus2], [(bus1.id, date(2025, 1, 15)), (bus2.id, date(2025, 1, 16))])
+
+    assert [s.operator for s in idx.search(a, b)] == ["Early Bus", "Late Bus"]
+    assert [s.operator for s in idx.search(a, b, date(2025, 1, 15))] == ["Late Bus"]
+    assert idx.search(b, a, date(2025, 1, 15)) == []
+
+
+def test_summary_as_dict_matches_search_response_shape():
+    bus = DummyBus(uuid.uuid4(), "ACME", uuid.uuid4(), uuid.uuid4(), duration=None, rating=None)
+    out = BusSummary.from_bus(bus).as_dict()
+    assert out["id"] == str(bus.id)
+    assert out["duration"] == "N/A"
+    assert out["rating"] == 0.0
+
+
+def test_incremental_updates_move_bus_between_routes():
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    bus = DummyBus(uuid.uuid4(), "ACME", a, b)
+    idx = RouteIndex()
+    idx.load([bus], [(bus.id, date(2025, 1, 15))])
+
+    moved = DummyBus(bus.id, "ACME", a, c)
+    idx.upsert_bus(BusSummary.from_bus(moved))
+    assert idx.search(a, b, date(2025, 1, 15)) == []
+    assert [s.id for s in idx.search(a, c, date(2025, 1, 15))] == [bus.id]
+
+    idx.remove_trip(bus.id, date(2025, 1, 15))
+    assert idx.search(a, c, date(2025, 1, 15)) == []
+    idx.remove_bus(bus.id)
+    assert idx.search(a, c) == []
+    assert idx.stats()["buses"] == 0
+
+
+def test_committed_changes_are_applied_and_verify_is_consistent():
+    Session = _sqlite_session_factory()
+    a, b = City(id=uuid.uuid4(), name="A"), City(id=uuid.uuid4(), name="B")
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    with Session() as db:
+        db.add_all([a, b, bus])
+        db.commit()
+
+    idx = RouteIndex()
+    with Session() as db:
+        idx.rebuild(db)
+    idx.attach(Session)
+    assert idx.search(a.id, b.id, date(2025, 1, 15)) == []
+
+    with Session() as db:
+        db.add(Trip(bus_id=bus.id, service_date=date(2025, 1, 15), status="ACTIVE"))
+        db.get(Bus, bus.id).fare = 650.0
+        db.commit()
+    found = idx.search(a.id, b.id, date(2025, 1, 15))
+    assert [s.fare for s in found] == [650.0]
+
+    # Rolled back changes never reach the index
+    with Session() as db:
+        db.add(Trip(bus_id=bus.id, service_date=date(2025, 1, 16), status="ACTIVE"))
+        db.flush()
+        db.rollback()
+    assert idx.search(a.id, b.id, date(2025, 1, 16)) == []
+
+    with Session() as db:
+        assert idx.verify(db)["consistent"] is True
+
+
+#edge case: bulk statements bypass ORM events and show up as drift
+def test_verify_reports_drift_from_bulk_statements():
+    Session = _sqlite_session_factory()
+    a, b = City(id=uuid.uuid4(), name="A"), City(id=uuid.uuid4(), name="B")
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    with Session() as db:
+        db.add_all([a, b, bus, Trip(bus_id=bus.id, service_date=date(2025, 1, 15), status="ACTIVE")])
+        db.commit()
+
+    idx = RouteIndex()
+    with Session() as db:
+        idx.rebuild(db)
+        db.query(Trip).delete()
+        db.commit()
+        report = idx.verify(db)
+    assert report["consistent"] is False
+    assert report["unexpected_trips"] == [(str(bus.id), "2025-01-15")]
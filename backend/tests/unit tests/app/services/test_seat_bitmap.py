@@ -0,0 +1,66 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models.booking import Booking
+from app.db.models.booking_seat import BookingSeat
+from app.db.models.bus import Bus
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.services import seat_bitmap
+
+
+def test_set_clear_and_iterate_bits():
+    bm = seat_bitmap.set_bits(b"", [0, 9, 35])
+    assert len(bm) == 5
+    assert seat_bitmap.is_set(bm, 9) and not seat_bitmap.is_set(bm, 8)
+    assert list(seat_bitmap.iter_set(bm)) == [0, 9, 35]
+    assert seat_bitmap.count(bm) == 3
+
+    bm = seat_bitmap.clear_bits(bm, [35, 9])
+    assert bm == b"\x01"  # trailing zero bytes trimmed
+    assert seat_bitmap.clear_bits(bm, [0]) == b""
+
+
+#edge case: indexes past the end of the bitmap read as free
+def test_is_set_beyond_bitmap_and_none():
+    assert seat_bitmap.is_set(b"\x01", 40) is False
+    assert seat_bitmap.is_set(None, 0) is False
+    assert seat_bitmap.count(None) == 0
+
+
+def test_verify_reports_and_rebuild_repairs_drift():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=uuid.uuid4(), to_city_id=uuid.uuid4(),
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i, seat_type="Lower", price=500.0)
+             for i in range(4)]
+    # Seat index 2 is booked, but the stored bitmap claims index 3
+    trip = Trip(bus_id=bus.id, service_date=date(2025, 1, 15), status="ACTIVE", seat_bitmap=b"\x08")
+    booking = Booking(id=uuid.uuid4(), user_id=uuid.uuid4(), bus_id=bus.id, date=date(2025, 1, 15),
+                      status="CONFIRMED", amount=500.0)
+    orphan = Booking(id=uuid.uuid4(), user_id=uuid.uuid4(), bus_id=bus.id, date=date(2025, 1, 20),
+                     status="CONFIRMED", amount=500.0)
+    db.add_all([bus, *seats, trip, booking, orphan])
+    db.flush()
+    db.add_all([BookingSeat(id=uuid.uuid4(), booking_id=booking.id, bus_id=bus.id,
+                            travel_date=booking.date, seat_id=seats[2].id),
+                BookingSeat(id=uuid.uuid4(), booking_id=orphan.id, bus_id=bus.id,
+                            travel_date=orphan.date, seat_id=seats[0].id)])
+    db.commit()
+
+    report = seat_bitmap.verify_bitmaps(db)
+    assert report["repaired"] is False
+    assert report["drifted"] == [{"bus_id": str(bus.id), "date": "2025-01-15", "missing": [2], "extra": [3]}]
+    assert report["orphaned"] == [{"bus_id": str(bus.id), "date": "2025-01-20", "booked": 1}]
+
+    report = seat_bitmap.verify_bitmaps(db, repair=True)
+    assert report["repaired"] is True
+    assert db.query(Trip).one().seat_bitmap == b"\x04"
+    assert seat_bitmap.verify_bitmaps(db)["drifted"] == []
@@ -0,0 +1,102 @@
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.seat_hold_store import InMemorySeatHoldStore
+from app.db.base import Base
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.db.models.user import User
+from app.schemas.booking import BookingCreate
+from app.schemas.hold import SeatHoldCreate
+from app.services import bus_service
+from app.services.booking_service import BookingService, SeatConflictError
+from app.services.bus_service import BusService
+from app.services.seat_hold_service import SeatHoldService, SeatHoldNotFoundError
+
+
+TRAVEL_DATE = date(2025, 1, 15)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    a, b = City(id=uuid.uuid4(), name="A"), City(id=uuid.uuid4(), name="B")
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i, seat_type="Lower", price=500.0)
+             for i in range(4)]
+    users = [User(id=uuid.uuid4(), phone=f"900000000{i}", country_code="+91") for i in range(2)]
+    db.add_all([a, b, bus, *seats, *users, Trip(bus_id=bus.id, service_date=TRAVEL_DATE, status="ACTIVE")])
+    db.commit()
+
+    store = InMemorySeatHoldStore()
+    monkeypatch.setattr(bus_service, "get_seat_hold_store", lambda: store)
+    return db, store, str(bus.id), users
+
+
+def _layout(db, bus_id, hold_token=None):
+    res = BusService(db).get_seat_layout(bus_id, TRAVEL_DATE, hold_token)
+    return {s.seat_no: s.is_available for s in res.seats}
+
+
+def test_held_seats_show_unavailable_except_to_holder(env):
+    db, store, bus_id, (alice, bob) = env
+    hold = SeatHoldService(db, store).hold_seats(
+        SeatHoldCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S1", "S2"]), alice)
+
+    assert _layout(db, bus_id) == {"S1": False, "S2": False, "S3": True, "S4": True}
+    assert _layout(db, bus_id, hold["hold_token"]) == {"S1": True, "S2": True, "S3": True, "S4": True}
+
+    with pytest.raises(SeatConflictError) as exc:
+        SeatHoldService(db, store).hold_seats(
+            SeatHoldCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S2", "S3"]), bob)
+    assert exc.value.seats == ["S2"]
+
+
+def test_booking_with_hold_token_consumes_hold(env):
+    db, store, bus_id, (alice, bob) = env
+    hold = SeatHoldService(db, store).hold_seats(
+        SeatHoldCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S1", "S2"]), alice)
+
+    #negative path: someone else cannot book a held seat
+    with pytest.raises(SeatConflictError):
+        BookingService(db, store).create_booking(
+            BookingCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S2"]), bob)
+
+    booking = BookingService(db, store).create_booking(
+        BookingCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S1", "S2"], hold_token=hold["hold_token"]), alice)
+    assert booking["seats"] == ["S1", "S2"]
+    assert store.get(hold["hold_token"]) is None
+    assert _layout(db, bus_id) == {"S1": False, "S2": False, "S3": True, "S4": True}
+
+
+def test_extend_and_release_require_owner(env):
+    db, store, bus_id, (alice, bob) = env
+    service = SeatHoldService(db, store)
+    hold = service.hold_seats(SeatHoldCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S3"]), alice)
+
+    with pytest.raises(SeatHoldNotFoundError):
+        service.extend_hold(hold["hold_token"], bob)
+    assert service.extend_hold(hold["hold_token"], alice)["expires_at"] >= hold["expires_at"]
+
+    service.release_hold(hold["hold_token"], alice)
+    assert _layout(db, bus_id)["S3"] is True
+    with pytest.raises(SeatHoldNotFoundError):
+        service.release_hold(hold["hold_token"], alice)
+
+
+#negative path: sold seats cannot be held
+def test_cannot_hold_booked_seat(env):
+    db, store, bus_id, (alice, bob) = env
+    BookingService(db, store).create_booking(BookingCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S4"]), alice)
+    with pytest.raises(SeatConflictError):
+        SeatHoldService(db, store).hold_seats(
+            SeatHoldCreate(bus_id=bus_id, travel_date=TRAVEL_DATE, seats=["S4"]), bob)
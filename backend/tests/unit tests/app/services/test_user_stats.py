@@ -0,0 +1,93 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models.bus import Bus
+from app.db.models.city import City
+from app.db.models.seat import Seat
+from app.db.models.trip import Trip
+from app.db.models.user import User
+from app.db.models.user_booking_stats import UserBookingStats
+from app.schemas.booking import BookingCreate
+from app.services import user_stats
+from app.services.booking_service import BookingService
+from app.services.user_service import UserService
+
+
+def _sqlite_db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    a, b = City(id=uuid.uuid4(), name="A"), City(id=uuid.uuid4(), name="B")
+    bus = Bus(id=uuid.uuid4(), operator="ACME", from_city_id=a.id, to_city_id=b.id,
+              departure_time="09:00", arrival_time="18:00", fare=500.0)
+    seats = [Seat(id=uuid.uuid4(), bus_id=bus.id, seat_no=f"S{i + 1}", seat_index=i, seat_type="Lower", price=500.0)
+             for i in range(4)]
+    user = User(id=uuid.uuid4(), phone="9000000000", country_code="+91")
+    db.add_all([a, b, bus, *seats, user, Trip(bus_id=bus.id, service_date=date(2025, 1, 15), status="ACTIVE")])
+    db.commit()
+    return engine, db, bus, user
+
+
+def _book(db, bus, user, seats):
+    return BookingService(db).create_booking(
+        BookingCreate(bus_id=str(bus.id), travel_date=date(2025, 1, 15), seats=seats), user)
+
+
+def test_bookings_and_cancellations_keep_stats_in_step():
+    engine, db, bus, user = _sqlite_db()
+    _book(db, bus, user, ["S1", "S2"])
+    cancelled = _book(db, bus, user, ["S3"])
+    BookingService(db).cancel_booking(cancelled["booking_id"], user)
+
+    stats = db.get(UserBookingStats, user.id)
+    db.refresh(stats)
+    assert (stats.total_bookings, stats.confirmed_spend, stats.cancellations) == (2, 1000.0, 1)
+    assert user_stats.verify_stats(db)["drifted"] == []
+
+
+def test_profile_reads_one_stats_row():
+    engine, db, bus, user = _sqlite_db()
+    for seat in ["S1", "S2", "S3"]:
+        _book(db, bus, user, [seat])
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    profile = UserService(db).get_user_profile(user.id)
+
+    assert profile["total_bookings"] == 3
+    assert profile["total_amount_spent"] == 1500.0
+    assert not any("FROM bookings" in s for s in statements), statements
+
+
+#edge case: a user without any booking has no stats row yet
+def test_profile_without_stats_row():
+    engine, db, bus, user = _sqlite_db()
+    profile = UserService(db).get_user_profile(user.id)
+    assert (profile["total_bookings"], profile["total_amount_spent"]) == (0, 0.0)
+
+
+def test_verify_reports_and_repair_backfills_stats():
+    engine, db, bus, user = _sqlite_db()
+    _book(db, bus, user, ["S1"])
+    _book(db, bus, user, ["S2"])
+    # Rows that predate the stats table
+    db.query(UserBookingStats).delete()
+    db.commit()
+
+    report = user_stats.verify_stats(db)
+    assert report["repaired"] is False
+    assert report["drifted"] == [{
+        "user_id": str(user.id),
+        "stored": None,
+        "expected": {"total_bookings": 2, "confirmed_spend": 1000.0, "cancellations": 0},
+    }]
+
+    assert user_stats.verify_stats(db, repair=True)["repaired"] is True
+    assert user_stats.verify_stats(db)["drifted"] == []
+    # Increments keep working on top of the backfilled row
+    _book(db, bus, user, ["S3"])
+    assert user_stats.verify_stats(db)["drifted"] == []
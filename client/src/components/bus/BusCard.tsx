@@ -30,7 +30,9 @@ export const BusCard = ({ bus, onSelectBus }: BusCardProps) => {
         </div>
         <div className="text-right">
           <div className="font-bold text-lg">₹{bus.fare}</div>
-          <div className="text-sm text-gray-500">{bus.available_seats} seats left</div>
+          {bus.seats_available != null && (
+            <div className="text-sm text-gray-500">{bus.seats_available} seats left</div>
+          )}
           <Button onClick={() => onSelectBus(bus)} variant="secondary" className="mt-2">
             Select Seats
           </Button>
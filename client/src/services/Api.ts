@@ -36,7 +36,8 @@ export interface Bus {
   arrival_time: string;
   duration: string;
   fare: number;
-  available_seats: number;
+  seats_available?: number | null;
+  lowest_price_by_seat_type?: Record<string, number>;
   rating: number;
 }
 
@@ -145,8 +146,11 @@ export interface BookResponse {
 
 export interface GetBookingsResponse {
   bookings: Booking[];
+  next_cursor?: string | null;  // pass back as `cursor` for the next page
 }
 
+export type BookingFilter = 'upcoming' | 'past' | 'cancelled';
+
 const API_BASE_URL = '/api';
 
 class ApiService {
@@ -224,6 +228,10 @@ class ApiService {
     return this.request('/cities');
   }
 
+  searchCities(query: string, limit = 10): Promise<GetCitiesResponse> {
+    return this.request(`/cities/search?q=${encodeURIComponent(query)}&limit=${limit}`);
+  }
+
   searchBuses(data: SearchBusesRequest): Promise<SearchBusesResponse> {
     return this.request('/search-buses', { method: 'POST', body: JSON.stringify(data) });
   }
@@ -235,18 +243,38 @@ class ApiService {
     return this.request(url);
   }
 
-  book(data: BookRequest, token?: string): Promise<BookResponse> {
+  book(data: BookRequest, token?: string, idempotencyKey?: string): Promise<BookResponse> {
     const headers: Record<string, string> = { 'Content-Type': 'application/json' };
     if (token) {
       headers['Authorization'] = `Bearer ${token}`;
     }
+    // Same key on every retry of one checkout so the server books it only once
+    if (idempotencyKey) {
+      headers['Idempotency-Key'] = idempotencyKey;
+    }
     return this.request('/book', { method: 'POST', headers, body: JSON.stringify(data) });
   }
 
   // --- My Details Section ---
 
-  getBookings(token: string): Promise<GetBookingsResponse> {
-    return this.request('/bookings', { headers: { Authorization: `Bearer ${token}` } });
+  getBookings(token: string, params: { filter?: BookingFilter; cursor?: string; limit?: number } = {}): Promise<GetBookingsResponse> {
+    const query = new URLSearchParams();
+    if (params.filter) query.set('filter', params.filter);
+    if (params.cursor) query.set('cursor', params.cursor);
+    query.set('limit', String(params.limit ?? 100));
+    return this.request(`/bookings?${query}`, { headers: { Authorization: `Bearer ${token}` } });
+  }
+
+  // Every booking, following next_cursor page by page until the server has no more
+  async getAllBookings(token: string, filter?: BookingFilter): Promise<Booking[]> {
+    const bookings: Booking[] = [];
+    let cursor: string | undefined;
+    do {
+      const page = await this.getBookings(token, { filter, cursor });
+      bookings.push(...page.bookings);
+      cursor = page.next_cursor ?? undefined;
+    } while (cursor);
+    return bookings;
   }
 
   cancelBooking(bookingId: string, token: string): Promise<{ message: string; booking_id: string; status: string }> {
@@ -481,7 +481,7 @@ export const useStore = create<AppState>((set, get) => ({
       console.log('API endpoint: /api/bookings');
       console.log('Token being sent:', token.substring(0, 20) + '...');
       
-      const { bookings } = await Api.api.getBookings(token);
+      const bookings = await Api.api.getAllBookings(token);
       console.log('Bookings received from API:', bookings);
       console.log('Setting myBookings in store...');
       set({ myBookings: bookings });
@@ -535,12 +535,17 @@ export const useStore = create<AppState>((set, get) => ({
     const token = get().token;
     set({ loading: true, error: null });
     try {
-      const booking = await Api.api.book(data, token || undefined);
+      // Retry once on a dropped connection; the shared key stops a double booking
+      const idempotencyKey = crypto.randomUUID();
+      const booking = await Api.api.book(data, token || undefined, idempotencyKey).catch((error) => {
+        if (!(error instanceof TypeError)) throw error;
+        return Api.api.book(data, token || undefined, idempotencyKey);
+      });
       set({ booking });
       
       // After successful booking, refresh the bookings list
       if (token) {
-        const { bookings } = await Api.api.getBookings(token);
+        const bookings = await Api.api.getAllBookings(token);
         set({ myBookings: bookings });
       }
       